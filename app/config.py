@@ -0,0 +1,115 @@
+import json
+import os
+
+# Outbound HTTP client shared by the Yahoo Finance and RSS scrapers
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+HTTP_MAX_CONCURRENCY = int(os.getenv("HTTP_MAX_CONCURRENCY", "8"))  # In-flight upstream requests
+
+# Screener page URL, formatted with the row offset and page size; point it at tests/upstream_simulator.py
+# (and NEWS_FEEDS at its feeds) to ingest offline
+YAHOO_SCREENER_URL = os.getenv(
+    "YAHOO_SCREENER_URL", "https://finance.yahoo.com/research-hub/screener/mutualfunds?start={start}&count={count}"
+)
+
+# Screener sweeps: the whole universe is fetched page by page, YAHOO_PAGES_PER_ROUND pages in
+# parallel per round, and rounds are spaced so a sweep takes about YAHOO_SWEEP_SECONDS. More pages
+# per round, up to YAHOO_MAX_PAGES_PER_ROUND, are used when the minimum spacing would not allow that.
+YAHOO_PAGE_SIZE = int(os.getenv("YAHOO_PAGE_SIZE", "100"))
+YAHOO_PAGES_PER_ROUND = int(os.getenv("YAHOO_PAGES_PER_ROUND", "4"))
+YAHOO_MAX_PAGES_PER_ROUND = int(os.getenv("YAHOO_MAX_PAGES_PER_ROUND", "16"))
+YAHOO_SWEEP_SECONDS = float(os.getenv("YAHOO_SWEEP_SECONDS", "600"))
+YAHOO_MIN_ROUND_INTERVAL_SECONDS = float(os.getenv("YAHOO_MIN_ROUND_INTERVAL_SECONDS", "5"))
+YAHOO_ROUND_INTERVAL_SECONDS = float(os.getenv("YAHOO_ROUND_INTERVAL_SECONDS", "20"))  # Until the universe size is known
+
+# How scraped quotes are stored: "full" rows in yahoo_finance_data, or "delta": a per-symbol
+# current state plus only the fields each scrape changed, in yahoo_finance_deltas
+YAHOO_STORAGE = os.getenv("YAHOO_STORAGE", "full")
+YAHOO_DELTA_KEYFRAME_INTERVAL = int(os.getenv("YAHOO_DELTA_KEYFRAME_INTERVAL", "50"))  # Bounds the deltas a read replays
+# Compaction merges each symbol's deltas within a resolution window once they are old enough
+YAHOO_DELTA_COMPACT_AFTER_SECONDS = float(os.getenv("YAHOO_DELTA_COMPACT_AFTER_SECONDS", "86400"))
+YAHOO_DELTA_COMPACT_RESOLUTION_SECONDS = int(os.getenv("YAHOO_DELTA_COMPACT_RESOLUTION_SECONDS", "3600"))
+YAHOO_DELTA_COMPACT_INTERVAL_SECONDS = float(os.getenv("YAHOO_DELTA_COMPACT_INTERVAL_SECONDS", "3600"))
+
+# Retention: the worker moves rows older than RETENTION_HOT_DAYS out of SQLite into Parquet files
+# under ARCHIVE_DIR, one directory per table and day (needs pyarrow); 0 keeps every row in SQLite
+RETENTION_HOT_DAYS = float(os.getenv("RETENTION_HOT_DAYS", "7"))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "10000"))  # Rows moved per transaction
+ARCHIVE_ROW_GROUP_SIZE = int(os.getenv("ARCHIVE_ROW_GROUP_SIZE", "10000"))
+
+# Snapshot cache serving GET /yahoofinance
+YAHOO_CACHE_TTL_SECONDS = float(os.getenv("YAHOO_CACHE_TTL_SECONDS", "20"))
+YAHOO_CACHE_STALE_SECONDS = float(os.getenv("YAHOO_CACHE_STALE_SECONDS", "120"))
+YAHOO_CACHE_MAX_ENTRIES = int(os.getenv("YAHOO_CACHE_MAX_ENTRIES", "256"))
+YAHOO_CACHE_WARM_INTERVAL_SECONDS = float(os.getenv("YAHOO_CACHE_WARM_INTERVAL_SECONDS", "5"))
+YAHOO_CACHE_WARM_WINDOW_SECONDS = float(os.getenv("YAHOO_CACHE_WARM_WINDOW_SECONDS", "300"))  # Keys requested this recently stay warm
+
+# Serialized response bodies kept per (data version, query) for conditional GETs
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Response compression, negotiated from Accept-Encoding (brotli preferred over gzip)
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# Live push of new quotes and articles on /stream/quotes and /stream/news
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "1000"))  # Events buffered per client
+STREAM_SLOW_CONSUMER_POLICY = os.getenv("STREAM_SLOW_CONSUMER_POLICY", "drop_oldest")  # or "disconnect"
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+
+# Background sampler behind /health and /readyz
+SYSTEM_STATS_INTERVAL_SECONDS = float(os.getenv("SYSTEM_STATS_INTERVAL_SECONDS", "5"))
+
+# Opt-in event-loop blocking detector, reported at /debug/blocking
+BLOCKING_DETECTOR_ENABLED = os.getenv("BLOCKING_DETECTOR", "0") == "1"
+BLOCKING_THRESHOLD_SECONDS = float(os.getenv("BLOCKING_THRESHOLD_SECONDS", "0.1"))
+BLOCKING_DETECTOR_ASYNCIO_DEBUG = os.getenv("BLOCKING_DETECTOR_ASYNCIO_DEBUG", "0") == "1"  # Also name slow callbacks; slower
+
+# Database. Ingest writes through one serialized connection; API reads use a read-only pool
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")  # Derived from DATABASE_URL when unset (SQLite uses aiosqlite)
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_KIB = int(os.getenv("SQLITE_CACHE_SIZE_KIB", str(64 * 1024)))  # Page cache per connection
+SQLITE_MMAP_SIZE_BYTES = int(os.getenv("SQLITE_MMAP_SIZE_BYTES", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Ingestion runs in its own process (python -m app.worker); API processes only follow its commits
+INGEST_IN_API = os.getenv("INGEST_IN_API", "0") == "1"  # Single-process development: the API also runs the scrapers
+WORKER_LOCK_FILE = os.getenv("WORKER_LOCK_FILE", "./ingest.lock")  # Only the holder scrapes; others stand by
+WORKER_STANDBY_INTERVAL_SECONDS = float(os.getenv("WORKER_STANDBY_INTERVAL_SECONDS", "5"))
+MIGRATION_LOCK_FILE = os.getenv("MIGRATION_LOCK_FILE", "./migrate.lock")
+CHANGE_FEED_INTERVAL_SECONDS = float(os.getenv("CHANGE_FEED_INTERVAL_SECONDS", "1"))
+
+# Set to a directory (emptied before startup) to aggregate /metrics across API and worker processes
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Ingest scheduler. Every run waits its interval +/- the jitter fraction; failures back off exponentially
+SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER", "0.1"))
+SCHEDULER_BACKOFF_BASE_SECONDS = float(os.getenv("SCHEDULER_BACKOFF_BASE_SECONDS", "5"))
+SCHEDULER_BACKOFF_MAX_SECONDS = float(os.getenv("SCHEDULER_BACKOFF_MAX_SECONDS", "900"))
+NEWS_INTERVAL_SECONDS = float(os.getenv("NEWS_INTERVAL_SECONDS", "600"))
+
+# RSS feeds to ingest, as a JSON list of {"source": ..., "url": ...}; the source names the articles
+NEWS_FEEDS = json.loads(os.getenv("NEWS_FEEDS", "null")) or [
+    {
+        "source": "PR Newswire",
+        "url": "https://www.prnewswire.com/apac/rss/financial-services-latest-news/financial-services-latest-news-list.rss"
+    },
+    {
+        "source": "Business Wire",
+        "url": "https://feed.businesswire.com/rss/home/?rss=G1QFDERJXkJeGVtWXw==&_gl=1*1u452xi*_gcl_au*NTA5NzA4NDU3LjE3MzcwNTE0MzE.*_ga*MTk5NDgzNTI3MC4xNzM3MDUxNDMz*_ga_ZQWF70T3FK*MTczNzA1MTQzMi4xLjEuMTczNzA1MTQ2NC4yOC4wLjA."
+    }
+]
+NEWS_FEED_SEEN_KEYS = int(os.getenv("NEWS_FEED_SEEN_KEYS", "500"))  # Item guids remembered per feed
+
+# In-memory dedup of scraped rows, loaded from the tables when the worker starts
+DEDUP_RECENT_SIZE = int(os.getenv("DEDUP_RECENT_SIZE", "100000"))  # Hashes kept exactly, per table
+DEDUP_BLOOM_CAPACITY = int(os.getenv("DEDUP_BLOOM_CAPACITY", "1000000"))  # The Bloom filter doubles past this
+DEDUP_ERROR_RATE = float(os.getenv("DEDUP_ERROR_RATE", "0.01"))  # Share of new rows still checked in the database
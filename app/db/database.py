@@ -1,21 +1,89 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from contextlib import contextmanager
+from app import config
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
+
+def is_sqlite_file(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+def _apply_sqlite_pragmas(engine: Engine, read_only: bool):
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not read_only:
+            # WAL lets readers keep going while the writer commits; it is stored in the file
+            cursor.execute("PRAGMA journal_mode=WAL")
+        # NORMAL only syncs at checkpoints in WAL mode: a power loss can drop the
+        # last commits but never corrupts the database
+        cursor.execute(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size=-{config.SQLITE_CACHE_SIZE_KIB}")  # Negative means KiB
+        cursor.execute(f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE_BYTES}")
+        cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL, read_only: bool = False) -> Engine:
+    """Engine for ingest writes, or with ``read_only`` for API reads.
+
+    On a SQLite file the writer engine holds a single connection, so writes
+    from every ingest thread are serialized in the pool instead of fighting
+    over the database lock; readers get a pool of query-only connections.
+    """
+    parsed = make_url(url)
+    if not is_sqlite_file(parsed):
+        return create_engine(url)
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=config.DB_READ_POOL_SIZE if read_only else 1,
+        max_overflow=0,
+        pool_timeout=config.DB_POOL_TIMEOUT_SECONDS
+    )
+    _apply_sqlite_pragmas(engine, read_only)
+    return engine
+
+def create_async_db_engine(url: str = SQLALCHEMY_DATABASE_URL) -> AsyncEngine:
+    """Read-only async engine for the API; SQLite goes through aiosqlite."""
+    parsed = make_url(config.ASYNC_DATABASE_URL or url)
+    if parsed.drivername == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    if not is_sqlite_file(parsed):
+        return create_async_engine(parsed)
+    engine = create_async_engine(
+        parsed, pool_size=config.DB_READ_POOL_SIZE, max_overflow=0, pool_timeout=config.DB_POOL_TIMEOUT_SECONDS
+    )
+    _apply_sqlite_pragmas(engine.sync_engine, read_only=True)
+    return engine
+
+engine = create_db_engine()
+# Reads share the writer's engine when there is no file to open twice (in-memory or server databases)
+read_engine = create_db_engine(read_only=True) if is_sqlite_file(engine.url) else engine
+async_read_engine = create_async_db_engine()
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, expire_on_commit=False, autoflush=False)
 Base = declarative_base()
 
 def get_db():
-    db = SessionLocal()
+    db = ReadSessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+async def get_async_db():
+    """Read-only async session for request handlers."""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
 @contextmanager
 def session_scope():
     """Provide a transactional scope around a series of operations."""
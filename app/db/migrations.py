@@ -0,0 +1,80 @@
+from sqlalchemy import bindparam, inspect, select, update
+from sqlalchemy.engine import Engine
+from app import config
+from app.db.database import Base, engine
+from app.models.news import YahooFinanceData
+from app.services.file_lock import FileLock
+from app.services.news_search import create_news_search_index
+from app.services.yahoo_finance import numeric_columns, normalize_yahoo_finance_record
+
+def upgrade_schema(bind: Engine):
+    """Add columns and indexes declared on the models but missing from existing tables.
+
+    ``create_all`` only creates missing tables, so databases created by an
+    older version of the models (such as the bundled test.db) are brought up
+    to date here. Only additive changes are handled.
+    """
+    with bind.begin() as conn:
+        inspector = inspect(conn)  # On the same connection: the writer engine has only one
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=bind.dialect)
+                    conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}')
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+def backfill_yahoo_finance_values(bind: Engine, batch_size: int = 5000) -> int:
+    """Populate the typed YahooFinanceData columns for rows stored before they existed."""
+    table = YahooFinanceData.__table__
+    raw_columns = [table.c[name] for name in numeric_columns] + [table.c.timestamp]
+    updated = 0
+    last_id = 0
+    while True:
+        with bind.begin() as conn:
+            rows = conn.execute(
+                select(table.c.id, *raw_columns)
+                .where(table.c.observed_at.is_(None), table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                return updated
+            value_columns = list(numeric_columns.values()) + ["observed_at"]
+            params = []
+            for row in rows:
+                record = normalize_yahoo_finance_record(dict(row))
+                params.append({"row_id": row["id"], **{f"new_{name}": record[name] for name in value_columns}})
+            stmt = (
+                update(table)
+                .where(table.c.id == bindparam("row_id"))
+                .values({name: bindparam(f"new_{name}") for name in value_columns})
+            )
+            conn.execute(stmt, params)
+            updated += len(rows)
+            last_id = rows[-1]["id"]
+
+def migrate(bind: Engine = engine):
+    upgrade_schema(bind)
+    backfill_yahoo_finance_values(bind)
+    create_news_search_index(bind)
+
+def prepare_database(bind: Engine = engine):
+    """Create missing tables and migrate, one process at a time.
+
+    Every API worker and the ingest worker call this on startup; the lock
+    keeps them from racing to create the same tables and columns.
+    """
+    with FileLock(config.MIGRATION_LOCK_FILE):
+        Base.metadata.create_all(bind=bind)
+        migrate(bind)
+
+if __name__ == "__main__":
+    # python -m app.db.migrations
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    print(f"Backfilled {backfill_yahoo_finance_values(engine)} yahoo_finance_data rows.")
+    create_news_search_index(engine)
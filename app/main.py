@@ -1,14 +1,21 @@
 from fastapi import FastAPI, Request, Response
 from fastapi.responses import JSONResponse
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, multiprocess, CONTENT_TYPE_LATEST
 from contextlib import asynccontextmanager
-from app.routers import news, yahoo_finance
-from app.db.database import Base, engine
-from app.services.news import continuous_fetch
-from app.services.yahoo_finance import continuous_yahoo_finance_fetch
+from app.routers import debug, news, stream, yahoo_finance
+from app.db.migrations import prepare_database
+from app.middleware import BlockingMiddleware, CompressionMiddleware
+from app.services.yahoo_finance import continuous_yahoo_finance_cache_refresh
+from app.services.blocking_detector import blocking_detector
+from app.services.change_feed import change_feed
+from app.services.http_client import close_http_client
+from app.services.request_stats import request_stats
+from app.services.system_stats import SystemSnapshot, continuous_system_sampling, current_snapshot
+from app.worker import run_ingest
+from app import config
+import os
 import time
 import asyncio
-import psutil
 
 # Initialize the application
 app = FastAPI()
@@ -18,57 +25,87 @@ REQUEST_COUNT = Counter("request_count_total", "Total number of requests", ["met
 REQUEST_LATENCY = Histogram("request_latency_seconds", "Request latency in seconds", ["method", "endpoint"])
 ERROR_COUNT = Counter("error_count_total", "Total number of errors", ["method", "endpoint"])
 
-# Create the database tables
-Base.metadata.create_all(bind=engine)
+# Create the database tables and bring existing ones up to date
+prepare_database()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Start background tasks
-    task_news = asyncio.create_task(continuous_fetch())
-    task_yahoo_finance = asyncio.create_task(continuous_yahoo_finance_fetch())
-    task_health_check = asyncio.create_task(continuous_health_check())
+    if config.BLOCKING_DETECTOR_ENABLED:
+        blocking_detector.start()
+    # Start background tasks. Scraping belongs to the ingest worker (python -m app.worker);
+    # this process only follows what it commits.
+    tasks = [
+        asyncio.create_task(change_feed.follow()),
+        asyncio.create_task(continuous_system_sampling(on_sample=log_health_transitions)),
+        asyncio.create_task(continuous_yahoo_finance_cache_refresh())
+    ]
+    if config.INGEST_IN_API:
+        tasks.append(asyncio.create_task(run_ingest()))
+    await asyncio.to_thread(change_feed.poll)  # Data versions are known before the first request
     yield
-    task_news.cancel()
-    task_yahoo_finance.cancel()
-    task_health_check.cancel()
+    for task in tasks:
+        task.cancel()
+    blocking_detector.stop()
+    await close_http_client()
+    if config.PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
 
 app = FastAPI(lifespan=lifespan)
 
+if config.BLOCKING_DETECTOR_ENABLED:
+    app.add_middleware(BlockingMiddleware, detector=blocking_detector)  # Innermost, so in the handler's task
+app.add_middleware(CompressionMiddleware)
+
 app.include_router(news.router)
 app.include_router(yahoo_finance.router)
+app.include_router(stream.router)
+app.include_router(debug.router)
+
+# Methods and routes are label values; anything else would mint a new time series per request
+HTTP_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
 
 @app.middleware("http")
 async def add_prometheus_metrics(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    request_latency = time.time() - start_time
-
-    REQUEST_COUNT.labels(method=request.method, endpoint=request.url.path).inc()
-    REQUEST_LATENCY.labels(method=request.method, endpoint=request.url.path).observe(request_latency)
-    
-    if response.status_code >= 400:
-        ERROR_COUNT.labels(method=request.method, endpoint=request.url.path).inc()
-
-    return response
+    start_time = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        request_latency = time.perf_counter() - start_time
+        # Label by the matched route template (/yahoofinance/{symbol}/history), not the raw path
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "<unmatched>")
+        method = request.method if request.method in HTTP_METHODS else "OTHER"
+
+        REQUEST_COUNT.labels(method=method, endpoint=endpoint).inc()
+        REQUEST_LATENCY.labels(method=method, endpoint=endpoint).observe(request_latency)
+        if status_code >= 400:
+            ERROR_COUNT.labels(method=method, endpoint=endpoint).inc()
+        request_stats.record(request_latency, status_code >= 400)
 
 @app.get("/metrics")
 def metrics():
     # Generate metrics data
-    metrics_data = generate_latest()
+    if config.PROMETHEUS_MULTIPROC_DIR:
+        # Every process writes its samples to the directory; sum them up across API and worker processes
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        metrics_data = generate_latest(registry)
+    else:
+        metrics_data = generate_latest()
     return Response(metrics_data, media_type=CONTENT_TYPE_LATEST)
 
 @app.get("/metrics_json")
 def metrics_json():
-    metrics_data = generate_latest().decode('utf-8')
-    metrics_lines = metrics_data.split('\n')
-    
-    metrics_dict = {}
-    for line in metrics_lines:
-        if not line.startswith('#') and line:
-            key, value = line.split(' ', 1)
-            metrics_dict[key] = value
-
-    return JSONResponse(content=metrics_dict)
+    # Rolling 1m/5m request stats, kept up to date by the middleware
+    stats = request_stats.snapshot()
+    return JSONResponse(content={
+        "request_count_total": stats["request_count"],
+        "error_count_total": stats["error_count"],
+        "windows": stats["windows"]
+    })
 
 def create_progress_bar(usage_percent, length=20, healthy=True):
     filled_length = int(length * usage_percent // 100)
@@ -80,72 +117,63 @@ def create_progress_bar(usage_percent, length=20, healthy=True):
 
     return bar
 
-@app.get("/health")
-def health_check():
-    # Extract metric values
-    request_count = sum(sample.value for sample in REQUEST_COUNT.collect()[0].samples if sample.name == 'request_count_total')
-    error_count = sum(sample.value for sample in ERROR_COUNT.collect()[0].samples if sample.name == 'error_count_total')
-    latency_sum = sum(sample.value for sample in REQUEST_LATENCY.collect()[0].samples if sample.name.endswith('_sum'))
-    latency_count = sum(sample.value for sample in REQUEST_LATENCY.collect()[0].samples if sample.name.endswith('_count'))
-    average_latency = latency_sum / latency_count if latency_count > 0 else 0
+def evaluate_health():
+    """Health from the latest system sample and the rolling request window; no blocking calls."""
+    stats = request_stats.snapshot()
+    recent = stats["windows"]["5m"]
+    snapshot = current_snapshot()
 
     # Define thresholds
     max_error_rate = 0.05
     max_average_latency = 1.0
-    error_rate = error_count / request_count if request_count else 0
-    if error_rate > max_error_rate or average_latency > max_average_latency:
-        status = "unhealthy"
-        healthy = False
-    else:
-        status = "healthy"
-        healthy = True
-
-    cpu_usage = psutil.cpu_percent()
-    memory_usage = psutil.virtual_memory().percent
-
-    cpu_progress_bar = create_progress_bar(cpu_usage, healthy=healthy)
-    memory_progress_bar = create_progress_bar(memory_usage, healthy=healthy)
-
-    print(f"{status.capitalize()} Status")
+    max_event_loop_lag = 1.0
+    healthy = (
+        (snapshot is None or (snapshot.database_ok and snapshot.event_loop_lag_seconds <= max_event_loop_lag))
+        and recent["error_rate"] <= max_error_rate
+        and recent["average_latency_seconds"] <= max_average_latency
+    )
+    return healthy, stats, recent, snapshot
 
+@app.get("/health")
+def health_check():
+    healthy, stats, recent, snapshot = evaluate_health()
+    cpu_usage = snapshot.cpu_percent if snapshot else 0.0
+    memory_usage = snapshot.memory_percent if snapshot else 0.0
     return JSONResponse(content={
-        "status": status,
-        "request_count": request_count,
-        "error_count": error_count,
-        "error_rate": error_rate,
-        "average_latency_seconds": average_latency,
+        "status": "healthy" if healthy else "unhealthy",
+        "request_count": stats["request_count"],
+        "error_count": stats["error_count"],
+        "error_rate": recent["error_rate"],
+        "average_latency_seconds": recent["average_latency_seconds"],
+        "p95_latency_seconds": recent["p95_latency_seconds"],
+        "p99_latency_seconds": recent["p99_latency_seconds"],
         "cpu_usage_percent": cpu_usage,
         "memory_usage_percent": memory_usage,
-        "cpu_progress_bar": cpu_progress_bar,
-        "memory_progress_bar": memory_progress_bar
+        "cpu_progress_bar": create_progress_bar(cpu_usage, healthy=healthy),
+        "memory_progress_bar": create_progress_bar(memory_usage, healthy=healthy),
+        "system": snapshot._asdict() if snapshot else None
     })
 
-async def continuous_health_check():
-    while True:
-        # Extract metric values
-        request_count = sum(sample.value for sample in REQUEST_COUNT.collect()[0].samples if sample.name == 'request_count_total')
-        error_count = sum(sample.value for sample in ERROR_COUNT.collect()[0].samples if sample.name == 'error_count_total')
-        latency_sum = sum(sample.value for sample in REQUEST_LATENCY.collect()[0].samples if sample.name.endswith('_sum'))
-        latency_count = sum(sample.value for sample in REQUEST_LATENCY.collect()[0].samples if sample.name.endswith('_count'))
-        average_latency = latency_sum / latency_count if latency_count > 0 else 0
-
-        # Define thresholds
-        max_error_rate = 0.05
-        max_average_latency = 1.0
-        error_rate = error_count / request_count if request_count else 0
-        if error_rate > max_error_rate or average_latency > max_average_latency:
-            status = "unhealthy"
-            healthy = False
-        else:
-            status = "healthy"
-            healthy = True
-
-        cpu_usage = psutil.cpu_percent()
-        memory_usage = psutil.virtual_memory().percent
-
-        cpu_progress_bar = create_progress_bar(cpu_usage, healthy=healthy)
-        memory_progress_bar = create_progress_bar(memory_usage, healthy=healthy)
-
+@app.get("/livez")
+def liveness_probe():
+    # Answered by the event loop without touching anything else
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readiness_probe():
+    snapshot = current_snapshot()
+    # A sample older than a few intervals means the sampler, and so the event loop, is stuck
+    max_age = 3 * config.SYSTEM_STATS_INTERVAL_SECONDS
+    if snapshot is None or time.monotonic() - snapshot.monotonic > max_age or not snapshot.database_ok:
+        return JSONResponse(status_code=503, content={"status": "not ready"})
+    return {"status": "ready"}
+
+_last_status = None
+
+def log_health_transitions(snapshot: SystemSnapshot):
+    # Print the status when it changes rather than on every check
+    global _last_status
+    status = "healthy" if evaluate_health()[0] else "unhealthy"
+    if status != _last_status:
         print(f"{status.capitalize()} Status")
-
-        await asyncio.sleep(60)  # Run health check every 60 seconds
+        _last_status = status
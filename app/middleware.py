@@ -0,0 +1,127 @@
+import zlib
+from typing import Optional
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app import config
+from app.services.blocking_detector import BlockingDetector
+
+# Parquet and images are compressed already
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/vnd.apache.arrow.stream")
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, preferring br on a tie."""
+    weights = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip()] = q
+    q_br = weights.get("br", weights.get("*", 0.0))
+    q_gzip = weights.get("gzip", weights.get("*", 0.0))
+    if max(q_br, q_gzip) <= 0:
+        return None
+    return "br" if q_br >= q_gzip else "gzip"
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=config.COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(config.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        # Chunks of a stream are flushed so the client can decode them as they arrive
+        if self._brotli is not None:
+            return self._brotli.process(data) + (self._brotli.finish() if final else self._brotli.flush())
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class CompressionMiddleware:
+    """Compress text-like responses with brotli or gzip, as the client accepts.
+
+    Unlike Starlette's GZipMiddleware this also speaks brotli, and it leaves
+    bodies below ``COMPRESSION_MIN_BYTES``, 304s and already-encoded responses
+    alone. Streaming responses are compressed chunk by chunk.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = config.COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start["headers"])
+                compressible = headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+                if compressible:
+                    headers.add_vary_header("Accept-Encoding")
+                if (
+                    not compressible
+                    or "content-encoding" in headers
+                    or start["status"] in (204, 304)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                if "content-length" in headers:
+                    del headers["content-length"]
+                if not more_body:
+                    body = compressor.compress(body, final=True)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start)
+            await send({
+                "type": "http.response.body",
+                "body": compressor.compress(body, final=not more_body),
+                "more_body": more_body
+            })
+
+        await self.app(scope, receive, send_compressed)
+
+class BlockingMiddleware:
+    """Remembers which request each task serves so stalls can be attributed to it.
+
+    Add it innermost: a middleware built on BaseHTTPMiddleware runs the rest
+    of the app in a new task.
+    """
+
+    def __init__(self, app: ASGIApp, detector: BlockingDetector):
+        self.app = app
+        self.detector = detector
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and self.detector.enabled:
+            self.detector.track(scope)
+        await self.app(scope, receive, send)
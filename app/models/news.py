@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text, Float, Index
 from app.db.database import Base
 import datetime  # Import datetime module
 
 class NewsArticle(Base):
     __tablename__ = "news_articles"
+    __table_args__ = (
+        # Latest-first pages overall and per source, including "since my last poll"
+        Index("ix_news_articles_published_date", "published_date"),
+        Index("ix_news_articles_source_published_date", "source", "published_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
@@ -14,6 +19,21 @@ class NewsArticle(Base):
 
 class YahooFinanceData(Base):
     __tablename__ = "yahoo_finance_data"
+    __table_args__ = (
+        # Symbol lookups and per-symbol time ranges. Carrying the price makes the index
+        # covering for history queries, so they read it in order without touching the table.
+        Index("ix_yahoo_finance_data_symbol_history", "symbol", "observed_at", "price_intraday_value"),
+        Index("ix_yahoo_finance_data_name_observed_at", "name", "observed_at"),
+        # Range filters and sorts on the typed metrics
+        Index("ix_yahoo_finance_data_price_intraday_value", "price_intraday_value"),
+        Index("ix_yahoo_finance_data_ytd_return_value", "ytd_return_value"),
+        Index("ix_yahoo_finance_data_one_year_value", "one_year_value"),
+        Index("ix_yahoo_finance_data_three_year_return_value", "three_year_return_value"),
+        Index("ix_yahoo_finance_data_five_year_return_value", "five_year_return_value"),
+        Index("ix_yahoo_finance_data_net_assets_value", "net_assets_value"),
+        # "Cheap funds above a size" screens filter on both
+        Index("ix_yahoo_finance_data_expense_ratio_assets", "net_expense_ratio_value", "net_assets_value"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     symbol = Column(String, index=True)
@@ -37,3 +57,85 @@ class YahooFinanceData(Base):
     month = Column(String, index=True)  # Change to String
     day = Column(String, index=True)  # Change to String
     time = Column(String, index=True)  # Change to String
+
+    # Normalized values parsed from the display strings above, NULL when not available
+    change_value = Column(Float, nullable=True)
+    change_percent_value = Column(Float, nullable=True)  # Percentage points, "+0.94%" -> 0.94
+    price_intraday_value = Column(Float, nullable=True)
+    ytd_return_value = Column(Float, nullable=True)
+    three_mo_return_value = Column(Float, nullable=True)
+    one_year_value = Column(Float, nullable=True)
+    three_year_return_value = Column(Float, nullable=True)
+    five_year_return_value = Column(Float, nullable=True)
+    net_expense_ratio_value = Column(Float, nullable=True)
+    gross_expense_ratio_value = Column(Float, nullable=True)
+    net_assets_value = Column(Float, nullable=True)  # "1.778T" -> 1.778e12
+    fifty_day_avg_value = Column(Float, nullable=True)
+    two_hundred_day_avg_value = Column(Float, nullable=True)
+    observed_at = Column(DateTime, index=True)  # Scrape time in UTC
+
+class YahooFinanceState(Base):
+    __tablename__ = "yahoo_finance_state"
+
+    # Delta layout (YAHOO_STORAGE=delta): the latest scraped fields of each symbol, which
+    # ingest diffs every scrape against
+    symbol = Column(String, primary_key=True)
+    observed_at = Column(DateTime, nullable=False)
+    data = Column(Text, nullable=False)  # JSON of the delta fields
+    deltas_since_keyframe = Column(Integer, nullable=False, default=0)
+
+class YahooFinanceDelta(Base):
+    __tablename__ = "yahoo_finance_deltas"
+    __table_args__ = (
+        Index("ix_yahoo_finance_deltas_symbol_observed_at", "symbol", "observed_at"),
+    )
+
+    # Delta layout: one row per scrape that changed a symbol, holding only the changed fields
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String, nullable=False)
+    observed_at = Column(DateTime, nullable=False)  # Scrape time in UTC
+    keyframe = Column(Boolean, nullable=False, default=False)  # Holds every field; replays start here
+    changes = Column(Text, nullable=False)  # JSON of the fields that changed since the previous row
+
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+
+    # Bumped in the same transaction as the rows ingest adds to the table
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
+
+class ScreenerPage(Base):
+    __tablename__ = "screener_pages"
+
+    # Latest scrape of each screener page, served by GET /yahoofinance
+    start = Column(Integer, primary_key=True)
+    count = Column(Integer, primary_key=True)
+    fetched_at = Column(DateTime, nullable=False)  # UTC
+    data = Column(Text, nullable=False)  # JSON list of rows as scraped
+
+class ScraperState(Base):
+    __tablename__ = "scraper_states"
+
+    # One row per scheduled scraper, saved after every run so a restart resumes where it stopped
+    name = Column(String, primary_key=True)
+    cursor = Column(Integer, nullable=False, default=0)  # Next screener offset of the current sweep
+    universe_size = Column(Integer, nullable=True)  # Total rows upstream, as last reported
+    sweep_started_at = Column(DateTime, nullable=True)
+    last_sweep_seconds = Column(Float, nullable=True)
+    last_run_at = Column(DateTime, nullable=True)
+    last_success_at = Column(DateTime, nullable=True)
+    last_error_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+    consecutive_failures = Column(Integer, nullable=False, default=0)
+    next_run_at = Column(DateTime, nullable=True)
+
+class FeedState(Base):
+    __tablename__ = "feed_states"
+
+    # Conditional request validators and the newest items seen, per RSS feed
+    url = Column(String, primary_key=True)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    seen_keys = Column(Text, nullable=True)  # JSON list of item guids, newest first
+    checked_at = Column(DateTime, nullable=True)
+    changed_at = Column(DateTime, nullable=True)  # Last answer that was not 304
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, HTTPException
+from app.services.blocking_detector import blocking_detector
+
+router = APIRouter()
+
+@router.get("/debug/blocking")
+def read_blocking_report():
+    """Recent event-loop stalls with the stack that caused each, and the worst offenders."""
+    if not blocking_detector.enabled:
+        raise HTTPException(status_code=404, detail="The blocking detector is off; start the API with BLOCKING_DETECTOR=1")
+    return blocking_detector.report()
@@ -1,22 +1,52 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from app.services.news import get_latest_news
-from app.services.yahoo_finance import fetch_data_from_yahoo_finance, fetch_and_store_data_from_yahoo_finance
-from app.db.database import get_db
-from app.schemas.news import NewsArticle, HTTPValidationError
-from typing import List, Dict
+import asyncio
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.news import archived_news_after, get_latest_news
+from app.services.news_search import search_news
+from app.services.yahoo_finance import screener_cache
+from app.db.database import get_async_db
+from app.services.data_version import NEWS_ARTICLES, data_versions
+from app.services.http_cache import conditional_response, json_body
+from app.schemas.news import NewsArticle, NewsSearchResult, HTTPValidationError
+from typing import List, Dict, Optional
+from datetime import datetime
 
 router = APIRouter()
 
 @router.get("/news", response_model=List[NewsArticle], responses={422: {"model": HTTPValidationError}})
-async def read_news(db: Session = Depends(get_db)):
-    news = get_latest_news(db)
-    return news
+async def read_news(
+    request: Request,
+    limit: int = Query(30, ge=1, le=200),
+    source: Optional[str] = Query(None, description="Exact source, e.g. PR Newswire"),
+    before: Optional[datetime] = Query(None, description="Only articles published before this time; pass the oldest date of the previous page"),
+    since: Optional[datetime] = Query(None, description="Only articles published after this time; pass the newest date from the last poll"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    async def build():
+        news = await db.run_sync(get_latest_news, limit=limit, source=source, before=before, since=since, include_archive=False)
+        if len(news) < limit:
+            # Parquet scans block, keep them off the event loop
+            news += await asyncio.to_thread(archived_news_after, news, limit, source, before, since)
+        return json_body([NewsArticle.model_validate(article) for article in news])
+    return await conditional_response(request, data_versions.get(NEWS_ARTICLES), build)
+
+@router.get("/news/search", response_model=List[NewsSearchResult], responses={422: {"model": HTTPValidationError}})
+async def search_news_articles(
+    request: Request,
+    q: str = Query(..., min_length=1, description="Words to match in title or content; append * for a prefix"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    async def build():
+        return json_body(await db.run_sync(search_news, q, limit=limit, offset=offset))
+    return await conditional_response(request, data_versions.get(NEWS_ARTICLES), build)
 
 @router.get("/yahoofinance", response_model=List[Dict[str, str]], responses={422: {"model": HTTPValidationError}})
 async def read_yahoo_finance_data(
-    start: int = 0,
-    count: int = 100,
+    request: Request,
+    start: int = Query(0, ge=0),
+    count: int = Query(100, ge=1),
     symbol: str = Query(None),
     name: str = Query(None),
     change: str = Query(None),
@@ -33,8 +63,9 @@ async def read_yahoo_finance_data(
     fifty_day_avg: str = Query(None),
     two_hundred_day_avg: str = Query(None)
 ):
-    data = fetch_data_from_yahoo_finance(start=start, count=count)
-    fetch_and_store_data_from_yahoo_finance(start=start, count=count)
+    # Served from an in-memory snapshot of the pages the ingest worker last stored, cut to the range
+    snapshot = await screener_cache.get((start, count))
+    rows = snapshot.rows if snapshot else []
     query_params = {
         "Symbol": symbol,
         "Name": name,
@@ -53,11 +84,15 @@ async def read_yahoo_finance_data(
         "200 Day Avg": two_hundred_day_avg
     }
 
-    filtered_data = [
-        item for item in data
-        if all(
-            item.get(key) == value for key, value in query_params.items() if value is not None
-        )
-    ]
+    def build():
+        filtered_data = [
+            item for item in rows
+            if all(
+                item.get(key) == value for key, value in query_params.items() if value is not None
+            )
+        ]
+        return json_body(filtered_data)
 
-    return filtered_data
+    # The newest scrape time of its pages is the range's version, the same in every API process
+    version = snapshot.fetched_at.isoformat() if snapshot else "empty"
+    return await conditional_response(request, version, build)
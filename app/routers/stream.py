@@ -0,0 +1,93 @@
+import asyncio
+from typing import AsyncIterator, Optional, Set
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from app import config
+from app.services.broadcaster import NEWS, QUOTES, Subscription, broadcaster
+
+router = APIRouter()
+
+# Event names, as sent in the SSE "event:" field and the WebSocket "event" key
+EVENT_NAMES = {QUOTES: "quote", NEWS: "article"}
+
+def parse_keys(value: Optional[str], upper: bool = False) -> Optional[Set[str]]:
+    if not value:
+        return None
+    keys = {key.strip().upper() if upper else key.strip() for key in value.split(",")}
+    return {key for key in keys if key} or None
+
+async def sse_events(topic: str, keys: Optional[Set[str]]) -> AsyncIterator[bytes]:
+    # Starlette cancels this generator when the client disconnects, which
+    # closes the subscription
+    with broadcaster.subscribe(topic, keys) as subscription:
+        name = EVENT_NAMES[topic].encode()
+        yield b"retry: 5000\n\n"
+        while True:
+            try:
+                event = await subscription.get(timeout=config.STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"  # Keeps proxies from closing an idle stream
+                continue
+            if event is None:
+                return  # Dropped as a slow consumer
+            dropped = subscription.take_dropped()
+            if dropped:
+                yield b'event: dropped\ndata: {"count":%d}\n\n' % dropped
+            yield b"id: %d\nevent: %s\ndata: %s\n\n" % (event.id, name, event.data)
+
+async def websocket_events(websocket: WebSocket, subscription: Subscription):
+    await websocket.accept()
+    name = EVENT_NAMES[subscription.topic].encode()
+
+    async def send_events():
+        while True:
+            event = await subscription.get()
+            if event is None:
+                await websocket.close(code=1013, reason="Slow consumer")  # Try again later
+                return
+            dropped = subscription.take_dropped()
+            if dropped:
+                await websocket.send_text('{"event":"dropped","count":%d}' % dropped)
+            await websocket.send_text((b'{"event":"%s","id":%d,"data":%s}' % (name, event.id, event.data)).decode())
+
+    async def wait_for_disconnect():
+        # Incoming messages are ignored; receiving is how a disconnect is noticed
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    with subscription:
+        tasks = [asyncio.create_task(send_events()), asyncio.create_task(wait_for_disconnect())]
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and not isinstance(task.exception(), WebSocketDisconnect):
+                    task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+@router.get("/stream/quotes")
+async def stream_quotes(
+    symbols: Optional[str] = Query(None, description="Comma-separated symbols; every new quote when omitted")
+):
+    """Server-sent events for each newly stored quote."""
+    return StreamingResponse(
+        sse_events(QUOTES, parse_keys(symbols, upper=True)), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
+
+@router.websocket("/stream/quotes")
+async def stream_quotes_websocket(websocket: WebSocket, symbols: Optional[str] = None):
+    await websocket_events(websocket, broadcaster.subscribe(QUOTES, parse_keys(symbols, upper=True)))
+
+@router.get("/stream/news")
+async def stream_news(
+    sources: Optional[str] = Query(None, description="Comma-separated sources, e.g. PR Newswire; every new article when omitted")
+):
+    """Server-sent events for each newly stored article."""
+    return StreamingResponse(
+        sse_events(NEWS, parse_keys(sources)), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
+
+@router.websocket("/stream/news")
+async def stream_news_websocket(websocket: WebSocket, sources: Optional[str] = None):
+    await websocket_events(websocket, broadcaster.subscribe(NEWS, parse_keys(sources)))
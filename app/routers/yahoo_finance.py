@@ -1,112 +1,160 @@
-from fastapi import APIRouter, Query
-from typing import List, Dict, Optional
-from sqlalchemy.orm import Session
-from app.db.database import SessionLocal
-from app.models.news import YahooFinanceData
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Any, Callable, List, Dict, Iterable, Iterator, Optional, Sequence
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+from app import config
+from app.db.database import ReadSessionLocal, get_async_db
+from app.services.data_version import YAHOO_FINANCE_DATA, data_versions
+from app.services.export import (
+    columnar_formats, export_fields, media_types, pyarrow, record_fields, records, select_fields, writers
+)
+from app.services.http_cache import conditional_response, json_body
+from app.services.yahoo_finance import (
+    decode_cursor, encode_cursor, history_in_python, load_yahoo_finance_history, parse_interval, sortable_columns,
+    yahoo_finance_history, yahoo_finance_query
+)
 
 router = APIRouter()
 
-@router.get("/yahoofinance", response_model=List[Dict[str, str]])
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+def stream_rows(query: Select, write: Callable[[Iterable[Sequence]], Iterator[bytes]]) -> Iterator[bytes]:
+    # Runs in Starlette's threadpool with its own session, since the request's session is
+    # released before the body is sent. yield_per keeps one batch of rows in memory.
+    session = ReadSessionLocal()
+    try:
+        result = session.execute(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        yield from write(result.partitions())
+    finally:
+        session.close()
+
+# Stored quotes. GET /yahoofinance itself serves the live screener snapshot from app.routers.news.
+@router.get("/yahoofinance/quotes", response_model=List[Dict[str, Optional[str]]])
 async def read_yahoo_finance_data(
-    symbol: Optional[str] = Query(None),
-    name: Optional[str] = Query(None),
-    change: Optional[str] = Query(None),
-    change_percent: Optional[str] = Query(None),
-    price: Optional[str] = Query(None),
-    ytd_return: Optional[str] = Query(None),
-    three_mo_return: Optional[str] = Query(None),
-    one_year: Optional[str] = Query(None),
-    three_year_return: Optional[str] = Query(None),
-    five_year_return: Optional[str] = Query(None),
-    net_expense_ratio: Optional[str] = Query(None),
-    gross_expense_ratio: Optional[str] = Query(None),
-    net_assets: Optional[str] = Query(None),
-    fifty_day_avg: Optional[str] = Query(None),
-    two_hundred_day_avg: Optional[str] = Query(None),
+    request: Request,
+    symbol: Optional[str] = Query(None, description="Exact symbol, case-insensitive"),
+    symbol_prefix: Optional[str] = Query(None, description="Symbol prefix, case-insensitive"),
+    name: Optional[str] = Query(None, description="Exact fund name"),
+    name_prefix: Optional[str] = Query(None, description="Fund name prefix, case-sensitive"),
+    min_change: Optional[float] = Query(None),
+    max_change: Optional[float] = Query(None),
+    min_change_percent: Optional[float] = Query(None),
+    max_change_percent: Optional[float] = Query(None),
+    min_price: Optional[float] = Query(None),
+    max_price: Optional[float] = Query(None),
+    min_ytd_return: Optional[float] = Query(None),
+    max_ytd_return: Optional[float] = Query(None),
+    min_three_mo_return: Optional[float] = Query(None),
+    max_three_mo_return: Optional[float] = Query(None),
+    min_one_year: Optional[float] = Query(None),
+    max_one_year: Optional[float] = Query(None),
+    min_three_year_return: Optional[float] = Query(None),
+    max_three_year_return: Optional[float] = Query(None),
+    min_five_year_return: Optional[float] = Query(None),
+    max_five_year_return: Optional[float] = Query(None),
+    min_net_expense_ratio: Optional[float] = Query(None),
+    max_net_expense_ratio: Optional[float] = Query(None),
+    min_gross_expense_ratio: Optional[float] = Query(None),
+    max_gross_expense_ratio: Optional[float] = Query(None),
+    min_net_assets: Optional[float] = Query(None, description="Absolute value, e.g. 1e9 for 1B"),
+    max_net_assets: Optional[float] = Query(None),
+    min_fifty_day_avg: Optional[float] = Query(None),
+    max_fifty_day_avg: Optional[float] = Query(None),
+    min_two_hundred_day_avg: Optional[float] = Query(None),
+    max_two_hundred_day_avg: Optional[float] = Query(None),
     year: Optional[int] = Query(None),
     month: Optional[int] = Query(None),
     day: Optional[int] = Query(None),
-    time: Optional[str] = Query(None),
+    since: Optional[datetime] = Query(None, description="Observed at or after, UTC"),
+    until: Optional[datetime] = Query(None, description="Observed before, UTC"),
     sort_by: Optional[str] = Query(None),
-    sort_order: Optional[str] = Query("asc")
+    sort_order: Optional[str] = Query("asc"),
+    limit: Optional[int] = Query(None, ge=1, description=f"Page size, default {DEFAULT_PAGE_SIZE} and at most {MAX_PAGE_SIZE} for JSON; unbounded for the other formats"),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    format: str = Query("json", pattern="^(json|ndjson|csv|arrow|parquet)$", description="csv, arrow and parquet export typed columns"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    session: Session = SessionLocal()
-    query = session.query(YahooFinanceData)
-    
-    if symbol:
-        query = query.filter(YahooFinanceData.symbol.ilike(f'%{symbol}%'))
-    if name:
-        query = query.filter(YahooFinanceData.name.ilike(f'%{name}%'))
-    if change:
-        query = query.filter(YahooFinanceData.change.ilike(f'%{change}%'))
-    if change_percent:
-        query = query.filter(YahooFinanceData.change_percent.ilike(f'%{change_percent}%'))
-    if price:
-        query = query.filter(YahooFinanceData.price_intraday.ilike(f'%{price}%'))
-    if ytd_return:
-        query = query.filter(YahooFinanceData.ytd_return.ilike(f'%{ytd_return}%'))
-    if three_mo_return:
-        query = query.filter(YahooFinanceData.three_mo_return.ilike(f'%{three_mo_return}%'))
-    if one_year:
-        query = query.filter(YahooFinanceData.one_year.ilike(f'%{one_year}%'))
-    if three_year_return:
-        query = query.filter(YahooFinanceData.three_year_return.ilike(f'%{three_year_return}%'))
-    if five_year_return:
-        query = query.filter(YahooFinanceData.five_year_return.ilike(f'%{five_year_return}%'))
-    if net_expense_ratio:
-        query = query.filter(YahooFinanceData.net_expense_ratio.ilike(f'%{net_expense_ratio}%'))
-    if gross_expense_ratio:
-        query = query.filter(YahooFinanceData.gross_expense_ratio.ilike(f'%{gross_expense_ratio}%'))
-    if net_assets:
-        query = query.filter(YahooFinanceData.net_assets.ilike(f'%{net_assets}%'))
-    if fifty_day_avg:
-        query = query.filter(YahooFinanceData.fifty_day_avg.ilike(f'%{fifty_day_avg}%'))
-    if two_hundred_day_avg:
-        query = query.filter(YahooFinanceData.two_hundred_day_avg.ilike(f'%{two_hundred_day_avg}%'))
-    if year:
-        query = query.filter(YahooFinanceData.year == year)
-    if month:
-        query = query.filter(YahooFinanceData.month == month)
-    if day:
-        query = query.filter(YahooFinanceData.day == day)
-    if time:
-        query = query.filter(YahooFinanceData.time.ilike(f'%{time}%'))
+    if config.YAHOO_STORAGE == "delta":
+        # Filters, sorting and exports run on the typed columns of full rows, which the delta layout does not write
+        raise HTTPException(
+            status_code=501,
+            detail="Quotes are not served with YAHOO_STORAGE=delta; use /yahoofinance, /yahoofinance/{symbol}/history or /stream/quotes"
+        )
+    bounds = {
+        "change": (min_change, max_change),
+        "change_percent": (min_change_percent, max_change_percent),
+        "price": (min_price, max_price),
+        "ytd_return": (min_ytd_return, max_ytd_return),
+        "three_mo_return": (min_three_mo_return, max_three_mo_return),
+        "one_year": (min_one_year, max_one_year),
+        "three_year_return": (min_three_year_return, max_three_year_return),
+        "five_year_return": (min_five_year_return, max_five_year_return),
+        "net_expense_ratio": (min_net_expense_ratio, max_net_expense_ratio),
+        "gross_expense_ratio": (min_gross_expense_ratio, max_gross_expense_ratio),
+        "net_assets": (min_net_assets, max_net_assets),
+        "fifty_day_avg": (min_fifty_day_avg, max_fifty_day_avg),
+        "two_hundred_day_avg": (min_two_hundred_day_avg, max_two_hundred_day_avg),
+    }
+    ranges = {field: bound for field, bound in bounds.items() if bound != (None, None)}
+    if format in columnar_formats and pyarrow is None:
+        raise HTTPException(status_code=406, detail=f"format={format} requires pyarrow, which is not installed")
+    if format == "json":
+        limit = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    try:
+        query = yahoo_finance_query(
+            symbol=symbol, symbol_prefix=symbol_prefix, name=name, name_prefix=name_prefix,
+            ranges=ranges, year=year, month=month, day=day, since=since, until=until,
+            sort_by=sort_by, sort_order=sort_order,
+            after=decode_cursor(after, sort_by, sort_order) if after else None,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    if sort_by:
-        if sort_order == "desc":
-            query = query.order_by(getattr(YahooFinanceData, sort_by).desc())
-        else:
-            query = query.order_by(getattr(YahooFinanceData, sort_by).asc())
+    version = data_versions.get(YAHOO_FINANCE_DATA)
+    if format != "json":
+        # NDJSON streams the JSON records; the export formats stream typed columns
+        fields, headers = record_fields, None
+        if format != "ndjson":
+            fields, headers = export_fields, {"Content-Disposition": f'attachment; filename="quotes.{format}"'}
+        return await conditional_response(request, version, lambda: StreamingResponse(
+            stream_rows(select_fields(query, fields), writers[format]), media_type=media_types[format], headers=headers
+        ))
 
-    result = query.all()
-    session.close()
+    async def build():
+        # The cursor needs the id and sort value of the last row, selected after the record fields
+        cursor_columns = ["id"] + ([sortable_columns[sort_by]] if sort_by else [])
+        rows = (await db.execute(select_fields(query, record_fields, *cursor_columns))).all()
+        headers = {}
+        if len(rows) == limit:
+            headers["X-Next-Cursor"] = encode_cursor(sort_by, sort_order, rows[-1])
+        return json_body(records(rows), headers)
+    return await conditional_response(request, version, build)
 
-    # Convert SQLAlchemy objects to dictionaries
-    result_data = [
-        {
-            "Symbol": record.symbol,
-            "Name": record.name,
-            "Price (Intraday)": record.price_intraday,
-            "Change": record.change,
-            "Change %": record.change_percent,
-            "Volume": record.volume,
-            "YTD Return": record.ytd_return,
-            "3-Mo Return": record.three_mo_return,
-            "1-Year": record.one_year,
-            "3-Year Return": record.three_year_return,
-            "5-Year Return": record.five_year_return,
-            "Net Expense Ratio": record.net_expense_ratio,
-            "Gross Expense Ratio": record.gross_expense_ratio,
-            "Net Assets": record.net_assets,
-            "Morningstar Rating": record.morningstar_rating,
-            "50 Day Avg": record.fifty_day_avg,
-            "200 Day Avg": record.two_hundred_day_avg,
-            "timestamp": record.timestamp,
-            "year": record.year,
-            "month": record.month,
-            "day": record.day,
-            "time": record.time
-        }
-    for record in result]
-
-    return result_data
+@router.get("/yahoofinance/{symbol}/history", response_model=List[Dict[str, Any]])
+async def read_yahoo_finance_history(
+    request: Request,
+    symbol: str,
+    from_: Optional[datetime] = Query(None, alias="from", description="Start of the range, inclusive"),
+    to: Optional[datetime] = Query(None, description="End of the range, exclusive"),
+    interval: Optional[str] = Query(None, description="Bucket width such as 20s, 5m, 1h, 1d; chosen automatically when omitted"),
+    field: str = Query("price", description="Metric to aggregate"),
+    max_points: int = Query(500, ge=1, le=5000, description="Upper bound on buckets when interval is automatic"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    async def build():
+        options = dict(start=from_, end=to, interval=interval_seconds, field=field, max_points=max_points)
+        if history_in_python(from_):
+            # Delta replays, archive scans and Python bucketing block, so they run in a thread with their own session
+            return json_body(await asyncio.to_thread(load_yahoo_finance_history, symbol, **options))
+        return json_body(await db.run_sync(yahoo_finance_history, symbol, **options))
+    try:
+        interval_seconds = parse_interval(interval) if interval else None
+        return await conditional_response(request, data_versions.get(YAHOO_FINANCE_DATA), build)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
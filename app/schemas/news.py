@@ -18,10 +18,18 @@ class NewsArticle(BaseModel):
     content: str
 
     class Config:
-        orm_mode = True  # Ensure orm_mode is set to True to allow ORM objects
+        from_attributes = True  # Allow building from ORM objects (orm_mode in pydantic v1)
 
 class NewsArticleCreate(BaseModel):
     title: str
     source: str
     published_date: datetime
     content: str
+
+class NewsSearchResult(BaseModel):
+    id: int
+    title: str
+    source: str
+    published_date: datetime
+    snippet: str
+    rank: float  # BM25 score, lower is more relevant
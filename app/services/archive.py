@@ -0,0 +1,234 @@
+import asyncio
+import datetime
+import os
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Boolean, DateTime, Float, Integer, String, delete, select
+from sqlalchemy.orm import Session
+from app import config
+from app.db.database import session_scope
+from app.models.news import NewsArticle, ScraperState, YahooFinanceData, YahooFinanceDelta
+from app.services.data_version import NEWS_ARTICLES, YAHOO_FINANCE_DATA, bump_data_version
+from app.services.dedup import dedup_filters
+from app.services.delta_store import rebase_deltas
+from app.services.news_search import unindex_news_articles
+from app.services.scheduler import Job, utcnow
+
+try:
+    import pyarrow
+    import pyarrow.dataset
+    import pyarrow.fs
+    import pyarrow.parquet
+except ImportError:  # In requirements.txt; without it the retention job fails and every row stays in SQLite
+    pyarrow = None
+
+class ArchivedTable:
+    def __init__(self, model, date_column: str, sort_columns: List[str], version: Optional[str] = None):
+        self.model = model
+        self.name = model.__tablename__
+        self.date_column = date_column  # Ages rows and names their partition
+        self.sort_columns = sort_columns  # Row order in a file, so row-group statistics prune scans
+        self.version = version or self.name  # The data version its rows are served under
+
+YAHOO_FINANCE_DELTAS = YahooFinanceDelta.__tablename__
+
+archived_tables = {
+    YAHOO_FINANCE_DATA: ArchivedTable(YahooFinanceData, "observed_at", ["symbol", "observed_at"]),
+    # The delta layout's rows, replayed into the same quotes
+    YAHOO_FINANCE_DELTAS: ArchivedTable(YahooFinanceDelta, "observed_at", ["symbol", "observed_at"], YAHOO_FINANCE_DATA),
+    NEWS_ARTICLES: ArchivedTable(NewsArticle, "published_date", ["source", "published_date"])
+}
+
+def hot_cutoff(now: Optional[datetime.datetime] = None) -> datetime.datetime:
+    """Rows dated before this (naive UTC) belong in the archive."""
+    return (now or utcnow()) - datetime.timedelta(days=config.RETENTION_HOT_DAYS)
+
+def arrow_schema(model):
+    def arrow_type(column_type):
+        if isinstance(column_type, Boolean):
+            return pyarrow.bool_()
+        if isinstance(column_type, Integer):
+            return pyarrow.int64()
+        if isinstance(column_type, Float):
+            return pyarrow.float64()
+        if isinstance(column_type, DateTime):
+            return pyarrow.timestamp("us")
+        if isinstance(column_type, String):
+            return pyarrow.string()
+        raise TypeError(f"No Arrow type for {column_type!r}")
+    return pyarrow.schema([(column.name, arrow_type(column.type)) for column in model.__table__.columns])
+
+def table_dir(table: str) -> str:
+    return os.path.join(config.ARCHIVE_DIR, table)
+
+def write_partition(archived: ArchivedTable, day: datetime.date, rows: List[dict]):
+    # Named after the ids it holds: archiving the same batch again after a crash overwrites it
+    directory = os.path.join(table_dir(archived.name), f"date={day.isoformat()}")
+    os.makedirs(directory, exist_ok=True)
+    name = f"part-{rows[0]['id']}-{rows[-1]['id']}.parquet"
+    temporary = os.path.join(directory, f".{name}.tmp")  # Dot files are skipped by dataset discovery
+    data = pyarrow.Table.from_pylist(rows, schema=arrow_schema(archived.model))
+    data = data.sort_by([(column, "ascending") for column in archived.sort_columns])
+    pyarrow.parquet.write_table(data, temporary, compression="zstd", row_group_size=config.ARCHIVE_ROW_GROUP_SIZE)
+    os.replace(temporary, os.path.join(directory, name))
+
+def archive_batch(session: Session, archived: ArchivedTable, cutoff: datetime.datetime, batch_size: int) -> int:
+    """Move up to ``batch_size`` rows dated before ``cutoff`` to Parquet; returns how many.
+
+    The files are written before the rows are deleted, so a crash in between
+    leaves them in SQLite to be archived again, never in neither tier. The
+    dedup filter forgets the rows' hashes: a quote or article that comes
+    back unchanged must be stored in SQLite again, not skipped as recent.
+    """
+    model = archived.model
+    date_column = getattr(model, archived.date_column)
+    rows = session.execute(
+        select(model.__table__).where(date_column < cutoff).order_by(model.id).limit(batch_size)
+    ).mappings().all()
+    if not rows:
+        return 0
+    days: Dict[datetime.date, List[dict]] = {}
+    for row in rows:
+        days.setdefault(row[archived.date_column].date(), []).append(dict(row))
+    for day, day_rows in days.items():
+        write_partition(archived, day, day_rows)
+    ids = [row["id"] for row in rows]
+    if model is NewsArticle:
+        unindex_news_articles(session, ids)  # The search index reads the rows it removes
+    if model is YahooFinanceDelta:
+        rebase_deltas(session, {row["symbol"]: row["id"] for row in rows})  # The rows left must replay on their own
+    session.execute(delete(model).where(model.id.in_(ids)))
+    bump_data_version(session, archived.version)
+    if archived.name in dedup_filters:
+        dedup_filters[archived.name].forget(row["hash"] for row in rows)
+    return len(rows)
+
+def run_retention(now: Optional[datetime.datetime] = None) -> Dict[str, int]:
+    """Archive every row older than the hot window; blocking. Returns rows moved per table."""
+    cutoff = hot_cutoff(now)
+    moved = {}
+    for table, archived in archived_tables.items():
+        moved[table] = 0
+        while True:
+            # One transaction per batch keeps the writer free for ingest in between
+            with session_scope() as session:
+                count = archive_batch(session, archived, cutoff, config.RETENTION_BATCH_SIZE)
+            moved[table] += count
+            if count < config.RETENTION_BATCH_SIZE:
+                break
+    return moved
+
+async def retention(state: ScraperState) -> None:
+    if pyarrow is None:
+        # Fail the job, so its backoff, error and failure count show that nothing is being archived
+        raise RuntimeError("Retention needs pyarrow, which is not installed; set RETENTION_HOT_DAYS=0 to keep every row in SQLite")
+    moved = await asyncio.to_thread(run_retention)
+    for table, count in moved.items():
+        if count:
+            print(f"Archived {count} {table} rows older than {config.RETENTION_HOT_DAYS:g} days")
+
+retention_job = Job("retention", retention, config.RETENTION_INTERVAL_SECONDS)
+
+def archive_dataset(table: str):
+    """The table's archive as a hive-partitioned dataset read through memory maps, or None."""
+    directory = table_dir(table)
+    if pyarrow is None or not os.path.isdir(directory):
+        return None
+    return pyarrow.dataset.dataset(
+        directory,
+        schema=arrow_schema(archived_tables[table].model).append(pyarrow.field("date", pyarrow.string())),
+        format="parquet",
+        partitioning=pyarrow.dataset.partitioning(pyarrow.schema([("date", pyarrow.string())]), flavor="hive"),
+        filesystem=pyarrow.fs.LocalFileSystem(use_mmap=True)
+    )
+
+def scan_archive(
+    table: str,
+    columns: List[str],
+    filter=None,
+    first_day: Optional[datetime.date] = None,
+    last_day: Optional[datetime.date] = None
+):
+    """Read only ``columns``, only from the partitions in [first_day, last_day]; None without an archive.
+
+    ``filter`` is a pyarrow.dataset expression, checked against row-group
+    statistics before any row is decoded.
+    """
+    dataset = archive_dataset(table)
+    if dataset is None:
+        return None
+    expression = filter
+    for bound in (
+        pyarrow.dataset.field("date") >= first_day.isoformat() if first_day else None,
+        pyarrow.dataset.field("date") <= last_day.isoformat() if last_day else None
+    ):
+        if bound is not None:
+            expression = bound if expression is None else expression & bound
+    return dataset.to_table(columns=columns, filter=expression)
+
+def archive_reaches(table: str, start: Optional[datetime.datetime]) -> bool:
+    """Whether a query from ``start`` (naive UTC, None for the beginning) may need archived rows."""
+    return pyarrow is not None and (start is None or start < hot_cutoff()) and os.path.isdir(table_dir(table))
+
+def archived_quote_samples(
+    symbol: str, value_column: str, start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None
+) -> List[Tuple[datetime.datetime, float]]:
+    """(observed_at, value) of a symbol's archived quotes in [start, end), bounds in naive UTC."""
+    field = pyarrow.dataset.field
+    expression = (field("symbol") == symbol) & field(value_column).is_valid()
+    if start:
+        expression &= field("observed_at") >= start
+    if end:
+        expression &= field("observed_at") < end
+    data = scan_archive(
+        YAHOO_FINANCE_DATA, ["observed_at", value_column], expression, start.date() if start else None, end.date() if end else None
+    )
+    if data is None:
+        return []
+    return list(zip(data.column("observed_at").to_pylist(), data.column(value_column).to_pylist()))
+
+def archived_deltas(symbol: str, end: Optional[datetime.datetime] = None) -> List[Tuple[datetime.datetime, str]]:
+    """(observed_at, changes) of a symbol's archived deltas before ``end`` (naive UTC), oldest first.
+
+    They start at the symbol's first delta, a keyframe, so they replay on
+    their own; the rows still in SQLite carry on from there.
+    """
+    field = pyarrow.dataset.field
+    expression = field("symbol") == symbol
+    if end:
+        expression &= field("observed_at") < end
+    data = scan_archive(YAHOO_FINANCE_DELTAS, ["id", "observed_at", "changes"], expression, None, end.date() if end else None)
+    if data is None:
+        return []
+    rows = sorted(zip(data.column("observed_at").to_pylist(), data.column("id").to_pylist(), data.column("changes").to_pylist()))
+    return [(observed_at, changes) for observed_at, _, changes in rows]
+
+def archived_news(
+    limit: int, source: Optional[str] = None, before: Optional[datetime.datetime] = None, since: Optional[datetime.datetime] = None
+) -> List[dict]:
+    """Newest archived articles first within (since, before), reading one day's partition at a time."""
+    dataset = archive_dataset(NEWS_ARTICLES)
+    if dataset is None:
+        return []
+    days = sorted((name[5:] for name in os.listdir(table_dir(NEWS_ARTICLES)) if name.startswith("date=")), reverse=True)
+    field = pyarrow.dataset.field
+    expression = field("published_date").is_valid()
+    if source:
+        expression &= field("source") == source
+    if before:
+        expression &= field("published_date") < before
+    if since:
+        expression &= field("published_date") > since
+    articles = []
+    for day in days:
+        if before and day > before.date().isoformat():
+            continue
+        if since and day < since.date().isoformat():
+            break
+        rows = dataset.to_table(
+            columns=["id", "title", "source", "published_date", "content"], filter=expression & (field("date") == day)
+        ).to_pylist()
+        rows.sort(key=lambda row: row["published_date"], reverse=True)
+        articles.extend(rows[:limit - len(articles)])
+        if len(articles) >= limit:
+            break
+    return articles
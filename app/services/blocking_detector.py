@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import Counter, deque
+from typing import Any, Dict, Optional
+from prometheus_client import Histogram
+from starlette.types import Scope
+from app import config
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "How late event-loop timers fire",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+EVENT_LOOP_BLOCKED = Histogram(
+    "event_loop_blocked_seconds", "Duration of event-loop stalls longer than the blocking threshold", ["endpoint"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAX_STACK_FRAMES = 20
+MAX_OFFENDERS = 200
+
+class BlockingDetector:
+    """Reports when something runs on the event loop for longer than ``threshold``.
+
+    A heartbeat task ticks every ``interval`` seconds and records how late it
+    wakes up. A watchdog thread notices when the heartbeat is overdue and
+    captures the loop thread's stack at that moment, which points at the
+    synchronous code holding the loop. The request it belongs to, if any, is
+    known through ``BlockingMiddleware``.
+    """
+
+    def __init__(self, threshold: float, interval: float = 0.02, history: int = 50):
+        self.threshold = threshold
+        self.interval = interval
+        self.enabled = False
+        self.episodes: deque = deque(maxlen=history)
+        self.slow_callbacks: deque = deque(maxlen=history)
+        self.offenders: Counter = Counter()  # "file:line in function" -> episodes
+        self.blocked_seconds_total = 0.0
+        self._requests: "weakref.WeakKeyDictionary[asyncio.Task, Scope]" = weakref.WeakKeyDictionary()
+        self._last_tick = time.monotonic()
+        self._pending: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._loop.slow_callback_duration = self.threshold  # Used by asyncio's debug mode
+        if config.BLOCKING_DETECTOR_ASYNCIO_DEBUG:
+            # asyncio then names every slow callback; it adds overhead to each one
+            self._loop.set_debug(True)
+            logging.getLogger("asyncio").addHandler(_SlowCallbackHandler(self))
+        self.enabled = True
+        self._stop.clear()
+        self._last_tick = time.monotonic()
+        self._heartbeat = asyncio.create_task(self._beat())
+        threading.Thread(target=self._watch, name="blocking-detector", daemon=True).start()
+
+    def stop(self):
+        self.enabled = False
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+
+    def track(self, scope: Scope):
+        task = asyncio.current_task()
+        if task is not None:
+            self._requests[task] = scope
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._last_tick = now
+            EVENT_LOOP_LAG.observe(lag)
+            if lag >= self.threshold:
+                self._finish_episode(lag)
+            elif self._pending is not None:
+                with self._lock:
+                    self._pending = None  # Caught a stall that ended just under the threshold
+
+    def _watch(self):
+        # Runs in its own thread, so it keeps running while the loop is stuck
+        armed = True
+        while not self._stop.wait(self.threshold / 2):
+            overdue = time.monotonic() - self._last_tick - self.interval
+            if overdue < self.threshold:
+                armed = True
+            elif armed:
+                armed = False  # One stack per stall
+                self._capture()
+
+    def _capture(self):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame)[-MAX_STACK_FRAMES:]
+        task = asyncio.current_task(self._loop)
+        scope = self._requests.get(task) if task is not None else None
+        route = scope.get("route") if scope else None
+        with self._lock:
+            self._pending = {
+                "task": task.get_name() if task is not None else None,
+                "request": f"{scope['method']} {scope['path']}" if scope else None,
+                "endpoint": getattr(route, "path", "<unmatched>") if scope else "background",
+                "location": _app_location(stack),
+                "stack": traceback.format_list(stack)
+            }
+
+    def _finish_episode(self, duration: float):
+        with self._lock:
+            episode, self._pending = self._pending, None
+        if episode is None:
+            # Shorter than the watchdog's poll, so no stack was taken
+            episode = {"task": None, "request": None, "endpoint": "unknown", "location": None, "stack": []}
+        episode = {"blocked_seconds": round(duration, 4), "ended_at": time.time(), **episode}
+        self.episodes.append(episode)
+        self.blocked_seconds_total += duration
+        EVENT_LOOP_BLOCKED.labels(endpoint=episode["endpoint"]).observe(duration)
+        if episode["location"]:
+            if episode["location"] in self.offenders or len(self.offenders) < MAX_OFFENDERS:
+                self.offenders[episode["location"]] += 1
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "threshold_seconds": self.threshold,
+            "episodes": len(self.episodes),
+            "blocked_seconds_total": round(self.blocked_seconds_total, 4),
+            "top_offenders": [{"location": location, "episodes": count} for location, count in self.offenders.most_common(20)],
+            "recent": list(reversed(self.episodes)),
+            "slow_callbacks": list(reversed(self.slow_callbacks))
+        }
+
+def _app_location(stack: traceback.StackSummary) -> Optional[str]:
+    # The innermost frame in our own code, rather than in SQLAlchemy, lxml or our middleware
+    for frame in reversed(stack):
+        if frame.filename.startswith(APP_ROOT) and not frame.filename.endswith("middleware.py"):
+            return f"{os.path.relpath(frame.filename, os.path.dirname(APP_ROOT))}:{frame.lineno} in {frame.name}"
+    return None
+
+class _SlowCallbackHandler(logging.Handler):
+    # asyncio debug mode logs "Executing <Handle ...> took 0.250 seconds"
+    def __init__(self, detector: BlockingDetector):
+        super().__init__(logging.WARNING)
+        self.detector = detector
+
+    def emit(self, record: logging.LogRecord):
+        message = record.getMessage()
+        if message.startswith("Executing "):
+            self.detector.slow_callbacks.append({"message": message, "at": record.created})
+
+blocking_detector = BlockingDetector(config.BLOCKING_THRESHOLD_SECONDS)
@@ -0,0 +1,135 @@
+import asyncio
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, NamedTuple, Optional, Set, Tuple
+import orjson
+from app import config
+
+QUOTES = "quotes"
+NEWS = "news"
+
+class Event(NamedTuple):
+    topic: str
+    key: Hashable  # What subscribers filter on: the symbol of a quote, the source of an article
+    id: int
+    data: bytes  # JSON, encoded once for every subscriber
+
+_CLOSED = None  # Queued to end a subscription
+
+class Subscription:
+    """One client's view of a topic: a bounded queue of matching events.
+
+    When the queue is full the ``drop_oldest`` policy discards the oldest
+    event and counts it in ``dropped``; ``disconnect`` ends the subscription
+    so the client reconnects and catches up over the REST endpoints.
+    """
+
+    def __init__(self, broadcaster: "Broadcaster", topic: str, keys: Optional[Set[Hashable]], max_queue: int):
+        self.broadcaster = broadcaster
+        self.topic = topic
+        self.keys = keys
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.dropped = 0
+        self.closed = False
+
+    def offer(self, event: Event):
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+            return
+        except asyncio.QueueFull:
+            pass
+        if self.broadcaster.slow_consumer_policy == "disconnect":
+            self.close()
+            return
+        self.queue.get_nowait()
+        self.queue.put_nowait(event)
+        self.dropped += 1
+
+    def take_dropped(self) -> int:
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Next event; None once closed. Raises asyncio.TimeoutError after ``timeout``."""
+        if self.closed and self.queue.empty():
+            return None
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.broadcaster.unsubscribe(self)
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_CLOSED)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class Broadcaster:
+    """Fans events out to subscribers in this process without touching the database.
+
+    Subscribers are indexed by the keys they filter on, so an event only
+    visits the subscribers that want it. ``publish`` may be called from any
+    thread; fan-out always runs on the event loop the subscribers live on.
+    """
+
+    def __init__(self, max_queue: int, slow_consumer_policy: str = "drop_oldest"):
+        self.max_queue = max_queue
+        self.slow_consumer_policy = slow_consumer_policy
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # topic -> filter key (None for unfiltered subscribers) -> subscriptions
+        self._subscribers: Dict[str, Dict[Optional[Hashable], Set[Subscription]]] = defaultdict(lambda: defaultdict(set))
+
+    def subscribe(self, topic: str, keys: Optional[Iterable[Hashable]] = None) -> Subscription:
+        self._loop = asyncio.get_running_loop()
+        keys = set(keys) if keys else None
+        subscription = Subscription(self, topic, keys, self.max_queue)
+        for key in keys or [None]:
+            self._subscribers[topic][key].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        by_key = self._subscribers[subscription.topic]
+        for key in subscription.keys or [None]:
+            by_key[key].discard(subscription)
+            if not by_key[key]:
+                del by_key[key]
+
+    def subscriber_count(self, topic: str) -> int:
+        return len(set().union(*self._subscribers[topic].values())) if self._subscribers.get(topic) else 0
+
+    def publish(self, topic: str, items: Iterable[Tuple[Hashable, int, Any]]):
+        """Queue ``(key, id, payload)`` items for the topic's subscribers."""
+        loop = self._loop
+        if loop is None or not self._subscribers.get(topic) or loop.is_closed():
+            return  # Nobody is listening
+        events = [Event(topic, key, event_id, orjson.dumps(payload)) for key, event_id, payload in items]
+        if not events:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fan_out(topic, events)
+        else:
+            loop.call_soon_threadsafe(self._fan_out, topic, events)
+
+    def _fan_out(self, topic: str, events: List[Event]):
+        by_key = self._subscribers.get(topic)
+        if not by_key:
+            return
+        everyone = list(by_key.get(None, ()))
+        for event in events:
+            for subscription in everyone:
+                subscription.offer(event)
+            for subscription in list(by_key.get(event.key, ())):
+                subscription.offer(event)
+
+broadcaster = Broadcaster(config.STREAM_QUEUE_SIZE, config.STREAM_SLOW_CONSUMER_POLICY)
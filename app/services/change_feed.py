@@ -0,0 +1,102 @@
+import asyncio
+from typing import Callable, Dict, List, Set, Tuple
+import orjson
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app import config
+from app.db.database import ReadSessionLocal
+from app.models.news import DataVersion, NewsArticle, YahooFinanceData, YahooFinanceDelta
+from app.services.broadcaster import NEWS, QUOTES, broadcaster
+from app.services.data_version import NEWS_ARTICLES, YAHOO_FINANCE_DATA, data_versions
+from app.services.delta_store import fields_before
+from app.services.export import record_fields, records, select_fields
+from app.services.yahoo_finance import delta_record
+
+def quote_events(db: Session, after_id: int, limit: int) -> List[Tuple[str, int, dict]]:
+    rows = db.execute(
+        select_fields(select(YahooFinanceData), record_fields, "id")
+        .where(YahooFinanceData.id > after_id).order_by(YahooFinanceData.id).limit(limit)
+    ).all()
+    return [(record["Symbol"], row.id, record) for row, record in zip(rows, records(rows))]
+
+def delta_quote_events(db: Session, after_id: int, limit: int) -> List[Tuple[str, int, dict]]:
+    # The delta layout: each row's changes are applied to the symbol's fields before it
+    rows = db.execute(
+        select(YahooFinanceDelta.id, YahooFinanceDelta.symbol, YahooFinanceDelta.observed_at, YahooFinanceDelta.changes)
+        .where(YahooFinanceDelta.id > after_id).order_by(YahooFinanceDelta.id).limit(limit)
+    ).all()
+    fields = {}
+    events = []
+    for row in rows:
+        if row.symbol not in fields:
+            fields[row.symbol] = fields_before(db, row.symbol, row.id)
+        fields[row.symbol].update(orjson.loads(row.changes))
+        record = delta_record(row.symbol, row.observed_at, fields[row.symbol])
+        events.append((row.symbol, row.id, {key: record[column] for key, column in record_fields.items()}))
+    return events
+
+def article_events(db: Session, after_id: int, limit: int) -> List[Tuple[str, int, dict]]:
+    rows = db.execute(
+        select(NewsArticle.id, NewsArticle.title, NewsArticle.source, NewsArticle.published_date, NewsArticle.content)
+        .where(NewsArticle.id > after_id).order_by(NewsArticle.id).limit(limit)
+    ).all()
+    return [(row.source, row.id, row._asdict()) for row in rows]
+
+# Table -> (model, stream topic, events for the rows after an id)
+followed_tables = {
+    YAHOO_FINANCE_DATA: (YahooFinanceDelta, QUOTES, delta_quote_events) if config.YAHOO_STORAGE == "delta"
+    else (YahooFinanceData, QUOTES, quote_events),
+    NEWS_ARTICLES: (NewsArticle, NEWS, article_events)
+}
+
+class ChangeFeed:
+    """Follows what the ingest worker commits, from inside each API process.
+
+    Ingest runs in another process, so this polls the small ``data_versions``
+    table: a changed version refreshes the local copy behind ETags and, when
+    someone is streaming that topic, publishes the rows added since the last
+    poll in the shape the REST endpoints serve.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = ReadSessionLocal, batch_size: int = 1000):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self._last_ids: Dict[str, int] = {}
+
+    def listening(self) -> Set[str]:
+        # Call on the event loop: subscriptions come and go there, so a worker thread must not read them
+        return {topic for _, topic, _ in followed_tables.values() if broadcaster.subscriber_count(topic)}
+
+    def poll(self, listening: Set[str] = frozenset()):
+        """Blocking, runs in a worker thread; ``listening`` are the streamed topics, from ``listening()``."""
+        with self.session_factory() as db:
+            versions = dict(db.execute(select(DataVersion.table_name, DataVersion.version)).all())
+            for table in data_versions.update(versions):
+                if table in followed_tables:
+                    self._publish_new_rows(db, table, listening)
+
+    def _publish_new_rows(self, db: Session, table: str, listening: Set[str]):
+        model, topic, events = followed_tables[table]
+        last_id = self._last_ids.get(table)
+        if last_id is None or topic not in listening:
+            # Nothing to replay on the first poll, nor with nobody listening
+            self._last_ids[table] = db.execute(select(func.max(model.id))).scalar() or 0
+            return
+        while True:
+            batch = events(db, last_id, self.batch_size)
+            if batch:
+                broadcaster.publish(topic, batch)
+                last_id = batch[-1][1]
+            if len(batch) < self.batch_size:
+                break
+        self._last_ids[table] = last_id
+
+    async def follow(self, interval: float = config.CHANGE_FEED_INTERVAL_SECONDS):
+        while True:
+            try:
+                await asyncio.to_thread(self.poll, self.listening())
+            except Exception as e:
+                print(f"Error following data changes: {e}")
+            await asyncio.sleep(interval)
+
+change_feed = ChangeFeed()
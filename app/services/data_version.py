@@ -0,0 +1,40 @@
+import time
+from typing import Dict, List
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+from app.models.news import DataVersion
+
+NEWS_ARTICLES = "news_articles"
+YAHOO_FINANCE_DATA = "yahoo_finance_data"
+
+def bump_data_version(session: Session, table: str):
+    """Advance ``table``'s version inside the caller's transaction."""
+    versions = DataVersion.__table__
+    updated = session.execute(
+        update(versions).where(versions.c.table_name == table).values(version=versions.c.version + 1)
+    )
+    if not updated.rowcount:
+        # Start from the clock so a recreated database never reissues an old version
+        session.execute(insert(versions).values(table_name=table, version=int(time.time() * 1000)))
+
+class DataVersions:
+    """This process's view of the ``data_versions`` table.
+
+    Versions live in the database, so every API process and the ingest worker
+    agree on them and an ETag stays valid across restarts. The change feed
+    refreshes this copy; reads never touch the database.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+
+    def get(self, table: str) -> str:
+        return str(self._versions.get(table, 0))
+
+    def update(self, versions: Dict[str, int]) -> List[str]:
+        """Replace the known versions and return the tables that changed."""
+        changed = [table for table, version in versions.items() if self._versions.get(table) != version]
+        self._versions = dict(versions)
+        return changed
+
+data_versions = DataVersions()
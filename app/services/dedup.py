@@ -0,0 +1,231 @@
+import math
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, NamedTuple, Sequence
+from prometheus_client import Counter, Gauge
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+from app import config
+from app.db.database import ReadSessionLocal
+from app.models.news import NewsArticle, YahooFinanceData
+from app.services.data_version import NEWS_ARTICLES, YAHOO_FINANCE_DATA
+from app.services.ingest import existing_hashes
+
+DEDUP_LOOKUPS = Counter(
+    "ingest_dedup_total", "Scraped rows by what the dedup filter knew about their hash", ["table", "result"]
+)
+DEDUP_MEMORY = Gauge(
+    "ingest_dedup_memory_bytes", "Memory held by the dedup filter", ["table"], multiprocess_mode="livemax"
+)
+
+class BloomFilter:
+    """Set membership with no false negatives and about ``error_rate`` false positives.
+
+    Row hashes are already SHA-256 hex digests, so the bit positions come
+    straight from the digest (double hashing over its two leading 64-bit
+    words) instead of hashing again.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest: str) -> List[int]:
+        h1 = int(digest[:16], 16)
+        h2 = int(digest[16:32], 16) | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, digest: str):
+        bits = self.bits
+        for position in self._positions(digest):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, digest: str) -> bool:
+        bits = self.bits
+        for position in self._positions(digest):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self.bits)
+
+class ScalableBloomFilter:
+    """Bloom filters that grow: once one is full a twice as large one is added.
+
+    Each new filter gets a tighter error rate, so the combined rate stays
+    under ``error_rate`` however many hashes are added.
+    """
+
+    def __init__(self, initial_capacity: int, error_rate: float):
+        self.error_rate = error_rate
+        self.filters = [BloomFilter(initial_capacity, error_rate / 2)]
+
+    def add(self, digest: str):
+        current = self.filters[-1]
+        if current.count >= current.capacity:
+            current = BloomFilter(current.capacity * 2, self.error_rate / 2 ** (len(self.filters) + 1))
+            self.filters.append(current)
+        current.add(digest)
+
+    def __contains__(self, digest: str) -> bool:
+        return any(digest in bloom for bloom in reversed(self.filters))
+
+    @property
+    def count(self) -> int:
+        return sum(bloom.count for bloom in self.filters)
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(bloom.memory_bytes for bloom in self.filters)
+
+class Candidates(NamedTuple):
+    definitely_new: List[int]  # Rows the Bloom filter has never seen, or all rows before warming
+    maybe_seen: List[int]  # Rows it may have seen, to look up in the table before inserting
+
+class DedupFilter:
+    """Decides which scraped rows reach the insert.
+
+    A bounded LRU of recently stored hashes answers exactly for the rows a
+    re-scrape sees again; those are dropped. A Bloom filter over every hash
+    in the table splits the rest: rows it calls "definitely new" go straight
+    to the insert, and rows it calls "maybe seen" are first looked up on the
+    unique hash index, so only the ones the table lacks (Bloom false
+    positives, or rows that came back after archiving) are inserted. Rows
+    that are already stored never reach the insert, and none is ever lost.
+
+    Until ``warm`` has loaded the table the filter knows nothing about it and
+    passes every row through to the insert, where the unique index decides.
+    """
+
+    def __init__(self, table: str, recent_size: int, capacity: int, error_rate: float):
+        self.table = table
+        self.recent_size = recent_size
+        self.recent: "OrderedDict[str, None]" = OrderedDict()
+        self.bloom = ScalableBloomFilter(capacity, error_rate)
+        self.recent_hits = 0
+        self.definitely_new = 0
+        self.maybe_seen = 0
+        self.false_positives = 0
+        self.warmed = False
+        self._lock = threading.Lock()  # Pages are stored from several ingest threads
+
+    def warm(self, digests: Iterable[str]):
+        """Load hashes already in the table, oldest first so the newest stay in the LRU."""
+        with self._lock:
+            for digest in digests:
+                self.bloom.add(digest)
+                self._remember_recent(digest)
+            self.warmed = True
+        DEDUP_MEMORY.labels(table=self.table).set(self.memory_bytes)
+
+    def _remember_recent(self, digest: str):
+        recent = self.recent
+        if digest in recent:
+            recent.move_to_end(digest)
+            return
+        recent[digest] = None
+        if len(recent) > self.recent_size:
+            recent.popitem(last=False)
+
+    def candidates(self, digests: Sequence[str]) -> Candidates:
+        """The rows that may be new; the others were stored recently."""
+        if not self.warmed:
+            return Candidates(list(range(len(digests))), [])
+        new, maybe = [], []
+        hits = 0
+        with self._lock:
+            for index, digest in enumerate(digests):
+                if digest in self.recent:
+                    self.recent.move_to_end(digest)
+                    hits += 1
+                elif digest in self.bloom:
+                    maybe.append(index)
+                else:
+                    new.append(index)
+            self.recent_hits += hits
+            self.definitely_new += len(new)
+            self.maybe_seen += len(maybe)
+        DEDUP_LOOKUPS.labels(table=self.table, result="recent_hit").inc(hits)
+        DEDUP_LOOKUPS.labels(table=self.table, result="definitely_new").inc(len(new))
+        DEDUP_LOOKUPS.labels(table=self.table, result="maybe_seen").inc(len(maybe))
+        return Candidates(new, maybe)
+
+    def new_rows(self, session: Session, model, digests: Sequence[str]) -> List[int]:
+        """Indexes of the rows to insert into ``model``'s table, in order.
+
+        Maybe-seen rows are looked up in the table with ``session``; the ones
+        it lacks were Bloom false positives.
+        """
+        candidates = self.candidates(digests)
+        if not candidates.maybe_seen:
+            return candidates.definitely_new
+        stored = existing_hashes(session, model, [digests[index] for index in candidates.maybe_seen])
+        missing = [index for index in candidates.maybe_seen if digests[index] not in stored]
+        with self._lock:
+            self.false_positives += len(missing)
+        DEDUP_LOOKUPS.labels(table=self.table, result="false_positive").inc(len(missing))
+        return sorted(candidates.definitely_new + missing)
+
+    def stored(self, digests: Sequence[str]):
+        """Record a committed batch: every digest in it is now in the table."""
+        if not self.warmed:
+            return
+        with self._lock:
+            for digest in digests:
+                if digest not in self.recent and digest not in self.bloom:
+                    self.bloom.add(digest)
+                self._remember_recent(digest)
+        DEDUP_MEMORY.labels(table=self.table).set(self.memory_bytes)
+
+    def forget(self, digests: Iterable[str]):
+        """Record rows that left the table, e.g. for the archive, so a scrape that sees them again stores them.
+
+        A Bloom filter cannot drop a hash, so those rows come back as maybe
+        seen and are found missing from the table, like a false positive.
+        """
+        with self._lock:
+            for digest in digests:
+                self.recent.pop(digest, None)
+
+    @property
+    def memory_bytes(self) -> int:
+        # The LRU's dict slots and the 64-character digests it keeps alive, plus the bit arrays
+        return len(self.recent) * (8 * 3 + 113) + self.bloom.memory_bytes
+
+    def stats(self) -> dict:
+        return {
+            "recent_hits": self.recent_hits,
+            "definitely_new": self.definitely_new,
+            "maybe_seen": self.maybe_seen,
+            "false_positives": self.false_positives,
+            "recent_size": len(self.recent),
+            "bloom_hashes": self.bloom.count,
+            "bloom_filters": len(self.bloom.filters),
+            "memory_bytes": self.memory_bytes
+        }
+
+yahoo_finance_dedup = DedupFilter(
+    YAHOO_FINANCE_DATA, config.DEDUP_RECENT_SIZE, config.DEDUP_BLOOM_CAPACITY, config.DEDUP_ERROR_RATE
+)
+news_dedup = DedupFilter(NEWS_ARTICLES, config.DEDUP_RECENT_SIZE, config.DEDUP_BLOOM_CAPACITY, config.DEDUP_ERROR_RATE)
+dedup_filters = {YAHOO_FINANCE_DATA: yahoo_finance_dedup, NEWS_ARTICLES: news_dedup}
+
+def warm_dedup_filters(session_factory: sessionmaker = ReadSessionLocal):
+    """Load every stored hash into the filters; blocking, run it before the scrapers start."""
+    tables = [(news_dedup, NewsArticle)]
+    if config.YAHOO_STORAGE != "delta":  # The delta layout diffs scrapes against each symbol's state instead
+        tables.append((yahoo_finance_dedup, YahooFinanceData))
+    for dedup, model in tables:
+        with session_factory() as session:
+            hashes = session.execute(select(model.hash).order_by(model.id).execution_options(yield_per=10000))
+            dedup.warm(hashes.scalars())
+        stats = dedup.stats()
+        print(f"Dedup filter for {dedup.table}: {stats['bloom_hashes']} hashes, {stats['memory_bytes'] / 2 ** 20:.1f} MiB")
@@ -0,0 +1,200 @@
+import asyncio
+import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+import orjson
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+from app import config
+from app.db.database import session_scope
+from app.models.news import ScraperState, YahooFinanceDelta, YahooFinanceState
+from app.services.data_version import YAHOO_FINANCE_DATA, bump_data_version
+from app.services.ingest import IngestResult
+from app.services.scheduler import Job, utcnow
+
+# Scraped fields of a YahooFinanceData record that deltas carry; the timestamp strings and
+# typed values of a record derive from these and observed_at
+delta_fields = [
+    "name", "change", "change_percent", "price_intraday", "ytd_return", "three_mo_return", "one_year",
+    "three_year_return", "five_year_return", "net_expense_ratio", "gross_expense_ratio", "net_assets",
+    "fifty_day_avg", "two_hundred_day_avg"
+]
+
+def store_deltas(session: Session, records: List[Dict[str, Any]]) -> IngestResult:
+    """Write only the fields each record changed since its symbol's stored state.
+
+    A symbol's first row, and then every YAHOO_DELTA_KEYFRAME_INTERVAL-th
+    one, is a keyframe holding every field, so a read never replays more
+    rows than that. Records that change nothing are skipped.
+    """
+    symbols = {record["symbol"] for record in records}
+    states = {
+        state.symbol: state
+        for state in session.scalars(select(YahooFinanceState).where(YahooFinanceState.symbol.in_(symbols)))
+    }
+    current = {symbol: orjson.loads(state.data) for symbol, state in states.items()}
+    rows = []
+    for record in records:
+        symbol = record["symbol"]
+        fields = {field: record[field] for field in delta_fields}
+        state = states.get(symbol)
+        if state is None:
+            state = states[symbol] = YahooFinanceState(symbol=symbol, deltas_since_keyframe=0)
+            session.add(state)
+            changes, keyframe = fields, True
+        else:
+            previous = current[symbol]
+            changes = {field: value for field, value in fields.items() if previous.get(field) != value}
+            if not changes:
+                continue
+            keyframe = state.deltas_since_keyframe + 1 >= config.YAHOO_DELTA_KEYFRAME_INTERVAL
+            if keyframe:
+                changes = fields
+        state.deltas_since_keyframe = 0 if keyframe else state.deltas_since_keyframe + 1
+        state.observed_at = record["observed_at"]
+        current[symbol] = fields
+        rows.append({
+            "symbol": symbol, "observed_at": record["observed_at"], "keyframe": keyframe,
+            "changes": orjson.dumps(changes).decode()
+        })
+    if not rows:
+        return IngestResult(0, len(records), [])
+    for symbol in {row["symbol"] for row in rows}:
+        states[symbol].data = orjson.dumps(current[symbol]).decode()
+    ids = list(session.scalars(insert(YahooFinanceDelta).returning(YahooFinanceDelta.id), rows))
+    return IngestResult(len(ids), len(records) - len(ids), ids)
+
+def replay(db: Session, symbol: str, start: datetime.datetime = None, end: datetime.datetime = None
+           ) -> Iterator[Tuple[datetime.datetime, Dict[str, Any]]]:
+    """A symbol's fields as of every stored scrape in [start, end), oldest first.
+
+    Bounds are naive UTC. Replay starts at the last keyframe at or before
+    ``start``, so the rows before it are never read.
+    """
+    delta = YahooFinanceDelta
+    conditions = [delta.symbol == symbol]
+    if start is not None:
+        keyframe_at = db.execute(
+            select(delta.observed_at)
+            .where(delta.symbol == symbol, delta.keyframe.is_(True), delta.observed_at <= start)
+            .order_by(delta.observed_at.desc()).limit(1)
+        ).scalar()
+        if keyframe_at is not None:
+            conditions.append(delta.observed_at >= keyframe_at)
+    if end is not None:
+        conditions.append(delta.observed_at < end)
+    yield from replay_rows(
+        db.execute(select(delta.observed_at, delta.changes).where(*conditions).order_by(delta.observed_at, delta.id)), start
+    )
+
+def replay_rows(rows: Iterable[Tuple[datetime.datetime, str]], start: datetime.datetime = None
+                ) -> Iterator[Tuple[datetime.datetime, Dict[str, Any]]]:
+    """Fold (observed_at, changes) rows, oldest first and from a keyframe, into the fields as of each one from ``start``."""
+    fields = {}
+    for observed_at, changes in rows:
+        fields.update(orjson.loads(changes))
+        if start is None or observed_at >= start:
+            yield observed_at, dict(fields)
+
+def fields_before(db: Session, symbol: str, delta_id: int) -> Dict[str, Any]:
+    """A symbol's fields as of the row before ``delta_id``, empty if there is none."""
+    delta = YahooFinanceDelta
+    keyframe_id = db.execute(
+        select(delta.id).where(delta.symbol == symbol, delta.keyframe.is_(True), delta.id < delta_id)
+        .order_by(delta.id.desc()).limit(1)
+    ).scalar()
+    fields = {}
+    if keyframe_id is None:
+        return fields
+    for (changes,) in db.execute(
+        select(delta.changes).where(delta.symbol == symbol, delta.id >= keyframe_id, delta.id < delta_id).order_by(delta.id)
+    ):
+        fields.update(orjson.loads(changes))
+    return fields
+
+def rebase_deltas(session: Session, last_ids: Dict[str, int]):
+    """Let each symbol's rows up to ``last_ids[symbol]`` be removed without breaking its replays.
+
+    The symbol's next row becomes a keyframe holding the fields it replays
+    to, or, when there is none yet, the next scrape stored is made one. Call
+    it before removing the rows: the fields are replayed from them.
+    """
+    delta = YahooFinanceDelta
+    for symbol, last_id in last_ids.items():
+        row = session.execute(
+            select(delta.id, delta.keyframe, delta.changes).where(delta.symbol == symbol, delta.id > last_id).order_by(delta.id).limit(1)
+        ).first()
+        if row is None:
+            session.execute(
+                update(YahooFinanceState).where(YahooFinanceState.symbol == symbol)
+                .values(deltas_since_keyframe=config.YAHOO_DELTA_KEYFRAME_INTERVAL)
+            )
+        elif not row.keyframe:
+            fields = fields_before(session, symbol, row.id)
+            fields.update(orjson.loads(row.changes))
+            session.execute(update(delta).where(delta.id == row.id).values(keyframe=True, changes=orjson.dumps(fields).decode()))
+
+def compact_deltas(session: Session, after_id: int, horizon: datetime.datetime, resolution: int,
+                   batch_size: int = 10000) -> Tuple[int, int]:
+    """Merge each symbol's deltas within every ``resolution``-second window before ``horizon``.
+
+    A merged row keeps the last row's id and time and the union of the
+    changes, so replays still end each window with the right fields; a
+    window that held a keyframe stays one. Looks at up to ``batch_size``
+    rows after ``after_id`` and returns the last id looked at and how many
+    rows were removed.
+    """
+    delta = YahooFinanceDelta
+    rows = session.execute(
+        select(delta.id, delta.symbol, delta.observed_at, delta.keyframe, delta.changes)
+        .where(delta.id > after_id, delta.observed_at < horizon)
+        .order_by(delta.id).limit(batch_size)
+    ).all()
+    if not rows:
+        return after_id, 0
+    windows = {}
+    for row in rows:
+        window = int(row.observed_at.replace(tzinfo=datetime.timezone.utc).timestamp()) // resolution
+        windows.setdefault((row.symbol, window), []).append(row)
+    merged, removed = [], []
+    for group in windows.values():
+        if len(group) < 2:
+            continue
+        changes = {}
+        for row in group:
+            changes.update(orjson.loads(row.changes))
+        merged.append({
+            "id": group[-1].id, "keyframe": any(row.keyframe for row in group), "changes": orjson.dumps(changes).decode()
+        })
+        removed.extend(row.id for row in group[:-1])
+    if merged:
+        session.execute(update(delta), merged)
+        session.execute(delete(delta).where(delta.id.in_(removed)))
+    return rows[-1].id, len(removed)
+
+def compaction_horizon(now: datetime.datetime) -> datetime.datetime:
+    # Aligned to a window boundary, so every window compacted is complete
+    resolution = config.YAHOO_DELTA_COMPACT_RESOLUTION_SECONDS
+    cutoff = (now - datetime.timedelta(seconds=config.YAHOO_DELTA_COMPACT_AFTER_SECONDS)).replace(tzinfo=datetime.timezone.utc)
+    return datetime.datetime.fromtimestamp(int(cutoff.timestamp()) // resolution * resolution, datetime.timezone.utc).replace(tzinfo=None)
+
+def run_compaction(state: ScraperState) -> int:
+    """Compact every complete window old enough, resuming after ``state.cursor``; blocking."""
+    horizon = compaction_horizon(utcnow())
+    total = 0
+    while True:
+        # One transaction per batch keeps the writer free for ingest in between
+        with session_scope() as session:
+            last_id, removed = compact_deltas(session, state.cursor or 0, horizon, config.YAHOO_DELTA_COMPACT_RESOLUTION_SECONDS)
+            if removed:
+                bump_data_version(session, YAHOO_FINANCE_DATA)
+        if last_id == (state.cursor or 0):
+            return total
+        state.cursor = last_id
+        total += removed
+
+async def compact_yahoo_finance_deltas(state: ScraperState) -> None:
+    removed = await asyncio.to_thread(run_compaction, state)
+    if removed:
+        print(f"Compacted {removed} yahoo_finance_deltas rows")
+
+delta_compaction_job = Job("yahoo_finance_compaction", compact_yahoo_finance_deltas, config.YAHOO_DELTA_COMPACT_INTERVAL_SECONDS)
@@ -0,0 +1,140 @@
+import csv
+import io
+from typing import Dict, Iterable, Iterator, Sequence
+import orjson
+from sqlalchemy.sql import Select
+from app.models.news import YahooFinanceData
+from app.services.yahoo_finance import range_filter_columns
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Optional; only format=arrow and format=parquet need it
+    pyarrow = None
+
+# Keys of the JSON and NDJSON quote formats and the stored column behind each
+record_fields = {
+    "Symbol": "symbol",
+    "Name": "name",
+    "Price (Intraday)": "price_intraday",
+    "Change": "change",
+    "Change %": "change_percent",
+    "YTD Return": "ytd_return",
+    "3-Mo Return": "three_mo_return",
+    "1-Year": "one_year",
+    "3-Year Return": "three_year_return",
+    "5-Year Return": "five_year_return",
+    "Net Expense Ratio": "net_expense_ratio",
+    "Gross Expense Ratio": "gross_expense_ratio",
+    "Net Assets": "net_assets",
+    "50 Day Avg": "fifty_day_avg",
+    "200 Day Avg": "two_hundred_day_avg",
+    "timestamp": "timestamp",
+    "year": "year",
+    "month": "month",
+    "day": "day",
+    "time": "time"
+}
+
+# Typed columns of the CSV, Arrow and Parquet exports
+export_fields = {"id": "id", "symbol": "symbol", "name": "name", "observed_at": "observed_at", **range_filter_columns}
+
+media_types = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet"
+}
+columnar_formats = {"arrow", "parquet"}
+
+def select_fields(query: Select, fields: Dict[str, str], *extra: str) -> Select:
+    """Narrow a YahooFinanceData query to plain column tuples.
+
+    Rows come back in ``fields`` order, so ``zip(fields, row)`` pairs them up;
+    ``extra`` columns (e.g. for a cursor) follow unless already selected.
+    Skipping ORM instances is most of the cost of large pages.
+    """
+    names = list(fields.values())
+    names += [name for name in extra if name not in names]
+    table = YahooFinanceData.__table__
+    return query.with_only_columns(*(table.c[name] for name in names))
+
+def records(rows: Iterable[Sequence]) -> list:
+    keys = list(record_fields)
+    return [dict(zip(keys, row)) for row in rows]
+
+def write_ndjson(partitions: Iterable[Sequence]) -> Iterator[bytes]:
+    keys = list(record_fields)
+    for rows in partitions:
+        yield b"".join(orjson.dumps(dict(zip(keys, row)), option=orjson.OPT_APPEND_NEWLINE) for row in rows)
+
+def write_csv(partitions: Iterable[Sequence]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(export_fields)
+    for rows in partitions:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()  # Header of an empty export
+
+class _ChunkSink(io.RawIOBase):
+    # Write-only file that hands pyarrow's output back in pieces, so a file is
+    # streamed as it is written; tell() stays absolute for Parquet's footer offsets
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def arrow_schema():
+    return pyarrow.schema(
+        [
+            ("id", pyarrow.int64()),
+            ("symbol", pyarrow.string()),
+            ("name", pyarrow.string()),
+            ("observed_at", pyarrow.timestamp("us", tz="UTC"))  # Stored as naive UTC
+        ]
+        + [(field, pyarrow.float64()) for field in range_filter_columns]
+    )
+
+def _write_columnar(partitions: Iterable[Sequence], open_writer) -> Iterator[bytes]:
+    schema = arrow_schema()
+    sink = _ChunkSink()
+    writer = open_writer(sink, schema)
+    for rows in partitions:
+        columns = list(zip(*rows))
+        writer.write_batch(pyarrow.record_batch(
+            [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+        ))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+def write_arrow(partitions: Iterable[Sequence]) -> Iterator[bytes]:
+    # Arrow IPC stream format: one record batch per partition
+    return _write_columnar(partitions, pyarrow.ipc.new_stream)
+
+def write_parquet(partitions: Iterable[Sequence]) -> Iterator[bytes]:
+    # One row group per partition
+    return _write_columnar(partitions, pyarrow.parquet.ParquetWriter)
+
+writers = {"ndjson": write_ndjson, "csv": write_csv, "arrow": write_arrow, "parquet": write_parquet}
@@ -0,0 +1,89 @@
+import hashlib
+from collections import OrderedDict
+import inspect
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Union
+from urllib.parse import urlencode
+import orjson
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from app import config
+
+class CachedBody(NamedTuple):
+    body: bytes
+    media_type: str
+    headers: Dict[str, str]
+
+def json_body(content: Any, headers: Optional[Dict[str, str]] = None) -> CachedBody:
+    # orjson encodes dicts, lists, numbers and datetimes natively; anything else, such
+    # as pydantic models, falls back to FastAPI's encoder
+    return CachedBody(orjson.dumps(content, default=jsonable_encoder), "application/json", headers or {})
+
+class ResponseCache:
+    """LRU of serialized bodies keyed by ETag, i.e. by (data version, path, query).
+
+    Bounded by total body size; bodies of superseded versions age out first.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CachedBody]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CachedBody):
+        if len(entry.body) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous.body)
+        self._entries[key] = entry
+        self.size += len(entry.body)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted.body)
+
+response_cache = ResponseCache(config.RESPONSE_CACHE_MAX_BYTES)
+
+def make_etag(version: str, request: Request) -> str:
+    # Parameter order and repetition in the URL do not change the response, so normalize them
+    query = urlencode(sorted(request.query_params.multi_items()))
+    digest = hashlib.blake2b(f"{request.url.path}?{query}".encode(), digest_size=8).hexdigest()
+    return f'W/"{version}-{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # Weak comparison, as required for If-None-Match
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag.removeprefix("W/") for candidate in candidates)
+
+BuildResult = Union[CachedBody, Response]
+
+async def conditional_response(
+    request: Request, version: str, build: Callable[[], Union[BuildResult, Awaitable[BuildResult]]]
+) -> Response:
+    """Answer from the client's or our cached copy when the data version is unchanged.
+
+    ``build`` only runs, and only touches the database, when neither copy is
+    current; it may be a coroutine function. It may return a ready Response,
+    such as a stream, which is revalidated the same way but not cached.
+    """
+    etag = make_etag(version, request)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    entry = response_cache.get(etag)
+    if entry is None:
+        entry = build()
+        if inspect.isawaitable(entry):
+            entry = await entry
+        if isinstance(entry, Response):
+            entry.headers.update(headers)
+            return entry
+        response_cache.put(etag, entry)
+    return Response(entry.body, media_type=entry.media_type, headers={**entry.headers, **headers})
@@ -0,0 +1,62 @@
+import asyncio
+import weakref
+import httpx
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, NamedTuple, Optional
+from app import config
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+class LoopClient(NamedTuple):
+    client: httpx.AsyncClient
+    semaphore: asyncio.Semaphore
+
+# An AsyncClient's pool and a Semaphore belong to the event loop they were first used on, so
+# each loop (the API's, the worker's, a test's asyncio.run) gets its own, forgotten with the loop
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, LoopClient]" = weakref.WeakKeyDictionary()
+_transport: Optional[httpx.AsyncBaseTransport] = None  # Tests swap in an httpx.MockTransport
+
+def create_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        headers=DEFAULT_HEADERS,
+        timeout=httpx.Timeout(config.HTTP_TIMEOUT_SECONDS, connect=config.HTTP_CONNECT_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        transport=_transport,
+        follow_redirects=True,
+    )
+
+def loop_client() -> LoopClient:
+    """Return the running loop's pooled client and concurrency limit, creating them on first use."""
+    loop = asyncio.get_running_loop()
+    current = _clients.get(loop)
+    if current is None or current.client.is_closed:
+        current = _clients[loop] = LoopClient(create_http_client(), asyncio.Semaphore(config.HTTP_MAX_CONCURRENCY))
+    return current
+
+def get_http_client() -> httpx.AsyncClient:
+    return loop_client().client
+
+async def fetch(url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+    client, semaphore = loop_client()
+    async with semaphore:  # Bound the number of concurrent upstream requests
+        return await client.get(url, headers=headers)
+
+@asynccontextmanager
+async def stream(url: str, headers: Optional[Dict[str, str]] = None) -> AsyncIterator[httpx.Response]:
+    """Like ``fetch``, but the body is read as it arrives and can be abandoned part way."""
+    client, semaphore = loop_client()
+    async with semaphore:
+        async with client.stream("GET", url, headers=headers) as response:
+            yield response
+
+async def close_http_client():
+    """Close the running loop's client; call it on the loop's way out (lifespan, worker exit)."""
+    current = _clients.pop(asyncio.get_running_loop(), None)
+    if current is not None:
+        await current.client.aclose()
@@ -0,0 +1,34 @@
+from typing import Any, Dict, List, NamedTuple, Sequence, Set
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+class IngestResult(NamedTuple):
+    inserted: int
+    skipped: int
+    ids: List[int]  # Primary keys of the newly inserted rows
+
+def bulk_insert_unique(session: Session, model, rows: List[Dict[str, Any]]) -> IngestResult:
+    """Insert a batch of rows, skipping any whose ``hash`` already exists.
+
+    The batch goes out as multi-row ``INSERT ... ON CONFLICT(hash) DO NOTHING``
+    statements inside the caller's transaction, so a whole page costs one
+    round of statements and one commit instead of a lookup and fsync per row.
+    """
+    unique_rows = {}
+    for row in rows:
+        unique_rows.setdefault(row["hash"], row)  # Pages can repeat a row
+    if not unique_rows:
+        return IngestResult(0, len(rows), [])
+
+    stmt = insert(model).on_conflict_do_nothing(index_elements=["hash"]).returning(model.id)
+    ids = list(session.execute(stmt, list(unique_rows.values())).scalars())
+    return IngestResult(len(ids), len(rows) - len(ids), ids)
+
+def existing_hashes(session: Session, model, hashes: Sequence[str], chunk_size: int = 500) -> Set[str]:
+    """The ``hashes`` already in ``model``'s table, looked up on the unique hash index."""
+    found = set()
+    for offset in range(0, len(hashes), chunk_size):
+        chunk = hashes[offset:offset + chunk_size]
+        found.update(session.execute(select(model.hash).where(model.hash.in_(chunk))).scalars())
+    return found
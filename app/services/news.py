@@ -1,112 +1,211 @@
 import asyncio
-import concurrent.futures
-import requests
 import hashlib
+import json
 from datetime import datetime, timezone
-from typing import List, Dict
+from typing import List, Dict, NamedTuple, Optional
 from lxml import etree
 from sqlalchemy.orm import Session
-from app.models.news import NewsArticle
+from app import config
+from app.models.news import FeedState, NewsArticle, ScraperState
 from app.schemas.news import NewsArticleCreate
-from app.db.database import SessionLocal
-from app.services.yahoo_finance import fetch_data_from_yahoo_finance
+from app.db.database import SessionLocal, session_scope
+from app.services import http_client
+from app.services.archive import archive_reaches, archived_news
+from app.services.data_version import NEWS_ARTICLES, bump_data_version
+from app.services.dedup import news_dedup
+from app.services.ingest import IngestResult, bulk_insert_unique
+from app.services.news_search import index_news_articles
+from app.services.scheduler import Job, UpstreamError
+from app.services.yahoo_finance import to_naive_utc
+
+class NewsFeed(NamedTuple):
+    source: str
+    url: str
+
+# Every feed ingested; adding one is a config entry (NEWS_FEEDS)
+news_feeds = [NewsFeed(**feed) for feed in config.NEWS_FEEDS]
+
+class FeedUpdate(NamedTuple):
+    feed: NewsFeed
+    articles: List[NewsArticleCreate]  # New items, newest first
+    state: FeedState  # To save once the articles are stored
 
 def generate_hash(article: NewsArticleCreate) -> str:
     hash_data = f"{article.title}{article.published_date}{article.source}".encode()
     return hashlib.sha256(hash_data).hexdigest()
 
-def fetch_news_from_prnewswire() -> List[NewsArticleCreate]:
-    url = "https://www.prnewswire.com/apac/rss/financial-services-latest-news/financial-services-latest-news-list.rss"
-    response = requests.get(url)
-    news_articles = []
-    if response.status_code == 200:
-        root = etree.fromstring(response.content)
-        items = root.findall(".//item")
-        for item in items:
-            title = item.findtext("title", default="N/A")
-            source = "PR Newswire"
-            pub_date = item.findtext("pubDate", default="N/A")
-            try:
-                published_date = datetime.strptime(pub_date, "%a, %d %b %Y %H:%M:%S %z")
-            except ValueError:
-                published_date = datetime.now(timezone.utc)
-            description = item.find("description")
-            if description is not None and description.text is not None:
-                content = description.text.strip()
-            else:
-                content = "N/A"
-            news_articles.append(NewsArticleCreate(title=title, source=source, published_date=published_date, content=content))
-            print(f"Fetched article from PR Newswire: {title}")  # Debug statement
+def parse_rss_item(item: etree._Element, source: str) -> NewsArticleCreate:
+    title = item.findtext("title", default="N/A")
+    pub_date = item.findtext("pubDate", default="N/A")
+    try:
+        published_date = datetime.strptime(pub_date, "%a, %d %b %Y %H:%M:%S %z")
+    except ValueError:
+        published_date = datetime.now(timezone.utc)
+    description = item.find("description")
+    if description is not None and description.text is not None:
+        content = description.text.strip()
     else:
-        print(f"Failed to fetch news from PR Newswire: {response.status_code}")
-    return news_articles
+        content = "N/A"
+    return NewsArticleCreate(title=title, source=source, published_date=published_date, content=content)
 
-def fetch_news_from_businesswire() -> List[NewsArticleCreate]:
-    url = "https://feed.businesswire.com/rss/home/?rss=G1QFDERJXkJeGVtWXw==&_gl=1*1u452xi*_gcl_au*NTA5NzA4NDU3LjE3MzcwNTE0MzE.*_ga*MTk5NDgzNTI3MC4xNzM3MDUxNDMz*_ga_ZQWF70T3FK*MTczNzA1MTQzMi4xLjEuMTczNzA1MTQ2NC4yOC4wLjA."
-    response = requests.get(url)
-    news_articles = []
-    if response.status_code == 200:
-        root = etree.fromstring(response.content)
-        items = root.findall(".//item")
-        for item in items:
-            title = item.findtext("title", default="N/A")
-            source = "Business Wire"
-            pub_date = item.findtext("pubDate", default="N/A")
-            try:
-                published_date = datetime.strptime(pub_date, "%a, %d %b %Y %H:%M:%S %z")
-            except ValueError:
-                published_date = datetime.now(timezone.utc)
-            description = item.find("description")
-            if description is not None and description.text is not None:
-                content = description.text.strip()
+def rss_item_key(item: etree._Element) -> str:
+    # What identifies an item across fetches; the pubDate fallback is the raw string, never "now"
+    return item.findtext("guid") or item.findtext("link") or f"{item.findtext('title')}|{item.findtext('pubDate')}"
+
+def parse_rss_feed(content: bytes, source: str) -> List[NewsArticleCreate]:
+    root = etree.fromstring(content)
+    return [parse_rss_item(item, source) for item in root.findall(".//item")]
+
+async def fetch_feed(feed: NewsFeed, state: Optional[FeedState]) -> FeedUpdate:
+    """Fetch the items added to ``feed`` since ``state`` was saved.
+
+    The request is conditional on the ETag and Last-Modified of the previous
+    answer, so an unchanged feed costs a 304 and no parsing. Otherwise items
+    are parsed as the body streams in, newest first, and the download stops
+    at the first item already seen.
+    """
+    state = state or FeedState(url=feed.url)
+    seen = json.loads(state.seen_keys or "[]")
+    headers = {}
+    if state.etag:
+        headers["If-None-Match"] = state.etag
+    if state.last_modified:
+        headers["If-Modified-Since"] = state.last_modified
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    state.checked_at = now
+    async with http_client.stream(feed.url, headers=headers) as response:
+        if response.status_code == 304:
+            return FeedUpdate(feed, [], state)
+        if response.status_code != 200:
+            raise UpstreamError.from_response(response)
+        seen_keys = set(seen)
+        keys, articles = [], []
+        # Each feed() call parses one network chunk, so the event loop is only held briefly
+        parser = etree.XMLPullParser(events=("end",), tag="item")
+        async for chunk in response.aiter_bytes():
+            parser.feed(chunk)
+            for _, item in parser.read_events():
+                key = rss_item_key(item)
+                if key in seen_keys:
+                    break
+                keys.append(key)
+                articles.append(parse_rss_item(item, feed.source))
+                item.clear()
             else:
-                content = "N/A"
-            news_articles.append(NewsArticleCreate(title=title, source=source, published_date=published_date, content=content))
-            print(f"Fetched article from Business Wire: {title}")  # Debug statement
-    else:
-        print(f"Failed to fetch news from Business Wire: {response.status_code}")
-    return news_articles
+                continue
+            break  # Reached what we stored last time; the rest of the body is older
+        else:
+            parser.close()
+    state.etag = response.headers.get("etag")
+    state.last_modified = response.headers.get("last-modified")
+    state.seen_keys = json.dumps((keys + seen)[:config.NEWS_FEED_SEEN_KEYS])
+    state.changed_at = now
+    return FeedUpdate(feed, articles, state)
 
-async def save_unique_news(db: Session, news_articles: List[NewsArticleCreate]):
-    for article in news_articles:
-        article_hash = generate_hash(article)
-        if not db.query(NewsArticle).filter_by(hash=article_hash).first():
-            db_article = NewsArticle(**article.dict(), hash=article_hash)
-            db.add(db_article)
-            print(f"Saving article: {article.title}")  # Debug statement
+def store_unique_news(db: Session, news_articles: List[NewsArticleCreate]) -> IngestResult:
+    hashes = [generate_hash(article) for article in news_articles]
     try:
+        indexes = news_dedup.new_rows(db, NewsArticle, hashes)
+        records = [dict(news_articles[index].dict(), hash=hashes[index]) for index in indexes]
+        result = bulk_insert_unique(db, NewsArticle, records)
+        index_news_articles(db, result.ids)  # Same transaction keeps the search index in sync
+        if result.inserted:
+            bump_data_version(db, NEWS_ARTICLES)
         db.commit()
-        print("Committed news articles to the database.")  # Debug statement
+        news_dedup.stored(hashes)
+        result = IngestResult(result.inserted, len(news_articles) - result.inserted, result.ids)
+        print(f"Committed {result.inserted} new news articles, skipped {result.skipped}.")  # Debug statement
+        return result
     except Exception as e:
         db.rollback()
         print(f"Failed to commit news articles: {e}")
+        raise  # The feeds must not be marked as read
+
+async def save_unique_news(db: Session, news_articles: List[NewsArticleCreate]) -> IngestResult:
+    # The insert and commit are blocking, run them in a worker thread
+    return await asyncio.to_thread(store_unique_news, db, news_articles)
+
+def load_feed_states() -> Dict[str, FeedState]:
+    with SessionLocal() as db:
+        states = {state.url: state for state in db.query(FeedState)}
+        db.expunge_all()
+        return states
+
+def save_feed_states(states: List[FeedState]):
+    with session_scope() as db:
+        for state in states:
+            db.merge(state)
+
+async def fetch_and_store_news(state: ScraperState) -> None:
+    feed_states = await asyncio.to_thread(load_feed_states)
+    results = await asyncio.gather(
+        *(fetch_feed(feed, feed_states.get(feed.url)) for feed in news_feeds),
+        return_exceptions=True
+    )
+    news_articles = []
+    errors = []
+    updates = []
+    for feed, result in zip(news_feeds, results):
+        if isinstance(result, Exception):
+            print(f"Error fetching {feed.source} feed: {result!r}")
+            errors.append(result)
+        else:
+            print(f"Fetched {len(result.articles)} new articles from {feed.source}")  # Debug statement
+            news_articles.extend(result.articles)
+            updates.append(result.state)
+    if errors and len(errors) == len(results):
+        raise errors[0]  # Every feed failed: let the scheduler back off
+
+    if news_articles:
+        # Sort news articles by published date, latest first
+        news_articles.sort(key=lambda x: x.published_date, reverse=True)
+
+        # Save unique articles to the database
+        with SessionLocal() as db:
+            await save_unique_news(db, news_articles)
+    # Only now are the items stored, so the next fetch may skip them
+    await asyncio.to_thread(save_feed_states, updates)
+
+news_job = Job("news", fetch_and_store_news, config.NEWS_INTERVAL_SECONDS)
+
+def get_latest_news(
+    db: Session,
+    limit: int = 30,
+    source: Optional[str] = None,
+    before: Optional[datetime] = None,
+    since: Optional[datetime] = None,
+    include_archive: bool = True
+) -> List[NewsArticle]:
+    """Newest articles first, optionally for one source and within (since, before).
 
-async def continuous_fetch():
-    while True:
-        try:
-            with SessionLocal() as db:
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    futures = [
-                        executor.submit(fetch_news_from_prnewswire),
-                        executor.submit(fetch_news_from_businesswire)
-                    ]
-                    news_articles = []
-                    for future in concurrent.futures.as_completed(futures):
-                        news_articles.extend(future.result())
-
-                # Sort news articles by published date, latest first
-                news_articles.sort(key=lambda x: x.published_date, reverse=True)
-
-                # Save unique articles to the database
-                await save_unique_news(db, news_articles)
-        except Exception as e:
-            print(f"Error in continuous_fetch: {e}")
-        await asyncio.sleep(3600)  # Fetch data every 10 minutes
-
-def get_latest_news(db: Session, limit: int = 30) -> List[NewsArticle]:
-    news_articles = db.query(NewsArticle).order_by(NewsArticle.published_date.desc()).limit(limit).all()
+    Once the rows in SQLite run out, the page continues from the Parquet
+    archive, unless ``include_archive`` is False: the API reads that part
+    with archived_news_after in a thread, as the scans block.
+    """
+    query = db.query(NewsArticle)
+    if source:
+        query = query.filter(NewsArticle.source == source)
+    if before:
+        query = query.filter(NewsArticle.published_date < to_naive_utc(before))
+    if since:
+        query = query.filter(NewsArticle.published_date > to_naive_utc(since))
+    news_articles = query.order_by(NewsArticle.published_date.desc()).limit(limit).all()
+    if include_archive:
+        news_articles += archived_news_after(news_articles, limit, source, before, since)
     print(f"Retrieved {len(news_articles)} articles from the database.")  # Debug statement
     return news_articles
 
-def get_yahoo_finance_data() -> List[Dict[str, str]]:
-    return fetch_data_from_yahoo_finance()
+def archived_news_after(
+    news_articles: List[NewsArticle],
+    limit: int,
+    source: Optional[str] = None,
+    before: Optional[datetime] = None,
+    since: Optional[datetime] = None
+) -> List[NewsArticle]:
+    """The archived articles that complete a page of ``news_articles`` from SQLite; blocking."""
+    since = to_naive_utc(since) if since else None
+    if len(news_articles) >= limit or not archive_reaches(NEWS_ARTICLES, since):
+        return []
+    dates = [article.published_date for article in news_articles if article.published_date]
+    bound = min(dates + ([to_naive_utc(before)] if before else [])) if dates or before else None
+    return [NewsArticle(**row) for row in archived_news(limit - len(news_articles), source, bound, since)]
@@ -0,0 +1,73 @@
+from typing import Any, Dict, List
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+FTS_TABLE = "news_articles_fts"
+INDEX_BATCH_SIZE = 500
+
+def create_news_search_index(bind: Engine):
+    """Create the FTS5 index over news titles and content, backfilling it when new.
+
+    It is an external-content table: the text lives only in news_articles and
+    the ingest path adds new rows to the index in the same transaction.
+    """
+    with bind.begin() as conn:
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+        ).first()
+        if exists:
+            return
+        conn.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            "title, content, content='news_articles', content_rowid='id', tokenize='porter unicode61')"
+        )
+        conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')")
+
+def index_news_articles(db: Session, ids: List[int]):
+    """Add freshly inserted articles to the search index."""
+    for offset in range(0, len(ids), INDEX_BATCH_SIZE):
+        batch = ids[offset:offset + INDEX_BATCH_SIZE]
+        placeholders = ", ".join(str(int(article_id)) for article_id in batch)
+        db.execute(text(
+            f"INSERT INTO {FTS_TABLE}(rowid, title, content) "
+            f"SELECT id, title, content FROM news_articles WHERE id IN ({placeholders})"
+        ))
+
+def unindex_news_articles(db: Session, ids: List[int]):
+    """Drop articles from the search index; call before deleting their rows, which it reads."""
+    for offset in range(0, len(ids), INDEX_BATCH_SIZE):
+        batch = ids[offset:offset + INDEX_BATCH_SIZE]
+        placeholders = ", ".join(str(int(article_id)) for article_id in batch)
+        db.execute(text(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) "
+            f"SELECT 'delete', id, title, content FROM news_articles WHERE id IN ({placeholders})"
+        ))
+
+def build_match_query(q: str) -> str:
+    """Turn free text into an FTS5 query that ANDs the quoted terms.
+
+    Quoting keeps user input from being parsed as FTS syntax; a trailing ``*``
+    on a term is kept as a prefix search.
+    """
+    terms = []
+    for token in q.split():
+        prefix = token.endswith("*")
+        token = token.rstrip("*").replace('"', '""')
+        if token:
+            terms.append(f'"{token}"*' if prefix else f'"{token}"')
+    return " ".join(terms)
+
+def search_news(db: Session, q: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+    match = build_match_query(q)
+    if not match:
+        return []
+    rows = db.execute(text(
+        f"SELECT a.id, a.title, a.source, a.published_date, "
+        f"snippet({FTS_TABLE}, -1, '<b>', '</b>', '...', 16) AS snippet, "
+        f"bm25({FTS_TABLE}, 2.0, 1.0) AS rank "  # Title matches weigh double
+        f"FROM {FTS_TABLE} JOIN news_articles a ON a.id = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH :match "
+        f"ORDER BY rank LIMIT :limit OFFSET :offset"
+    ), {"match": match, "limit": limit, "offset": offset}).mappings()
+    return [dict(row) for row in rows]
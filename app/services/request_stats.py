@@ -0,0 +1,146 @@
+import math
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+class LatencySketch:
+    """Log-bucketed latency histogram with bounded relative error.
+
+    Every latency falls into a bucket ``gamma`` times wider than the previous
+    one, so any quantile is reported within ``relative_accuracy`` of the true
+    value using a fixed number of counters, whatever the traffic.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.02, min_value: float = 1e-5, max_value: float = 1000.0):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.size = self.index(max_value) + 1
+        self.counts: List[int] = [0] * self.size
+        self.total = 0
+
+    def index(self, value: float) -> int:
+        if value <= self.min_value:
+            return 0
+        return math.ceil(math.log(value / self.min_value) / self._log_gamma)
+
+    def value(self, index: int) -> float:
+        # Midpoint of the bucket, which bounds the relative error on both sides
+        return self.min_value * self.gamma ** index * 2 / (1 + self.gamma)
+
+    def add(self, index: int, count: int = 1):
+        self.counts[min(index, self.size - 1)] += count
+        self.total += count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.total:
+            return None
+        rank = max(1, math.ceil(q * self.total))  # Nearest rank
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.value(index)
+        return self.value(self.size - 1)
+
+class _Slot:
+    __slots__ = ("epoch", "count", "errors", "latency_sum", "buckets")
+
+    def __init__(self):
+        self.epoch = -1
+        self.count = 0
+        self.errors = 0
+        self.latency_sum = 0.0
+        self.buckets: Counter = Counter()
+
+class RollingWindow:
+    """Request count, errors and latency quantiles over the last ``window`` seconds.
+
+    The window is a ring of ``resolution``-second slots plus running totals.
+    Recording adds to the current slot and the totals; a slot leaving the
+    window is subtracted from the totals, so reads never rescan history.
+    """
+
+    def __init__(self, window: float, resolution: float, relative_accuracy: float = 0.02):
+        self.window = window
+        self.resolution = resolution
+        self._slots = [_Slot() for _ in range(max(1, int(window // resolution)))]
+        self._head = -1  # Newest slot epoch seen
+        self.count = 0
+        self.errors = 0
+        self.latency_sum = 0.0
+        self.sketch = LatencySketch(relative_accuracy)
+
+    def _advance(self, now: float) -> _Slot:
+        epoch = int(now // self.resolution)
+        if epoch > self._head:
+            # Expire every slot that falls out of the window, at most one lap of the ring
+            for stale in range(max(self._head + 1, epoch - len(self._slots) + 1), epoch + 1):
+                self._expire(self._slots[stale % len(self._slots)])
+            self._head = epoch
+        slot = self._slots[epoch % len(self._slots)]
+        slot.epoch = epoch
+        return slot
+
+    def _expire(self, slot: _Slot):
+        if slot.count:
+            self.count -= slot.count
+            self.errors -= slot.errors
+            self.latency_sum -= slot.latency_sum
+            for index, count in slot.buckets.items():
+                self.sketch.add(index, -count)
+        slot.__init__()
+
+    def record(self, latency: float, error: bool, now: float):
+        slot = self._advance(now)
+        index = self.sketch.index(latency)
+        slot.count += 1
+        slot.errors += error
+        slot.latency_sum += latency
+        slot.buckets[index] += 1
+        self.count += 1
+        self.errors += error
+        self.latency_sum += latency
+        self.sketch.add(index)
+
+    def snapshot(self, now: float) -> Dict[str, Optional[float]]:
+        self._advance(now)
+        return {
+            "requests": self.count,
+            "errors": self.errors,
+            "error_rate": self.errors / self.count if self.count else 0,
+            "requests_per_second": self.count / self.window,
+            "average_latency_seconds": self.latency_sum / self.count if self.count else 0,
+            "p50_latency_seconds": self.sketch.quantile(0.50),
+            "p95_latency_seconds": self.sketch.quantile(0.95),
+            "p99_latency_seconds": self.sketch.quantile(0.99)
+        }
+
+class RequestStats:
+    """Lifetime counters plus 1 and 5 minute windows, updated once per request."""
+
+    def __init__(self):
+        self.request_count = 0
+        self.error_count = 0
+        self.windows = {"1m": RollingWindow(60, 5), "5m": RollingWindow(300, 10)}
+        self._lock = threading.Lock()  # Sync endpoints read from the threadpool
+
+    def record(self, latency: float, error: bool):
+        now = time.monotonic()
+        with self._lock:
+            self.request_count += 1
+            self.error_count += error
+            for window in self.windows.values():
+                window.record(latency, error, now)
+
+    def snapshot(self) -> Dict[str, object]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "request_count": self.request_count,
+                "error_count": self.error_count,
+                "windows": {name: window.snapshot(now) for name, window in self.windows.items()}
+            }
+
+request_stats = RequestStats()
@@ -0,0 +1,105 @@
+import asyncio
+import datetime
+import random
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, NamedTuple, Optional
+import httpx
+from sqlalchemy.orm import sessionmaker
+from app import config
+from app.db.database import SessionLocal
+from app.models.news import ScraperState
+
+class UpstreamError(Exception):
+    """A non-200 answer from an upstream; 429 and 503 may say when to come back."""
+
+    def __init__(self, url: str, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"{url} answered {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_response(cls, response: httpx.Response) -> "UpstreamError":
+        return cls(str(response.url), response.status_code, parse_retry_after(response.headers.get("retry-after")))
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    # Either delta-seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+class Job(NamedTuple):
+    name: str
+    # Does one run and may update the state it is given, such as a cursor. Returns the delay
+    # until the next run, or None for ``interval``; raising counts as a failure.
+    run: Callable[[ScraperState], Awaitable[Optional[float]]]
+    interval: float
+
+def utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+def jittered(delay: float, jitter: float = config.SCHEDULER_JITTER) -> float:
+    # Spread runs out so sources and restarted workers do not fire in lockstep
+    return delay * random.uniform(1 - jitter, 1 + jitter)
+
+def backoff_delay(failures: int, retry_after: Optional[float] = None) -> float:
+    """Exponential backoff with jitter, never sooner than the upstream's Retry-After."""
+    ceiling = min(config.SCHEDULER_BACKOFF_MAX_SECONDS, config.SCHEDULER_BACKOFF_BASE_SECONDS * 2 ** (failures - 1))
+    delay = random.uniform(ceiling / 2, ceiling)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, config.SCHEDULER_BACKOFF_MAX_SECONDS))
+    return delay
+
+def load_state(name: str, session_factory: sessionmaker = SessionLocal) -> ScraperState:
+    with session_factory() as session:
+        state = session.get(ScraperState, name)
+        if state is None:
+            return ScraperState(name=name, cursor=0, consecutive_failures=0)
+        session.expunge(state)
+        return state
+
+def save_state(state: ScraperState, session_factory: sessionmaker = SessionLocal):
+    with session_factory() as session:
+        session.merge(state)
+        session.commit()
+
+async def run_once(job: Job, state: ScraperState) -> float:
+    """Run ``job`` once, record the outcome on ``state`` and return the delay until the next run."""
+    state.last_run_at = utcnow()
+    try:
+        delay = await job.run(state)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        state.consecutive_failures += 1
+        state.last_error_at = utcnow()
+        state.last_error = repr(e)[:500]
+        delay = backoff_delay(state.consecutive_failures, getattr(e, "retry_after", None))
+        print(f"{job.name} failed ({state.consecutive_failures} in a row), retrying in {delay:.0f}s: {e!r}")
+    else:
+        state.consecutive_failures = 0
+        state.last_success_at = utcnow()
+        delay = jittered(job.interval if delay is None else delay)
+    state.next_run_at = utcnow() + datetime.timedelta(seconds=delay)
+    return delay
+
+async def run_job(job: Job, session_factory: sessionmaker = SessionLocal):
+    """Run ``job`` forever, persisting its state after every run."""
+    state = await asyncio.to_thread(load_state, job.name, session_factory)
+    while True:
+        if state.next_run_at is not None:
+            # After a restart, keep to the schedule (and any backoff) the last run set
+            wait = (state.next_run_at - utcnow()).total_seconds()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        await run_once(job, state)
+        try:
+            await asyncio.to_thread(save_state, state, session_factory)
+        except Exception as e:
+            print(f"Failed to save {job.name} state: {e}")
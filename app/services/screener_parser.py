@@ -0,0 +1,133 @@
+import datetime
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional, Set
+from lxml import etree
+from prometheus_client import Counter
+
+SCREENER_DRIFT = Counter(
+    "screener_parser_drift_total", "Screener pages whose markup no longer matches what the parser expects", ["kind"]
+)
+
+# Row dict keys, in the order they are stored and served
+FIELDS = [
+    "Symbol", "Name", "Change", "Change %", "Price (Intraday)", "YTD Return", "3-Mo Return", "1-Year",
+    "3-Year Return", "5-Year Return", "Net Expense Ratio", "Gross Expense Ratio", "Net Assets", "50 Day Avg",
+    "200 Day Avg"
+]
+# Cell positions of FIELDS on pages without a header row (a checkbox cell comes first)
+LEGACY_POSITIONS = dict(zip(FIELDS, [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 15, 16]))
+# Yahoo's generated class on data rows; it changes with their front-end builds
+ROW_CLASS = "yf-11hlglb"
+
+_tables = etree.XPath("//table[.//th]")
+_header_cells = etree.XPath("(thead/tr | tr)[th][1]/th")
+_body_rows = etree.XPath("(tbody/tr | tr)[td]")
+_class_rows = etree.XPath("//tr[contains(@class, $row_class)]")
+_total_texts = etree.XPath("//div[contains(text(), ' results')]/text() | //span[contains(text(), ' results')]/text()")
+_whitespace = re.compile(r"\s+")
+# "1-100 of 25,347 results" above the table
+total_results_pattern = re.compile(r"\bof\s+([\d,]+)\s+results?\b")
+
+class ScreenerResult(NamedTuple):
+    rows: List[Dict[str, str]]
+    total: Optional[int]  # Size of the whole screener universe, when the page states it
+
+class ScreenerDriftError(ValueError):
+    """The screener table is gone or no longer has the columns we store."""
+
+_reported: Set[str] = set()
+
+def report_drift(kind: str, detail: str):
+    SCREENER_DRIFT.labels(kind=kind).inc()
+    if detail not in _reported:  # Log each new shape once, count every page
+        _reported.add(detail)
+        print(f"Screener markup drift ({kind}): {detail}")
+
+def cell_text(cell) -> str:
+    # Serializing the text in C is several times faster than joining itertext() or text_content()
+    return etree.tostring(cell, method="text", encoding="unicode", with_tail=False).strip()
+
+def header_text(cell) -> str:
+    return _whitespace.sub(" ", cell_text(cell))
+
+def find_table(tree):
+    """The table whose header names a Symbol column, with the cell index of each header."""
+    for table in _tables(tree):
+        headers = {header_text(th): index for index, th in enumerate(_header_cells(table))}
+        if "Symbol" in headers:
+            return table, headers
+    return None, None
+
+def column_positions(headers: Optional[Dict[str, int]]) -> Dict[str, int]:
+    if headers is None:
+        return LEGACY_POSITIONS
+    missing = [field for field in FIELDS if field not in headers]
+    if missing:
+        report_drift("columns", f"missing {missing}, page has {sorted(headers)}")
+        raise ScreenerDriftError(f"Screener columns missing: {missing}")
+    return {field: headers[field] for field in FIELDS}
+
+def check_row_class(rows: list):
+    # Tables are found by their header, so a renamed row class does not stop parsing; flag it
+    # anyway, since it means Yahoo shipped new markup and the rest may follow
+    if rows and ROW_CLASS not in (rows[0].get("class") or ""):
+        report_drift("row_class", f"data rows no longer carry {ROW_CLASS!r}, first row has class {rows[0].get('class')!r}")
+
+def parse_total_results(tree) -> Optional[int]:
+    for text in _total_texts(tree):
+        match = total_results_pattern.search(text)
+        if match:
+            return int(match.group(1).replace(",", ""))
+    return None
+
+def parse_rows(tree) -> List[Dict[str, str]]:
+    table, headers = find_table(tree)
+    if table is None:
+        # No header to map from: fall back to the known row class and cell positions
+        rows = _class_rows(tree, row_class=ROW_CLASS)
+        if rows:
+            report_drift("header", "screener table has no recognizable header row")
+    else:
+        rows = _body_rows(table)
+        check_row_class(rows)
+    if not rows:
+        return []
+    positions = list(column_positions(headers).items())
+    width = max(index for _, index in positions) + 1
+    timestamp = datetime.datetime.now(datetime.timezone.utc)  # One scrape time for the whole page
+    stamp = {
+        "timestamp": timestamp.isoformat(),  # Store timestamp as string
+        "year": str(timestamp.year),
+        "month": str(timestamp.month),
+        "day": str(timestamp.day),
+        "time": timestamp.strftime('%H:%M:%S')  # Store time as string in format hrs:min:sec
+    }
+    data = []
+    for row in rows:
+        cells = list(row.iterchildren("td"))
+        if len(cells) < width:
+            continue  # Placeholder and ad rows
+        row_data = {field: cell_text(cells[index]) for field, index in positions}
+        row_data.update(stamp)
+        data.append(row_data)
+    return data
+
+_local = threading.local()
+
+def html_parser() -> etree.HTMLParser:
+    # Parsers are not thread safe, and pages are parsed in worker threads
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        parser = _local.parser = etree.HTMLParser(collect_ids=False, remove_comments=True, remove_pis=True, no_network=True)
+    return parser
+
+def parse_screener_page(content: bytes) -> ScreenerResult:
+    tree = etree.fromstring(content, html_parser())
+    rows, total = parse_rows(tree), parse_total_results(tree)
+    if not rows and total and find_table(tree)[0] is None:
+        # The page says there are results but has neither a screener table nor known data rows:
+        # the whole markup changed. An empty table past the end of the universe is not drift.
+        report_drift("table", f"page states {total} results but has no screener table")
+        raise ScreenerDriftError(f"Screener page states {total} results but has no screener table")
+    return ScreenerResult(rows, total)
@@ -0,0 +1,94 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, NamedTuple, Optional
+
+class CacheEntry(NamedTuple):
+    data: Any
+    fetched_at: float
+
+class SnapshotCache:
+    """In-memory cache of upstream snapshots with TTL and stale-while-revalidate.
+
+    Fresh entries are served directly. Entries older than ``ttl`` but younger
+    than ``ttl + stale_ttl`` are served immediately while a background refresh
+    runs. Concurrent misses for the same key share a single upstream load.
+    """
+
+    def __init__(self, loader: Callable[..., Awaitable[Any]], ttl: float, stale_ttl: float, max_entries: int = 256):
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._last_access: Dict[Hashable, float] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        return self._entries.get(key)
+
+    def put(self, key: Hashable, data: Any) -> CacheEntry:
+        if not data and key in self._entries:
+            return self._entries[key]  # Keep serving the last good snapshot over an empty/failed fetch
+        entry = self._entries[key] = CacheEntry(data, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._last_access.pop(evicted, None)
+        return entry
+
+    async def get(self, key: Hashable) -> Any:
+        return (await self.get_entry(key)).data
+
+    async def get_entry(self, key: Hashable) -> CacheEntry:
+        now = time.monotonic()
+        self._last_access[key] = now
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = now - entry.fetched_at
+            if age < self.ttl:
+                return entry
+            if age < self.ttl + self.stale_ttl:
+                self.refresh(key)
+                return entry
+        # Shield the shared load so one cancelled request does not abort it for the others
+        return await asyncio.shield(self.refresh(key))
+
+    def refresh(self, key: Hashable) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key))
+            # Mark failures of unawaited background refreshes as retrieved
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        return task
+
+    async def _load(self, key: Hashable) -> CacheEntry:
+        try:
+            data = await self.loader(*key)
+        except Exception as e:
+            entry = self._entries.get(key)
+            if entry is None:
+                raise
+            print(f"Snapshot refresh failed for {key}: {e!r}")
+            return entry
+        finally:
+            self._inflight.pop(key, None)
+        return self.put(key, data)
+
+    def hot_keys(self, window: float) -> List[Hashable]:
+        """Keys requested within the last ``window`` seconds."""
+        cutoff = time.monotonic() - window
+        for key in [key for key, accessed in self._last_access.items() if accessed < cutoff]:
+            del self._last_access[key]
+        return list(self._last_access)
+
+    async def keep_warm(self, interval: float, window: float):
+        """Refresh recently requested keys before they expire."""
+        while True:
+            now = time.monotonic()
+            for key in self.hot_keys(window):
+                entry = self._entries.get(key)
+                if entry is None or now - entry.fetched_at >= self.ttl - interval:
+                    self.refresh(key)
+            await asyncio.sleep(interval)
@@ -0,0 +1,108 @@
+import asyncio
+import datetime
+import os
+import time
+from typing import Callable, Dict, NamedTuple, Optional
+import psutil
+from sqlalchemy import select, text
+from sqlalchemy.exc import SQLAlchemyError
+from app import config
+from app.db.database import engine, read_engine
+from app.models.news import ScraperState
+
+class SystemSnapshot(NamedTuple):
+    sampled_at: float  # Unix time
+    monotonic: float
+    cpu_percent: float  # Whole machine
+    memory_percent: float  # Whole machine
+    process_cpu_percent: float
+    process_rss_bytes: int
+    process_open_fds: Optional[int]
+    process_threads: int
+    event_loop_lag_seconds: float
+    database_ok: bool
+    database_size_bytes: Optional[int]
+    scraper_last_success_age_seconds: Dict[str, Optional[float]]
+
+SCRAPERS = ("yahoo_finance", "news")
+
+_process = psutil.Process()
+_snapshot: Optional[SystemSnapshot] = None
+
+def current_snapshot() -> Optional[SystemSnapshot]:
+    """The latest sample, or None before the sampler's first round."""
+    return _snapshot
+
+def database_size() -> Optional[int]:
+    path = engine.url.database
+    if engine.url.get_backend_name() != "sqlite" or not path or path == ":memory:":
+        return None
+    # The write-ahead log holds committed data too until it is checkpointed
+    return sum(os.path.getsize(name) for name in (path, path + "-wal") if os.path.exists(name))
+
+def database_ok() -> bool:
+    try:
+        with read_engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True
+    except Exception as e:
+        print(f"Database check failed: {e}")
+        return False
+
+def scraper_success_ages() -> Dict[str, Optional[float]]:
+    # The ingest worker, usually another process, saves each scraper's last success
+    try:
+        with read_engine.connect() as conn:
+            last_success = dict(conn.execute(select(ScraperState.name, ScraperState.last_success_at)).all())
+    except SQLAlchemyError:
+        last_success = {}
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    return {
+        name: (now - last_success[name]).total_seconds() if last_success.get(name) else None
+        for name in SCRAPERS
+    }
+
+def sample_system_stats(event_loop_lag: float) -> SystemSnapshot:
+    # Blocking: /proc reads and a database round trip, so it runs in a worker thread
+    now = time.monotonic()
+    with _process.oneshot():
+        process_cpu = _process.cpu_percent(None)  # Since the previous sample
+        rss = _process.memory_info().rss
+        open_fds = _process.num_fds() if hasattr(_process, "num_fds") else None
+        threads = _process.num_threads()
+    return SystemSnapshot(
+        sampled_at=time.time(),
+        monotonic=now,
+        cpu_percent=psutil.cpu_percent(None),
+        memory_percent=psutil.virtual_memory().percent,
+        process_cpu_percent=process_cpu,
+        process_rss_bytes=rss,
+        process_open_fds=open_fds,
+        process_threads=threads,
+        event_loop_lag_seconds=event_loop_lag,
+        database_ok=database_ok(),
+        database_size_bytes=database_size(),
+        scraper_last_success_age_seconds=scraper_success_ages()
+    )
+
+async def continuous_system_sampling(
+    interval: float = config.SYSTEM_STATS_INTERVAL_SECONDS,
+    on_sample: Optional[Callable[[SystemSnapshot], None]] = None
+):
+    """Refresh the shared snapshot every ``interval`` seconds.
+
+    Event-loop lag is how late the sampler's own sleep wakes up: a loop
+    blocked by synchronous work delays every timer by the same amount.
+    """
+    global _snapshot
+    lag = 0.0
+    while True:
+        try:
+            _snapshot = await asyncio.to_thread(sample_system_stats, lag)
+            if on_sample is not None:
+                on_sample(_snapshot)
+        except Exception as e:
+            print(f"Error sampling system stats: {e}")
+        expected = time.monotonic() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.monotonic() - expected)
@@ -1,14 +1,29 @@
-import requests
+import base64
 import hashlib
-from typing import List, Dict
-from lxml import html
+import itertools
+import json
+import math
+from typing import Any, List, Dict, NamedTuple, Optional, Tuple
+import orjson
+from sqlalchemy import Integer, and_, case, cast, func, or_, select, tuple_
 from sqlalchemy.orm import Session
-from app.db.database import SessionLocal
-from app.models.news import YahooFinanceData
+from sqlalchemy.sql import Select
+from app import config
+from app.db.database import ReadSessionLocal, session_scope
+from app.models.news import ScraperState, ScreenerPage, YahooFinanceData
+from app.services import http_client
+from app.services.data_version import YAHOO_FINANCE_DATA, bump_data_version
+from app.services.archive import YAHOO_FINANCE_DELTAS, archive_reaches, archived_deltas, archived_quote_samples
+from app.services.dedup import yahoo_finance_dedup
+from app.services.delta_store import replay, replay_rows, store_deltas
+from app.services.ingest import IngestResult, bulk_insert_unique
+from app.services.snapshot_cache import SnapshotCache
+from app.services.scheduler import Job, UpstreamError, utcnow
+from app.services.screener_parser import ScreenerResult, parse_screener_page
 import datetime  # Import datetime module
 import asyncio
 
-base_url = "https://finance.yahoo.com/research-hub/screener/mutualfunds?start={start}&count={count}"
+base_url = config.YAHOO_SCREENER_URL
 
 desired_columns = [
     "Symbol", "Name", "Change", "Change %", "Price (Intraday)",
@@ -17,125 +32,535 @@ desired_columns = [
     "50 Day Avg", "200 Day Avg", "52 Week Range"
 ]
 
+# Display string column -> normalized numeric column on YahooFinanceData
+numeric_columns = {
+    "change": "change_value",
+    "change_percent": "change_percent_value",
+    "price_intraday": "price_intraday_value",
+    "ytd_return": "ytd_return_value",
+    "three_mo_return": "three_mo_return_value",
+    "one_year": "one_year_value",
+    "three_year_return": "three_year_return_value",
+    "five_year_return": "five_year_return_value",
+    "net_expense_ratio": "net_expense_ratio_value",
+    "gross_expense_ratio": "gross_expense_ratio_value",
+    "net_assets": "net_assets_value",
+    "fifty_day_avg": "fifty_day_avg_value",
+    "two_hundred_day_avg": "two_hundred_day_avg_value"
+}
+
+_suffix_multipliers = {"K": 1e3, "M": 1e6, "B": 1e9, "T": 1e12}
+_missing_values = {"", "N/A", "NA", "--", "-"}
+
+def parse_metric(value: Optional[str]) -> Optional[float]:
+    """Parse a screener cell such as "+1.29%", "1,234.5", "1.778T" or "N/A"."""
+    if value is None:
+        return None
+    text = value.strip().replace(",", "").replace("\u2212", "-")  # Yahoo sometimes uses a unicode minus
+    if text.upper() in _missing_values:
+        return None
+    if text.endswith("%"):
+        text = text[:-1]
+    multiplier = _suffix_multipliers.get(text[-1:].upper())
+    if multiplier is not None:
+        text = text[:-1]
+    try:
+        number = float(text)
+    except ValueError:
+        return None
+    return number * multiplier if multiplier is not None else number
+
+def to_naive_utc(value: datetime.datetime) -> datetime.datetime:
+    # observed_at is stored as naive UTC, SQLite would otherwise compare local wall times
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+def parse_observed_at(timestamp: Optional[str]) -> Optional[datetime.datetime]:
+    """Parse an ISO timestamp into a naive UTC datetime for the observed_at column."""
+    if not timestamp:
+        return None
+    try:
+        return to_naive_utc(datetime.datetime.fromisoformat(timestamp))
+    except ValueError:
+        return None
+
+def normalize_yahoo_finance_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill the typed columns of a YahooFinanceData record from its raw strings."""
+    for raw_column, value_column in numeric_columns.items():
+        record[value_column] = parse_metric(record.get(raw_column))
+    record["observed_at"] = parse_observed_at(record.get("timestamp"))
+    return record
+
+# Query parameter name -> typed column, used by the min_/max_ range filters and sorting
+range_filter_columns = {
+    "change": "change_value",
+    "change_percent": "change_percent_value",
+    "price": "price_intraday_value",
+    "ytd_return": "ytd_return_value",
+    "three_mo_return": "three_mo_return_value",
+    "one_year": "one_year_value",
+    "three_year_return": "three_year_return_value",
+    "five_year_return": "five_year_return_value",
+    "net_expense_ratio": "net_expense_ratio_value",
+    "gross_expense_ratio": "gross_expense_ratio_value",
+    "net_assets": "net_assets_value",
+    "fifty_day_avg": "fifty_day_avg_value",
+    "two_hundred_day_avg": "two_hundred_day_avg_value"
+}
+
+sortable_columns = {"symbol": "symbol", "name": "name", "observed_at": "observed_at", **range_filter_columns}
+
 def generate_hash(data: Dict[str, str]) -> str:
     hash_data = "".join([data[column] for column in desired_columns if column in data]).encode()
     return hashlib.sha256(hash_data).hexdigest()
 
-def fetch_and_store_data_from_yahoo_finance(start=0, count=100):
-    session: Session = SessionLocal()
-    url = base_url.format(start=start, count=count)
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        tree = html.fromstring(response.content)
-        rows = tree.xpath("//tr[contains(@class, 'row yf-11hlglb')]")
-        
-        for row in rows:
-            cells = row.xpath(".//td")
-            if len(cells) >= len(desired_columns):
-                timestamp = datetime.datetime.now(datetime.timezone.utc)
-                row_data = {
-                    "Symbol": cells[1].text_content().strip(),
-                    "Name": cells[2].text_content().strip(),
-                    "Change": cells[3].text_content().strip(),
-                    "Change %": cells[4].text_content().strip(),
-                    "Price (Intraday)": cells[5].text_content().strip(),
-                    "YTD Return": cells[6].text_content().strip(),
-                    "3-Mo Return": cells[7].text_content().strip(),
-                    "1-Year": cells[8].text_content().strip(),
-                    "3-Year Return": cells[9].text_content().strip(),
-                    "5-Year Return": cells[10].text_content().strip(),
-                    "Net Expense Ratio": cells[11].text_content().strip(),
-                    "Gross Expense Ratio": cells[12].text_content().strip(),
-                    "Net Assets": cells[13].text_content().strip(),
-                    "50 Day Avg": cells[15].text_content().strip(),
-                    "200 Day Avg": cells[16].text_content().strip(),
-                    "timestamp": timestamp.isoformat(),  # Store timestamp as string
-                    "year": timestamp.year,
-                    "month": timestamp.month,
-                    "day": timestamp.day,
-                    "time": timestamp.strftime('%H:%M:%S')  # Store time as string in format hrs:min:sec
-                }
-                row_data_hash = generate_hash(row_data)
-
-                # Check for duplicates
-                existing_record = session.query(YahooFinanceData).filter_by(hash=row_data_hash).first()
-                if not existing_record:
-                    new_record = YahooFinanceData(
-                        symbol=row_data["Symbol"],
-                        name=row_data["Name"],
-                        change=row_data["Change"],
-                        change_percent=row_data["Change %"],
-                        price_intraday=row_data["Price (Intraday)"],
-                        ytd_return=row_data["YTD Return"],
-                        three_mo_return=row_data["3-Mo Return"],
-                        one_year=row_data["1-Year"],
-                        three_year_return=row_data["3-Year Return"],
-                        five_year_return=row_data["5-Year Return"],
-                        net_expense_ratio=row_data["Net Expense Ratio"],
-                        gross_expense_ratio=row_data["Gross Expense Ratio"],
-                        net_assets=row_data["Net Assets"],
-                        fifty_day_avg=row_data["50 Day Avg"],
-                        two_hundred_day_avg=row_data["200 Day Avg"],
-                        timestamp=row_data["timestamp"],
-                        year=row_data["year"],
-                        month=row_data["month"],
-                        day=row_data["day"],
-                        time=row_data["time"],  # Store time as string in format hrs:min:sec
-                        hash=row_data_hash
-                    )
-                    session.add(new_record)
-                    session.commit()
-    else:
-        print(f"Failed to fetch data from Yahoo Finance: {response.status_code}")
-    session.close()
-
-async def continuous_yahoo_finance_fetch():
-    start = 0  # Initialize start variable
-    while True:
-        fetch_and_store_data_from_yahoo_finance(start=start, count=100)
-        await asyncio.sleep(20)  # Fetch data every 20 seconds
-        start += 100  # Increment start by 100 for the next page
-
-def fetch_data_from_yahoo_finance(start=0, count=100) -> List[Dict[str, str]]:
+def parse_yahoo_finance_page(content: bytes) -> List[Dict[str, str]]:
+    return parse_screener_page(content).rows
+
+def to_yahoo_finance_record(row_data: Dict[str, str], hash: Optional[str] = None) -> Dict[str, Any]:
+    return normalize_yahoo_finance_record({
+        "symbol": row_data["Symbol"],
+        "name": row_data["Name"],
+        "change": row_data["Change"],
+        "change_percent": row_data["Change %"],
+        "price_intraday": row_data["Price (Intraday)"],
+        "ytd_return": row_data["YTD Return"],
+        "three_mo_return": row_data["3-Mo Return"],
+        "one_year": row_data["1-Year"],
+        "three_year_return": row_data["3-Year Return"],
+        "five_year_return": row_data["5-Year Return"],
+        "net_expense_ratio": row_data["Net Expense Ratio"],
+        "gross_expense_ratio": row_data["Gross Expense Ratio"],
+        "net_assets": row_data["Net Assets"],
+        "fifty_day_avg": row_data["50 Day Avg"],
+        "two_hundred_day_avg": row_data["200 Day Avg"],
+        "timestamp": row_data["timestamp"],
+        "year": row_data["year"],
+        "month": row_data["month"],
+        "day": row_data["day"],
+        "time": row_data["time"],  # Store time as string in format hrs:min:sec
+        "hash": hash or generate_hash(row_data)
+    })
+
+def store_yahoo_finance_data(data: List[Dict[str, str]], page: Optional[Tuple[int, int]] = None) -> IngestResult:
+    """Store a scraped page; with ``page=(start, count)`` also save it as that page's latest snapshot."""
+    hashes = [generate_hash(row_data) for row_data in data]
+    # One transaction per page, duplicates are skipped by the unique hash index
+    with session_scope() as session:
+        # Rows already stored are dropped before they are normalized; only the new ones are inserted
+        indexes = yahoo_finance_dedup.new_rows(session, YahooFinanceData, hashes)
+        records = [to_yahoo_finance_record(data[index], hashes[index]) for index in indexes]
+        if config.YAHOO_STORAGE == "delta":
+            result = store_deltas(session, records)
+        else:
+            result = bulk_insert_unique(session, YahooFinanceData, records)
+        if result.inserted:
+            bump_data_version(session, YAHOO_FINANCE_DATA)
+        if page is not None:
+            session.merge(ScreenerPage(
+                start=page[0], count=page[1],
+                fetched_at=to_naive_utc(datetime.datetime.now(datetime.timezone.utc)),
+                data=orjson.dumps(data).decode()
+            ))
+    yahoo_finance_dedup.stored(hashes)
+    return IngestResult(result.inserted, len(data) - result.inserted, result.ids)
+
+async def fetch_yahoo_finance_page(start=0, count=100) -> bytes:
     url = base_url.format(start=start, count=count)
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-    response = requests.get(url, headers=headers)
-    data = []
-    if response.status_code == 200:
-        tree = html.fromstring(response.content)
-        rows = tree.xpath("//tr[contains(@class, 'row yf-11hlglb')]")
-        for row in rows:
-            cells = row.xpath(".//td")
-            if len(cells) >= len(desired_columns):
-                timestamp = datetime.datetime.now(datetime.timezone.utc)
-                row_data = {
-                    "Symbol": cells[1].text_content().strip(),
-                    "Name": cells[2].text_content().strip(),
-                    "Change": cells[3].text_content().strip(),
-                    "Change %": cells[4].text_content().strip(),
-                    "Price (Intraday)": cells[5].text_content().strip(),
-                    "YTD Return": cells[6].text_content().strip(),
-                    "3-Mo Return": cells[7].text_content().strip(),
-                    "1-Year": cells[8].text_content().strip(),
-                    "3-Year Return": cells[9].text_content().strip(),
-                    "5-Year Return": cells[10].text_content().strip(),
-                    "Net Expense Ratio": cells[11].text_content().strip(),
-                    "Gross Expense Ratio": cells[12].text_content().strip(),
-                    "Net Assets": cells[13].text_content().strip(),
-                    "50 Day Avg": cells[15].text_content().strip(),
-                    "200 Day Avg": cells[16].text_content().strip(),
-                    "timestamp": timestamp.isoformat(),  # Store timestamp as string
-                    "year": str(timestamp.year),
-                    "month": str(timestamp.month),
-                    "day": str(timestamp.day),
-                    "time": timestamp.strftime('%H:%M:%S')  # Store time as string in format hrs:min:sec
-                }
-                data.append(row_data)
-    else:
-        print(f"Failed to fetch data from Yahoo Finance: {response.status_code}")
-    return data
+    response = await http_client.fetch(url)
+    if response.status_code != 200:
+        raise UpstreamError.from_response(response)
+    return response.content
+
+async def fetch_data_from_yahoo_finance(start=0, count=100) -> List[Dict[str, str]]:
+    content = await fetch_yahoo_finance_page(start=start, count=count)
+    # lxml parsing is CPU bound, keep it off the event loop
+    return await asyncio.to_thread(parse_yahoo_finance_page, content)
+
+async def fetch_and_store_data_from_yahoo_finance(start=0, count=100) -> ScreenerResult:
+    content = await fetch_yahoo_finance_page(start=start, count=count)
+    result = await asyncio.to_thread(parse_screener_page, content)
+    if result.rows:
+        await asyncio.to_thread(store_yahoo_finance_data, result.rows, (start, count))
+    return result
+
+def delta_record(symbol: str, observed_at: datetime.datetime, fields: Dict[str, Any]) -> Dict[str, Any]:
+    """A full YahooFinanceData record rebuilt from the delta layout."""
+    timestamp = observed_at.replace(tzinfo=datetime.timezone.utc)
+    return normalize_yahoo_finance_record({
+        "symbol": symbol,
+        **fields,
+        "timestamp": timestamp.isoformat(),
+        "year": str(timestamp.year),
+        "month": str(timestamp.month),
+        "day": str(timestamp.day),
+        "time": timestamp.strftime('%H:%M:%S')
+    })
+
+def reconstruct_yahoo_finance_records(
+    db: Session, symbol: str, start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None
+) -> List[Dict[str, Any]]:
+    """Every stored scrape of a symbol in [start, end) as full records, from the delta layout."""
+    symbol = symbol.upper()
+    return [
+        delta_record(symbol, observed_at, fields)
+        for observed_at, fields in replay(db, symbol, to_naive_utc(start) if start else None, to_naive_utc(end) if end else None)
+    ]
+
+def pages_per_round(state: ScraperState) -> int:
+    # Enough parallel pages that a sweep fits in YAHOO_SWEEP_SECONDS at the minimum round spacing
+    if not state.universe_size:
+        return config.YAHOO_PAGES_PER_ROUND
+    pages = math.ceil(state.universe_size / config.YAHOO_PAGE_SIZE)
+    rounds_possible = max(1, int(config.YAHOO_SWEEP_SECONDS // config.YAHOO_MIN_ROUND_INTERVAL_SECONDS))
+    return min(config.YAHOO_MAX_PAGES_PER_ROUND, max(config.YAHOO_PAGES_PER_ROUND, math.ceil(pages / rounds_possible)))
+
+def round_interval(state: ScraperState) -> float:
+    if not state.universe_size:
+        return config.YAHOO_ROUND_INTERVAL_SECONDS
+    rounds = math.ceil(state.universe_size / (config.YAHOO_PAGE_SIZE * pages_per_round(state)))
+    return max(config.YAHOO_MIN_ROUND_INTERVAL_SECONDS, config.YAHOO_SWEEP_SECONDS / rounds)
+
+async def sweep_yahoo_finance(state: ScraperState) -> float:
+    """Fetch the next round of screener pages and move the sweep cursor past them.
+
+    The cursor only advances over the leading pages that succeeded, so a
+    failed page is fetched again on the next run. It wraps to the first page
+    at the end of the universe: the offset the pages report, or the first
+    empty page while that is unknown. An empty page before that offset fails
+    the run.
+    """
+    count = config.YAHOO_PAGE_SIZE
+    if state.universe_size and state.cursor >= state.universe_size:
+        state.cursor = 0  # The universe shrank since the cursor was saved
+    if state.cursor == 0 or state.sweep_started_at is None:
+        state.sweep_started_at = utcnow()
+    starts = [state.cursor + page * count for page in range(pages_per_round(state))]
+    if state.universe_size:
+        starts = [start for start in starts if start < state.universe_size]
+    results = await asyncio.gather(
+        *(fetch_and_store_data_from_yahoo_finance(start=start, count=count) for start in starts),
+        return_exceptions=True
+    )
+    finished = False
+    errors = [result for result in results if isinstance(result, Exception)]
+    for start, result in zip(starts, results):
+        if isinstance(result, Exception):
+            break
+        if result.total:
+            state.universe_size = result.total
+        if not result.rows and state.universe_size and start < state.universe_size:
+            # Short of the total the pages report, an empty page is a failure, not the end
+            errors.insert(0, ValueError(f"Screener page at {start} is empty, {state.universe_size} results expected"))
+            break
+        state.cursor = start + count
+        if not result.rows or (state.universe_size and state.cursor >= state.universe_size):
+            finished = True
+            break
+    if finished:
+        state.last_sweep_seconds = (utcnow() - state.sweep_started_at).total_seconds()
+        swept = min(state.cursor, state.universe_size or state.cursor)  # The last page is usually short
+        print(f"Swept {swept} Yahoo Finance screener rows in {state.last_sweep_seconds:.0f}s")
+        state.cursor = 0
+        state.sweep_started_at = None
+    if errors:
+        raise errors[0]  # Back off; the pages before it are kept
+    return round_interval(state)
+
+yahoo_finance_job = Job("yahoo_finance", sweep_yahoo_finance, config.YAHOO_ROUND_INTERVAL_SECONDS)
+
+class ScreenerSnapshot(NamedTuple):
+    rows: List[Dict[str, Any]]
+    fetched_at: datetime.datetime  # UTC, when the ingest worker last scraped one of its pages
+
+def load_screener_page(start: int, count: int) -> Optional[ScreenerSnapshot]:
+    """Rows ``start`` to ``start + count`` of the screener, cut from the stored pages that cover them."""
+    end = start + count
+    with ReadSessionLocal() as db:
+        pages = db.execute(
+            select(ScreenerPage)
+            .where(ScreenerPage.start < end, ScreenerPage.start + ScreenerPage.count > start)
+            .order_by(ScreenerPage.fetched_at.desc())
+        ).scalars().all()
+        if not pages:
+            return None
+        rows = {}
+        for page in pages:  # Newest first, in case pages of an older page size overlap
+            for offset, row in enumerate(orjson.loads(page.data), page.start):
+                if start <= offset < end:
+                    rows.setdefault(offset, row)
+        return ScreenerSnapshot([rows[offset] for offset in sorted(rows)], pages[0].fetched_at)
+
+async def load_screener_snapshot(start=0, count=100) -> Optional[ScreenerSnapshot]:
+    return await asyncio.to_thread(load_screener_page, start, count)
+
+# Latest screener pages keyed by (start, count), read from what the ingest worker stored;
+# the API never scrapes on a request
+screener_cache = SnapshotCache(
+    loader=load_screener_snapshot,
+    ttl=config.YAHOO_CACHE_TTL_SECONDS,
+    stale_ttl=config.YAHOO_CACHE_STALE_SECONDS,
+    max_entries=config.YAHOO_CACHE_MAX_ENTRIES
+)
+
+async def continuous_yahoo_finance_cache_refresh():
+    await screener_cache.keep_warm(
+        interval=config.YAHOO_CACHE_WARM_INTERVAL_SECONDS,
+        window=config.YAHOO_CACHE_WARM_WINDOW_SECONDS
+    )
+
+def _prefix_range(column, prefix: str):
+    # column >= 'VTS' AND column < 'VTT' can seek an index, unlike LIKE 'VTS%'
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return (column >= prefix) & (column < upper)
+
+def encode_cursor(sort_by: Optional[str], sort_order: str, record: YahooFinanceData) -> str:
+    """Opaque keyset cursor pointing just past ``record`` in the given ordering."""
+    value = getattr(record, sortable_columns[sort_by]) if sort_by else None
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort_by, sort_order, value, record.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(token: str, sort_by: Optional[str], sort_order: str) -> Tuple[Any, int]:
+    """Return the (sort value, id) of a cursor, checking it belongs to this ordering."""
+    try:
+        payload = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        cursor_sort_by, cursor_sort_order, value, last_id = json.loads(payload)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort_by != sort_by or cursor_sort_order != sort_order or not isinstance(last_id, int):
+        raise ValueError("Cursor does not match the requested sort")
+    if sort_by == "observed_at" and value is not None:
+        value = datetime.datetime.fromisoformat(value)
+    return value, last_id
+
+def _after_cursor(column, value, last_id: int, descending: bool):
+    # Rows strictly after (value, id) in ORDER BY column, id; SQLite sorts NULLs first.
+    # The row-value comparison lets SQLite seek the column index, which ends in the rowid.
+    row_id = YahooFinanceData.id
+    if column is None:
+        return row_id < last_id if descending else row_id > last_id
+    if descending:
+        if value is None:
+            return and_(column.is_(None), row_id < last_id)
+        return or_(tuple_(column, row_id) < tuple_(value, last_id), column.is_(None))
+    if value is None:
+        return or_(and_(column.is_(None), row_id > last_id), column.is_not(None))
+    return tuple_(column, row_id) > tuple_(value, last_id)
+
+def yahoo_finance_query(
+    symbol: Optional[str] = None,
+    symbol_prefix: Optional[str] = None,
+    name: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    day: Optional[int] = None,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    sort_by: Optional[str] = None,
+    sort_order: str = "asc",
+    after: Optional[Tuple[Any, int]] = None,
+    limit: Optional[int] = None
+) -> Select:
+    """Build an index-friendly query over YahooFinanceData.
+
+    ``ranges`` maps keys of ``range_filter_columns`` to inclusive (min, max)
+    bounds; either bound may be None. Rows are ordered by ``sort_by`` with
+    ``id`` as a tiebreaker, and ``after`` is a decoded keyset cursor.
+    Raises ValueError for an unknown range or sort field.
+    """
+    query = select(YahooFinanceData)
+    if symbol:
+        query = query.where(YahooFinanceData.symbol == symbol.upper())
+    if symbol_prefix:
+        query = query.where(_prefix_range(YahooFinanceData.symbol, symbol_prefix.upper()))
+    if name:
+        query = query.where(YahooFinanceData.name == name)
+    if name_prefix:
+        query = query.where(_prefix_range(YahooFinanceData.name, name_prefix))
+    for field, (minimum, maximum) in (ranges or {}).items():
+        if field not in range_filter_columns:
+            raise ValueError(f"Unknown range filter: {field}")
+        column = getattr(YahooFinanceData, range_filter_columns[field])
+        if minimum is not None:
+            query = query.where(column >= minimum)
+        if maximum is not None:
+            query = query.where(column <= maximum)
+    if year:
+        query = query.where(YahooFinanceData.year == str(year))
+    if month:
+        query = query.where(YahooFinanceData.month == str(month))
+    if day:
+        query = query.where(YahooFinanceData.day == str(day))
+    if since:
+        query = query.where(YahooFinanceData.observed_at >= to_naive_utc(since))
+    if until:
+        query = query.where(YahooFinanceData.observed_at < to_naive_utc(until))
+
+    column = None
+    if sort_by:
+        if sort_by not in sortable_columns:
+            raise ValueError(f"Unknown sort field: {sort_by}")
+        column = getattr(YahooFinanceData, sortable_columns[sort_by])
+    descending = sort_order == "desc"
+    if after is not None:
+        query = query.where(_after_cursor(column, after[0], after[1], descending))
+    order = [column, YahooFinanceData.id] if column is not None else [YahooFinanceData.id]
+    query = query.order_by(*(c.desc() if descending else c.asc() for c in order))
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+_interval_units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+# Bucket widths picked by automatic downsampling, in seconds
+_auto_intervals = [1, 5, 10, 20, 30, 60, 300, 600, 900, 1800, 3600, 7200, 14400, 21600, 43200, 86400, 604800]
+
+def parse_interval(interval: str) -> int:
+    """Parse an interval such as "20s", "5m", "1h" or "1d" into seconds."""
+    text = interval.strip().lower()
+    unit = _interval_units.get(text[-1:])
+    try:
+        seconds = int(text[:-1]) * unit if unit else int(text)
+    except ValueError:
+        raise ValueError(f"Invalid interval: {interval}")
+    if seconds <= 0:
+        raise ValueError(f"Invalid interval: {interval}")
+    return seconds
+
+def auto_interval(start: datetime.datetime, end: datetime.datetime, max_points: int) -> int:
+    span = (end - start).total_seconds()
+    for seconds in _auto_intervals:
+        if span / seconds <= max_points:
+            return seconds
+    return _auto_intervals[-1]
+
+def history_samples(
+    db: Session, symbol: str, start: Optional[datetime.datetime], end: Optional[datetime.datetime], field: str, conditions: list
+) -> List[Tuple[datetime.datetime, float]]:
+    # The full rows still in SQLite, the archived ones and, in the delta layout, the replayed deltas
+    value_column = range_filter_columns[field]
+    start = to_naive_utc(start) if start else None
+    end = to_naive_utc(end) if end else None
+    samples = [tuple(row) for row in db.execute(
+        select(YahooFinanceData.observed_at, getattr(YahooFinanceData, value_column)).where(*conditions)
+    )]
+    if archive_reaches(YAHOO_FINANCE_DATA, start):
+        samples += archived_quote_samples(symbol.upper(), value_column, start, end)
+    if config.YAHOO_STORAGE == "delta":
+        raw_column = next(raw for raw, typed in numeric_columns.items() if typed == value_column)
+        replayed = replay(db, symbol.upper(), start, end)
+        if archive_reaches(YAHOO_FINANCE_DELTAS, start):
+            replayed = itertools.chain(replay_rows(archived_deltas(symbol.upper(), end), start), replayed)
+        for observed_at, fields in replayed:
+            value = parse_metric(fields.get(raw_column))
+            if value is not None:
+                samples.append((observed_at, value))
+    samples.sort(key=lambda sample: sample[0])
+    return samples
+
+def history_buckets(samples: List[Tuple[datetime.datetime, float]], interval: int) -> List[Dict[str, Any]]:
+    """The OHLC buckets yahoo_finance_history computes in SQL, from samples sorted by time."""
+    buckets = {}
+    for observed_at, value in samples:
+        bucket = int(observed_at.replace(tzinfo=datetime.timezone.utc).timestamp()) // interval
+        entry = buckets.get(bucket)
+        if entry is None:
+            buckets[bucket] = [value, value, value, value, 1]
+        else:
+            entry[1] = max(entry[1], value)
+            entry[2] = min(entry[2], value)
+            entry[3] = value
+            entry[4] += 1
+    return [
+        {
+            "bucket_start": datetime.datetime.fromtimestamp(bucket * interval, datetime.timezone.utc).isoformat(),
+            "interval_seconds": interval,
+            "open": open_,
+            "high": high,
+            "low": low,
+            "close": close,
+            "count": count
+        }
+        for bucket, (open_, high, low, close, count) in sorted(buckets.items())
+    ]
+
+def history_in_python(start: Optional[datetime.datetime]) -> bool:
+    """Whether a history from ``start`` replays deltas or reads the archive, and is bucketed in Python."""
+    return config.YAHOO_STORAGE == "delta" or archive_reaches(YAHOO_FINANCE_DATA, to_naive_utc(start) if start else None)
+
+def load_yahoo_finance_history(symbol: str, **kwargs) -> List[Dict[str, Any]]:
+    """yahoo_finance_history with its own read session, for a worker thread."""
+    with ReadSessionLocal() as db:
+        return yahoo_finance_history(db, symbol, **kwargs)
+
+def yahoo_finance_history(
+    db: Session,
+    symbol: str,
+    start: Optional[datetime.datetime] = None,
+    end: Optional[datetime.datetime] = None,
+    interval: Optional[int] = None,
+    field: str = "price",
+    max_points: int = 500
+) -> List[Dict[str, Any]]:
+    """Bucketed OHLC aggregates of one metric for a symbol, computed in SQL.
+
+    Without an explicit ``interval`` the bucket width is chosen so that the
+    range yields at most ``max_points`` buckets. When the range reaches into
+    the Parquet archive, or in the delta layout, the samples of every tier
+    are bucketed in Python instead.
+    """
+    if field not in range_filter_columns:
+        raise ValueError(f"Unknown history field: {field}")
+    value = getattr(YahooFinanceData, range_filter_columns[field])
+    observed_at = YahooFinanceData.observed_at
+    conditions = [YahooFinanceData.symbol == symbol.upper(), value.is_not(None)]
+    if start:
+        conditions.append(observed_at >= to_naive_utc(start))
+    if end:
+        conditions.append(observed_at < to_naive_utc(end))
+    if history_in_python(start):
+        samples = history_samples(db, symbol, start, end, field, conditions)
+        if not samples:
+            return []
+        if interval is None:
+            interval = auto_interval(to_naive_utc(start) if start else samples[0][0], to_naive_utc(end) if end else samples[-1][0], max_points)
+        return history_buckets(samples, interval)
+
+    if interval is None:
+        first, last = db.execute(select(func.min(observed_at), func.max(observed_at)).where(*conditions)).one()
+        if first is None:
+            return []
+        interval = auto_interval(to_naive_utc(start) if start else first, to_naive_utc(end) if end else last, max_points)
+
+    bucket = cast(func.strftime("%s", observed_at), Integer) // interval
+    samples = select(
+        bucket.label("bucket"),
+        value.label("value"),
+        func.row_number().over(partition_by=bucket, order_by=observed_at.asc()).label("first_rank"),
+        func.row_number().over(partition_by=bucket, order_by=observed_at.desc()).label("last_rank")
+    ).where(*conditions).subquery()
+    query = select(
+        samples.c.bucket,
+        func.max(case((samples.c.first_rank == 1, samples.c.value))).label("open"),
+        func.max(samples.c.value).label("high"),
+        func.min(samples.c.value).label("low"),
+        func.max(case((samples.c.last_rank == 1, samples.c.value))).label("close"),
+        func.count().label("count")
+    ).group_by(samples.c.bucket).order_by(samples.c.bucket)
+
+    return [
+        {
+            "bucket_start": datetime.datetime.fromtimestamp(row.bucket * interval, datetime.timezone.utc).isoformat(),
+            "interval_seconds": interval,
+            "open": row.open,
+            "high": row.high,
+            "low": row.low,
+            "close": row.close,
+            "count": row.count
+        }
+        for row in db.execute(query)
+    ]
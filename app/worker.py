@@ -0,0 +1,48 @@
+# Ingest worker: python -m app.worker
+# Runs every scraper in one process, so the API can run with many workers without
+# each of them scraping and writing. A second worker, started by mistake or as a
+# standby, waits on the ingest lock until the first one exits.
+import asyncio
+from app import config
+from app.db.migrations import prepare_database
+from app.services.archive import retention_job
+from app.services.dedup import warm_dedup_filters
+from app.services.delta_store import delta_compaction_job
+from app.services.file_lock import FileLock
+from app.services.http_client import close_http_client
+from app.services.news import news_job
+from app.services.scheduler import run_job
+from app.services.yahoo_finance import yahoo_finance_job
+
+async def run_ingest(lock_path: str = config.WORKER_LOCK_FILE):
+    """Run the scrapers once this process holds the ingest lock; never returns."""
+    lock = FileLock(lock_path)
+    if not lock.acquire(blocking=False):
+        print(f"Ingest lock {lock_path} is held by another process, standing by")
+        while not lock.acquire(blocking=False):
+            await asyncio.sleep(config.WORKER_STANDBY_INTERVAL_SECONDS)
+    print(f"Acquired ingest lock {lock_path}, starting scrapers")
+    try:
+        # Only the lock holder writes, so the filters stay in step with the tables from here on
+        await asyncio.to_thread(warm_dedup_filters)
+        jobs = [news_job, yahoo_finance_job]
+        if config.YAHOO_STORAGE == "delta":
+            jobs.append(delta_compaction_job)
+        if config.RETENTION_HOT_DAYS > 0:
+            jobs.append(retention_job)
+        await asyncio.gather(*(run_job(job) for job in jobs))
+    finally:
+        lock.release()
+
+async def main():
+    try:
+        await run_ingest()
+    finally:
+        await close_http_client()
+
+if __name__ == "__main__":
+    prepare_database()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../../")
+
+#  python tests/benchmarks/bench_dedup.py [hashes] [pages] [rows_per_page]
+# Warm and lookup rates, measured false-positive rate and memory of the dedup filter
+# at millions of hashes, then re-scrape ingest with and without the filter in front
+# of the bulk conflict-ignore insert.
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import config
+from app.db.database import Base
+from app.models.news import YahooFinanceData
+from app.services.dedup import DedupFilter
+from app.services.ingest import bulk_insert_unique
+from app.services.yahoo_finance import generate_hash, to_yahoo_finance_record
+from bench_ingest import make_page
+
+def digest(key: str) -> str:
+    return hashlib.sha256(key.encode()).hexdigest()
+
+def bench_filter(hashes: int):
+    dedup = DedupFilter("bench", config.DEDUP_RECENT_SIZE, config.DEDUP_BLOOM_CAPACITY, config.DEDUP_ERROR_RATE)
+    stored = [digest(f"stored {i}") for i in range(hashes)]
+    started = time.perf_counter()
+    dedup.warm(stored)
+    elapsed = time.perf_counter() - started
+    print(f"    warm: {hashes:,} hashes in {elapsed:.2f}s -> {hashes / elapsed:,.0f} hashes/s")
+
+    probes = 100000
+    new = [digest(f"new {i}") for i in range(probes)]
+    started = time.perf_counter()
+    candidates = dedup.candidates(new)
+    elapsed = time.perf_counter() - started
+    false_positive_rate = len(candidates.maybe_seen) / probes
+    print(f"  lookup: {probes / elapsed:,.0f} new hashes/s, false positives {false_positive_rate:.3%} "
+          f"(target {config.DEDUP_ERROR_RATE:.1%})")
+    started = time.perf_counter()
+    dedup.candidates(stored[-probes:])
+    elapsed = time.perf_counter() - started
+    print(f"  lookup: {probes / elapsed:,.0f} recent hashes/s")
+    stats = dedup.stats()
+    print(f"  memory: {stats['memory_bytes'] / 2 ** 20:.1f} MiB ({len(dedup.bloom.filters)} Bloom filters, "
+          f"{stats['recent_size']:,} recent hashes)")
+
+def ingest(Session, data, dedup):
+    hashes = [generate_hash(row) for row in data]
+    with Session.begin() as session:
+        indexes = dedup.new_rows(session, YahooFinanceData, hashes) if dedup else range(len(data))
+        bulk_insert_unique(session, YahooFinanceData, [to_yahoo_finance_record(data[i], hashes[i]) for i in indexes])
+    if dedup:
+        dedup.stored(hashes)
+
+def bench_ingest(name, dedup, pages, rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        if dedup:
+            dedup.warm([])
+        started = time.perf_counter()
+        for page in range(pages):
+            ingest(Session, make_page(page, rows), dedup)
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+    total = pages * rows
+    print(f"{name:>8}: {total} rows in {elapsed:.3f}s -> {total / elapsed:,.0f} rows/s")
+
+if __name__ == "__main__":
+    hashes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rows = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    bench_filter(hashes)
+    bench_ingest("bulk", None, pages, rows)
+    bench_ingest("filtered", DedupFilter("bench", config.DEDUP_RECENT_SIZE, config.DEDUP_BLOOM_CAPACITY, config.DEDUP_ERROR_RATE), pages, rows)
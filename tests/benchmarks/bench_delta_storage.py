@@ -0,0 +1,113 @@
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../../")
+
+#  python tests/benchmarks/bench_delta_storage.py [symbols] [sweeps]
+# Database growth per day and read-side cost of the full-row layout against the delta layout
+# (YAHOO_STORAGE=delta), on simulated sweeps where prices move often and expense ratios and
+# assets rarely. A day is 86400 / YAHOO_SWEEP_SECONDS sweeps.
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from app import config
+from app.db.database import Base
+from app.models.news import YahooFinanceData
+from app.services.delta_store import compact_deltas, store_deltas
+from app.services.ingest import bulk_insert_unique
+from app.services.yahoo_finance import reconstruct_yahoo_finance_records, to_yahoo_finance_record, yahoo_finance_history
+
+# Chance that a field changes between two sweeps
+CHURN = {
+    "Change": 0.5, "Change %": 0.5, "Price (Intraday)": 0.5, "YTD Return": 0.3, "3-Mo Return": 0.1, "1-Year": 0.1,
+    "3-Year Return": 0.02, "5-Year Return": 0.02, "Net Expense Ratio": 0.0005, "Gross Expense Ratio": 0.0005,
+    "Net Assets": 0.01, "50 Day Avg": 0.05, "200 Day Avg": 0.02
+}
+START = datetime.datetime(2025, 1, 20)
+
+def sweeps(symbols: int, count: int):
+    rng = random.Random(7)
+    state = {
+        f"SYM{i:05d}": {"Symbol": f"SYM{i:05d}", "Name": f"Fund {i}", **{field: f"{rng.uniform(1, 200):.2f}" for field in CHURN}}
+        for i in range(symbols)
+    }
+    for sweep in range(count):
+        observed_at = START + datetime.timedelta(seconds=sweep * config.YAHOO_SWEEP_SECONDS)
+        stamp = {
+            "timestamp": observed_at.isoformat() + "+00:00", "year": str(observed_at.year), "month": str(observed_at.month),
+            "day": str(observed_at.day), "time": observed_at.strftime("%H:%M:%S")
+        }
+        rows = []
+        for row in state.values():
+            for field, churn in CHURN.items():
+                if rng.random() < churn:
+                    row[field] = f"{float(row[field]) * rng.uniform(0.99, 1.01):.2f}"
+            rows.append({**row, **stamp})
+        yield rows
+
+def database_size(engine) -> int:
+    with engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+    return os.path.getsize(engine.url.database)
+
+def per_day(size: int, sweeps_stored: int) -> str:
+    return f"{size / sweeps_stored * 86400 / config.YAHOO_SWEEP_SECONDS / 2 ** 20:,.1f} MiB/day"
+
+def read_cost(engine, name, read, symbols):
+    with Session(engine) as db:
+        started = time.perf_counter()
+        rows = sum(len(read(db, symbol)) for symbol in symbols)
+        elapsed = time.perf_counter() - started
+    print(f"  {name:<22} {elapsed / len(symbols) * 1000:.2f} ms/symbol ({rows} results)")
+
+def full_records(db, symbol):
+    return db.execute(select(YahooFinanceData).where(YahooFinanceData.symbol == symbol).order_by(YahooFinanceData.observed_at)).all()
+
+if __name__ == "__main__":
+    symbol_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    sweep_count = int(sys.argv[2]) if len(sys.argv) > 2 else 144
+    with tempfile.TemporaryDirectory() as tmp:
+        full = create_engine(f"sqlite:///{tmp}/full.db")
+        delta = create_engine(f"sqlite:///{tmp}/delta.db")
+        Base.metadata.create_all(bind=full)
+        Base.metadata.create_all(bind=delta)
+        base_full, base_delta = database_size(full), database_size(delta)
+        write_full = write_delta = 0.0
+        for rows in sweeps(symbol_count, sweep_count):
+            records = [to_yahoo_finance_record(row) for row in rows]
+            started = time.perf_counter()
+            with Session(full) as db, db.begin():
+                bulk_insert_unique(db, YahooFinanceData, records)
+            write_full += time.perf_counter() - started
+            started = time.perf_counter()
+            with Session(delta) as db, db.begin():
+                store_deltas(db, records)
+            write_delta += time.perf_counter() - started
+        rows = symbol_count * sweep_count
+        print(f"{symbol_count} symbols x {sweep_count} sweeps, one every {config.YAHOO_SWEEP_SECONDS:.0f}s")
+        print(f"  full:      {per_day(database_size(full) - base_full, sweep_count)}, writes {rows / write_full:,.0f} rows/s")
+        print(f"  delta:     {per_day(database_size(delta) - base_delta, sweep_count)}, writes {rows / write_delta:,.0f} rows/s")
+
+        symbols = [f"SYM{i:05d}" for i in random.Random(1).sample(range(symbol_count), min(50, symbol_count))]
+        print("Reads of a symbol's whole range:")
+        read_cost(full, "full rows", full_records, symbols)
+        read_cost(delta, "delta replay", reconstruct_yahoo_finance_records, symbols)
+        read_cost(full, "full history (SQL)", lambda db, symbol: yahoo_finance_history(db, symbol, interval=3600), symbols)
+        config.YAHOO_STORAGE = "delta"
+        read_cost(delta, "delta history", lambda db, symbol: yahoo_finance_history(db, symbol, interval=3600), symbols)
+
+        horizon = START + datetime.timedelta(days=365)
+        with Session(delta) as db, db.begin():
+            last_id, removed = 0, 0
+            while True:
+                last, batch_removed = compact_deltas(db, last_id, horizon, config.YAHOO_DELTA_COMPACT_RESOLUTION_SECONDS)
+                if last == last_id:
+                    break
+                last_id, removed = last, removed + batch_removed
+        print(f"  compacted to {config.YAHOO_DELTA_COMPACT_RESOLUTION_SECONDS}s: {per_day(database_size(delta) - base_delta, sweep_count)}"
+              f" after removing {removed} deltas")
+        read_cost(delta, "compacted replay", reconstruct_yahoo_finance_records, symbols)
+        full.dispose()
+        delta.dispose()
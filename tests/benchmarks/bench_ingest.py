@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../../")
+
+#  python tests/benchmarks/bench_ingest.py [pages] [rows_per_page]
+# Compares the per-row lookup + commit ingest with the bulk conflict-ignore path
+# on a throwaway file-backed SQLite database.
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.database import Base
+from app.models.news import YahooFinanceData
+from app.services.ingest import bulk_insert_unique
+from app.services.yahoo_finance import to_yahoo_finance_record
+
+def make_page(page: int, rows: int, churn: float = 0.1):
+    data = []
+    for i in range(rows):
+        # Only a fraction of rows change between scrapes, like a real re-scrape
+        version = page if i < rows * churn else 0
+        data.append({
+            "Symbol": f"SYM{i:05d}", "Name": f"Fund {i}", "Change": f"+{version}.01",
+            "Change %": "+0.94%", "Price (Intraday)": f"{100 + i}.16", "YTD Return": "+1.29%",
+            "3-Mo Return": "+2.24%", "1-Year": "+25.89%", "3-Year Return": "+25.59%",
+            "5-Year Return": "+30.65%", "Net Expense Ratio": "0.04", "Gross Expense Ratio": "0.04",
+            "Net Assets": "1.778T", "50 Day Avg": "143.53", "200 Day Avg": "134.03",
+            "timestamp": "2025-01-20T05:21:24+00:00", "year": "2025", "month": "1", "day": "20",
+            "time": "05:21:24"
+        })
+    return data
+
+def per_row_ingest(Session, data):
+    session = Session()
+    for record in (to_yahoo_finance_record(row) for row in data):
+        if not session.query(YahooFinanceData).filter_by(hash=record["hash"]).first():
+            session.add(YahooFinanceData(**record))
+            session.commit()
+    session.close()
+
+def bulk_ingest(Session, data):
+    with Session.begin() as session:
+        bulk_insert_unique(session, YahooFinanceData, [to_yahoo_finance_record(row) for row in data])
+
+def run(name, ingest, pages, rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        started = time.perf_counter()
+        for page in range(pages):
+            ingest(Session, make_page(page, rows))
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+    total = pages * rows
+    print(f"{name:>8}: {total} rows in {elapsed:.3f}s -> {total / elapsed:,.0f} rows/s")
+
+if __name__ == "__main__":
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    run("per-row", per_row_ingest, pages, rows)
+    run("bulk", bulk_ingest, pages, rows)
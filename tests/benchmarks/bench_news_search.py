@@ -0,0 +1,64 @@
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../../")
+
+#  python tests/benchmarks/bench_news_search.py [articles]
+# Times /news/search style FTS5 queries against the LIKE scan they replace.
+from sqlalchemy import create_engine, or_, select
+from sqlalchemy.orm import Session
+from app.db.database import Base
+from app.models.news import NewsArticle
+from app.services.news_search import create_news_search_index, search_news
+
+WORDS = [
+    "bank", "fund", "merger", "acquisition", "quarter", "earnings", "dividend", "capital", "market", "growth",
+    "insurance", "payments", "fintech", "lending", "credit", "investment", "portfolio", "equity", "bond", "yield",
+    "strategic", "partnership", "launch", "platform", "digital", "regulatory", "approval", "results", "revenue", "asset"
+] + [f"term{i}" for i in range(5000)]  # Long tail vocabulary so rare terms stay rare
+
+def generate(engine, count: int, batch: int = 20000):
+    rng = random.Random(42)
+    table = NewsArticle.__table__
+    with engine.begin() as conn:
+        for offset in range(0, count, batch):
+            conn.execute(table.insert(), [
+                {
+                    "title": " ".join(rng.choices(WORDS, k=8)),
+                    "source": rng.choice(["PR Newswire", "Business Wire"]),
+                    "content": " ".join(rng.choices(WORDS, k=60)),
+                    "hash": f"bench-{i}"
+                }
+                for i in range(offset, min(offset + batch, count))
+            ])
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        Base.metadata.create_all(bind=engine)
+        started = time.perf_counter()
+        generate(engine, count)
+        create_news_search_index(engine)
+        print(f"built {count:,} articles + FTS index in {time.perf_counter() - started:.1f}s")
+
+        with Session(engine) as db:
+            for q in ["merger", "term4242 term17", "bank dividend", "strat*"]:
+                like_terms = [t.rstrip("*") for t in q.split()]
+                like = select(NewsArticle.id).where(*(
+                    or_(NewsArticle.title.like(f"%{t}%"), NewsArticle.content.like(f"%{t}%")) for t in like_terms
+                ))  # LIKE cannot rank, so it has to read every match before picking a page
+                fts_ms = timed(lambda: search_news(db, q, limit=20))
+                like_ms = timed(lambda: db.execute(like).all(), repeat=1)
+                print(f"q={q!r:18} fts5: {fts_ms:8.2f} ms   like scan: {like_ms:8.2f} ms")
+        engine.dispose()
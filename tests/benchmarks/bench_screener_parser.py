@@ -0,0 +1,46 @@
+import datetime
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../../")
+
+#  python tests/benchmarks/bench_screener_parser.py [iterations]
+# Rows parsed per second on the recorded screener page (tests/fixtures/yahoo_screener.html),
+# for the header-mapped parser and the per-row XPath version it replaced.
+from lxml import html
+from app.services.screener_parser import parse_screener_page
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fixtures", "yahoo_screener.html")
+
+def legacy_parse(content: bytes):
+    tree = html.fromstring(content)
+    data = []
+    for row in tree.xpath("//tr[contains(@class, 'row yf-11hlglb')]"):
+        cells = row.xpath(".//td")
+        if len(cells) >= 17:
+            timestamp = datetime.datetime.now(datetime.timezone.utc)
+            row_data = {name: cells[index].text_content().strip() for name, index in (
+                ("Symbol", 1), ("Name", 2), ("Change", 3), ("Change %", 4), ("Price (Intraday)", 5),
+                ("YTD Return", 6), ("3-Mo Return", 7), ("1-Year", 8), ("3-Year Return", 9), ("5-Year Return", 10),
+                ("Net Expense Ratio", 11), ("Gross Expense Ratio", 12), ("Net Assets", 13), ("50 Day Avg", 15),
+                ("200 Day Avg", 16)
+            )}
+            row_data.update(timestamp=timestamp.isoformat(), year=str(timestamp.year), month=str(timestamp.month),
+                            day=str(timestamp.day), time=timestamp.strftime('%H:%M:%S'))
+            data.append(row_data)
+    return data
+
+def run(name, parse, content, iterations):
+    rows = len(parse(content))
+    started = time.perf_counter()
+    for _ in range(iterations):
+        parse(content)
+    elapsed = time.perf_counter() - started
+    print(f"{name:>8}: {elapsed / iterations * 1000:.2f} ms/page, {rows * iterations / elapsed:,.0f} rows/s")
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with open(FIXTURE, "rb") as f:
+        content = f.read()
+    run("legacy", legacy_parse, content, iterations)
+    run("parser", lambda page: parse_screener_page(page).rows, content, iterations)
@@ -0,0 +1,284 @@
+import argparse
+import asyncio
+import contextlib
+import functools
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, NamedTuple
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../../")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../fixtures")
+
+#  python tests/benchmarks/suite.py [--size 10k|1m|10m] [--only PREFIX] [--tolerance 0.35] [--save]
+# Offline micro-benchmarks of the ingest and query hot paths; nothing touches the network:
+#   parse.*   rows or items parsed per second from the recorded fixtures in tests/fixtures
+#   hash.*    row hashes per second
+#   ingest.*  rows per second through the bulk insert path, into a throwaway database
+#   query.*   latency of the /yahoofinance and /news endpoints per filter, against a
+#             synthetic database of --size quotes and articles (see synthetic.py)
+# Each result is compared with tests/benchmarks/baseline.json for the same size, and the run
+# fails when one is worse than its baseline by more than --tolerance. --save records this run
+# as the baseline instead; baselines are machine specific, so record them where the suite runs.
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+from app import config
+from app.db.database import Base, create_async_db_engine, get_async_db
+from app.models.news import YahooFinanceData
+from app.routers import news as news_router, yahoo_finance as yahoo_finance_router
+from app.schemas.news import NewsArticleCreate
+from app.services import news
+from app.services.http_cache import response_cache
+from app.services.ingest import bulk_insert_unique
+from app.services.news_search import create_news_search_index
+from app.services.screener_parser import parse_screener_page
+from app.services.yahoo_finance import generate_hash, to_yahoo_finance_record
+from make_fixtures import screener_page
+from synthetic import DATA_DIR, database
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fixtures")
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+class Result(NamedTuple):
+    name: str
+    value: float
+    unit: str  # "<items>/s" is better higher, "ms" better lower
+
+    @property
+    def higher_is_better(self) -> bool:
+        return self.unit.endswith("/s")
+
+def calibration():
+    # Fixed pure Python work: how fast the machine is right now, to compare runs made at different speeds
+    return sum(i * i for i in range(20000))
+
+def best_seconds(runs: Dict[str, Callable[[], None]], rounds: int, warmup: int = 2) -> Dict[str, float]:
+    """Fastest round of each run, the one least disturbed by the rest of the machine.
+
+    Rounds go round-robin over the runs and a "calibration" run, so a slow
+    spell on the machine slows every run a little instead of one of them a
+    lot, and the calibration says how fast the machine was meanwhile.
+    """
+    runs = dict(runs, calibration=calibration)
+    for _ in range(warmup):
+        for run in runs.values():
+            run()
+    best = {name: float("inf") for name in runs}
+    for _ in range(rounds):
+        for name, run in runs.items():
+            started = time.perf_counter()
+            run()
+            best[name] = min(best[name], time.perf_counter() - started)
+    return best
+
+def read_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+def parse_and_hash_benchmarks() -> List[Result]:
+    page = read_fixture("yahoo_screener.html")
+    feed = read_fixture("news_feed.xml")
+    rows = parse_screener_page(page).rows
+    articles = news.parse_rss_feed(feed, "PR Newswire")
+    quote_hashes = rows * 20
+    article_hashes = articles * 40
+    best = best_seconds({
+        "parse.screener": lambda: parse_screener_page(page),
+        "parse.rss": lambda: news.parse_rss_feed(feed, "PR Newswire"),
+        "hash.quote": lambda: [generate_hash(row) for row in quote_hashes],
+        "hash.article": lambda: [news.generate_hash(article) for article in article_hashes]
+    }, 100)
+    return [
+        Result("parse.screener", len(rows) / best["parse.screener"], "rows/s"),
+        Result("parse.rss", len(articles) / best["parse.rss"], "items/s"),
+        Result("hash.quote", len(quote_hashes) / best["hash.quote"], "hashes/s"),
+        Result("hash.article", len(article_hashes) / best["hash.article"], "hashes/s"),
+        Result("calibration.parse", best["calibration"] * 1000, "ms")
+    ]
+
+def ingest_benchmarks(rounds: int = 10, pages: int = 10) -> List[Result]:
+    # Every round stores pages it has not seen before; the re-scrape stores them again
+    batches = [
+        [
+            row for page in range(pages)
+            for row in parse_screener_page(screener_page(start=page * 100, seed=round_ * 100 + page).encode()).rows
+        ]
+        for round_ in range(rounds + 2)
+    ]
+    feed = news.parse_rss_feed(read_fixture("news_feed.xml"), "PR Newswire")
+    article_batches = [
+        [
+            NewsArticleCreate(**dict(article.model_dump(), title=f"{article.title} {round_}-{i}"))
+            for i in range(10) for article in feed
+        ]
+        for round_ in range(rounds + 2)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/ingest.db")
+        Base.metadata.create_all(bind=engine)
+        create_news_search_index(engine)
+        pending = iter(batches)
+
+        def store(rows):
+            with Session(engine) as db, db.begin():
+                bulk_insert_unique(db, YahooFinanceData, [to_yahoo_finance_record(row) for row in rows])
+
+        pending_articles = iter(article_batches)
+
+        def store_articles():
+            with Session(engine) as db:
+                news.store_unique_news(db, next(pending_articles))
+
+        best = best_seconds({
+            "ingest.quotes.new": lambda: store(next(pending)),
+            "ingest.quotes.rescrape": lambda: store(batches[0]),
+            "ingest.news": store_articles
+        }, rounds)
+        engine.dispose()
+    return [
+        Result("ingest.quotes.new", len(batches[0]) / best["ingest.quotes.new"], "rows/s"),
+        Result("ingest.quotes.rescrape", len(batches[0]) / best["ingest.quotes.rescrape"], "rows/s"),
+        Result("ingest.news", len(article_batches[0]) / best["ingest.news"], "rows/s"),
+        Result("calibration.ingest", best["calibration"] * 1000, "ms")
+    ]
+
+# Endpoint and query string per case, chosen to hit each filter's index on the synthetic data
+QUERIES = {
+    "query.quotes.latest": "/yahoofinance/quotes",
+    "query.quotes.symbol": "/yahoofinance/quotes?symbol=F00007X",
+    "query.quotes.symbol_prefix": "/yahoofinance/quotes?symbol_prefix=F0000",
+    "query.quotes.name_prefix": "/yahoofinance/quotes?name_prefix=Example%20Index%20Fund%2012",
+    "query.quotes.price_range": "/yahoofinance/quotes?min_price=100&max_price=101&sort_by=price",
+    "query.quotes.net_assets_desc": "/yahoofinance/quotes?min_net_assets=1e12&sort_by=net_assets&sort_order=desc",
+    "query.quotes.expense_and_assets": "/yahoofinance/quotes?max_net_expense_ratio=0.1&min_net_assets=1e9",
+    "query.quotes.time_range": "/yahoofinance/quotes?since=2025-01-15T00:00:00&until=2025-01-15T06:00:00",
+    "query.quotes.day": "/yahoofinance/quotes?year=2025&month=1&day=20",
+    "query.history.auto": "/yahoofinance/F00007X/history",
+    "query.history.hourly": "/yahoofinance/F00007X/history?interval=1h&from=2025-01-10T00:00:00&to=2025-01-20T00:00:00",
+    "query.news.latest": "/news",
+    "query.news.source": "/news?source=Business%20Wire",
+    "query.news.before": "/news?before=2025-01-10T00:00:00",
+    "query.news.since": "/news?since=2025-01-30T00:00:00",
+    "query.news.search": "/news/search?q=merger%20dividend",
+    "query.news.search_prefix": "/news/search?q=strat*"
+}
+
+def query_benchmarks(size: str, rounds: int = 50) -> List[Result]:
+    engine = create_async_db_engine(f"sqlite:///{database(size)}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+
+    async def synthetic_db():
+        async with sessions() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(news_router.router)
+    app.include_router(yahoo_finance_router.router)
+    app.dependency_overrides[get_async_db] = synthetic_db
+    response_cache.max_bytes = 0  # Time the queries, not the cached bodies
+    config.ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")  # Never an archive left by a local worker
+    with TestClient(app) as client:
+        def request(url):
+            response = client.get(url)
+            assert response.status_code == 200, (url, response.status_code, response.text[:200])
+        best = best_seconds({name: functools.partial(request, url) for name, url in QUERIES.items()}, rounds)
+    asyncio.run(engine.dispose())
+    best["calibration.query"] = best.pop("calibration")
+    return [Result(name, seconds * 1000, "ms") for name, seconds in best.items()]
+
+def group(name: str) -> str:
+    # The benchmark function a result comes from, i.e. the runs its calibration was measured with
+    kind, _, rest = name.partition(".")
+    if kind == "calibration":
+        return rest
+    return "parse" if kind == "hash" else kind
+
+def compare(results: List[Result], baseline: Dict[str, dict], tolerance: float, report: bool = True) -> List[str]:
+    """Print each result against its baseline; returns the names worse by more than ``tolerance``.
+
+    Results are compared as measured on a machine as fast as the baseline's:
+    a run whose calibration took 20% longer is expected to be 20% slower.
+    """
+    speeds = {}
+    for result in results:
+        if result.name.startswith("calibration.") and result.name in baseline:
+            speeds[group(result.name)] = result.value / baseline[result.name]["value"]
+    regressions = []
+    lines = [f"{'benchmark':<34}{'result':>14}  {'baseline':>14}{'change':>10}"]
+    for result in results:
+        base = baseline.get(result.name)
+        line = f"{result.name:<34}{result.value:>14,.2f}  "
+        if base is None:
+            lines.append(f"{line}{'-':>14}{'new':>10}  {result.unit}")
+            continue
+        slowdown = speeds.get(group(result.name), 1) if not result.name.startswith("calibration.") else 1
+        expected = base["value"] / slowdown if result.higher_is_better else base["value"] * slowdown
+        change = result.value / expected - 1
+        worse = -change if result.higher_is_better else change
+        status = ""
+        if worse > tolerance and not result.name.startswith("calibration."):
+            status = "  REGRESSION"
+            regressions.append(result.name)
+        lines.append(f"{line}{base['value']:>14,.2f}{change:>+10.1%}  {result.unit}{status}")
+    if report:
+        print("\n".join(lines))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline ingest and query micro-benchmarks")
+    parser.add_argument("--size", default="10k", help="Synthetic database size: 10k, 1m, 10m or a row count")
+    parser.add_argument("--only", default="", help="Run only the benchmarks whose name starts with this")
+    parser.add_argument("--tolerance", type=float, default=0.35, help="Allowed slowdown against the baseline, 0.35 = 35%%")
+    parser.add_argument("--save", action="store_true", help="Record this run as the baseline for --size")
+    args = parser.parse_args()
+
+    groups = {
+        "parse": parse_and_hash_benchmarks, "ingest": ingest_benchmarks, "query": lambda: query_benchmarks(args.size)
+    }
+    selected = [name for name in groups if name.startswith(args.only) or group(args.only) == name]
+    database(args.size)  # Built up front, where its progress shows
+
+    def run(names):
+        # The code under test logs every batch and request; keep that out of the report
+        with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet):
+            return [
+                result for name in names for result in groups[name]()
+                if result.name.startswith(args.only) or result.name.startswith("calibration.")
+            ]
+
+    results = run(selected)
+    baselines = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE) as f:
+            baselines = json.load(f)
+    if args.save:
+        baseline = baselines.setdefault(args.size, {})
+        baseline.update({result.name: {"value": round(result.value, 3), "unit": result.unit} for result in results})
+        with open(BASELINE, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        compare(results, {}, args.tolerance)
+        print(f"Saved {len(results)} results as the {args.size} baseline")
+        return
+    baseline = baselines.get(args.size, {})
+    regressions = compare(results, baseline, args.tolerance, report=False)
+    if regressions:
+        # A second run of the groups that regressed tells a slow moment from slower code;
+        # each group keeps whichever run regressed less, with that run's own calibration
+        for name in sorted({group(regression) for regression in regressions}):
+            first = [result for result in results if group(result.name) == name]
+            second = run([name])
+            if len(compare(second, baseline, args.tolerance, report=False)) < len(compare(first, baseline, args.tolerance, report=False)):
+                results = [result for result in results if group(result.name) != name] + second
+        results.sort(key=lambda result: selected.index(group(result.name)))
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
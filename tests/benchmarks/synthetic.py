@@ -0,0 +1,131 @@
+import datetime
+import os
+import random
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../../")
+
+#  python tests/benchmarks/synthetic.py [10k|1m|10m|<rows>]
+# Builds a SQLite database with <rows> yahoo_finance_data rows and as many news_articles,
+# indexed and searchable like production, under tests/benchmarks/.data/. Databases are
+# kept between runs: 10m takes a while to build and the data is the same every time.
+from sqlalchemy import create_engine
+from sqlalchemy.schema import CreateTable
+from app.db.database import Base
+from app.db.migrations import migrate
+from app.models.news import NewsArticle, YahooFinanceData
+
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data")
+# Observations are spread over the 30 days before END, one sweep of every symbol at a time
+END = datetime.datetime(2025, 1, 31)
+DAYS = 30
+UNIVERSE = 25_000  # Funds in the screener
+SOURCES = ["PR Newswire", "Business Wire"]
+WORDS = [
+    "bank", "fund", "merger", "acquisition", "quarter", "earnings", "dividend", "capital", "market", "growth",
+    "insurance", "payments", "fintech", "lending", "credit", "investment", "portfolio", "equity", "bond", "yield",
+    "strategic", "partnership", "launch", "platform", "digital", "regulatory", "approval", "results", "revenue", "asset"
+] + [f"term{i}" for i in range(5000)]  # Long tail vocabulary so rare terms stay rare
+BATCH = 50_000
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"  # How SQLAlchemy stores DateTime in SQLite, so range filters compare right
+
+def parse_size(size: str) -> int:
+    return SIZES.get(size.lower()) or int(size)
+
+def symbol_count(rows: int) -> int:
+    return max(10, min(UNIVERSE, rows // 40))
+
+def symbol(index: int) -> str:
+    return f"F{index:05d}X"
+
+def quote_rows(rows: int):
+    rng = random.Random(42)
+    symbols = symbol_count(rows)
+    sweeps = -(-rows // symbols)
+    step = datetime.timedelta(days=DAYS) / sweeps
+    start = END - datetime.timedelta(days=DAYS)
+    base = [(rng.uniform(8, 600), rng.uniform(0.01, 1.5), rng.uniform(1e7, 2e12)) for _ in range(symbols)]
+    for i in range(rows):
+        sweep, index = divmod(i, symbols)
+        price, expense, assets = base[index]
+        price *= 1 + rng.uniform(-0.05, 0.05)
+        change = rng.uniform(-5, 5)
+        ytd = rng.uniform(-20, 40)
+        observed_at = start + step * sweep
+        yield (
+            symbol(index), f"Example Index Fund {index}", f"{change:+.2f}", f"{change / 3:+.2f}%", f"{price:.2f}",
+            f"{ytd:+.2f}%", f"{price:.2f}", f"{expense:.2f}%", f"{assets / 1e9:.3f}B",
+            f"sha-{i}", observed_at.isoformat() + "+00:00", str(observed_at.year), str(observed_at.month), str(observed_at.day),
+            observed_at.strftime("%H:%M:%S"),
+            change, change / 3, price, ytd, ytd / 4, ytd * 1.5, ytd, ytd, expense, expense, assets, price, price,
+            observed_at.strftime(DATETIME_FORMAT)
+        )
+
+QUOTE_COLUMNS = [
+    "symbol", "name", "change", "change_percent", "price_intraday", "ytd_return", "fifty_day_avg", "net_expense_ratio",
+    "net_assets", "hash", "timestamp", "year", "month", "day", "time",
+    "change_value", "change_percent_value", "price_intraday_value", "ytd_return_value", "three_mo_return_value",
+    "one_year_value", "three_year_return_value", "five_year_return_value", "net_expense_ratio_value",
+    "gross_expense_ratio_value", "net_assets_value", "fifty_day_avg_value", "two_hundred_day_avg_value", "observed_at"
+]
+
+def article_rows(rows: int):
+    rng = random.Random(43)
+    step = datetime.timedelta(days=DAYS) / rows
+    start = END - datetime.timedelta(days=DAYS)
+    for i in range(rows):
+        yield (
+            " ".join(rng.choices(WORDS, k=8)), rng.choice(SOURCES), (start + step * i).strftime(DATETIME_FORMAT),
+            " ".join(rng.choices(WORDS, k=40)), f"article-{i}"
+        )
+
+ARTICLE_COLUMNS = ["title", "source", "published_date", "content", "hash"]
+
+def insert(connection, table, columns, rows):
+    cursor = connection.cursor()
+    statement = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH:
+            cursor.executemany(statement, batch)
+            batch = []
+    if batch:
+        cursor.executemany(statement, batch)
+    connection.commit()
+
+def build(path: str, rows: int):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        # Indexes are built once the rows are in, which is several times faster than row by row
+        for model in (YahooFinanceData, NewsArticle):
+            conn.execute(CreateTable(model.__table__))
+    connection = engine.raw_connection()
+    try:
+        connection.execute("PRAGMA journal_mode=OFF")
+        connection.execute("PRAGMA synchronous=OFF")
+        insert(connection, YahooFinanceData.__tablename__, QUOTE_COLUMNS, quote_rows(rows))
+        insert(connection, NewsArticle.__tablename__, ARTICLE_COLUMNS, article_rows(rows))
+    finally:
+        connection.close()
+    Base.metadata.create_all(bind=engine)  # The tables nothing is generated for
+    migrate(engine)  # Builds the missing indexes and the news search index
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    engine.dispose()
+
+def database(size: str) -> str:
+    """Path of the synthetic database for ``size``, built on first use."""
+    rows = parse_size(size)
+    path = os.path.join(DATA_DIR, f"synthetic-{rows}.db")
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        started = time.perf_counter()
+        build(path + ".tmp", rows)
+        os.replace(path + ".tmp", path)
+        print(f"Built {rows:,} quotes and {rows:,} articles in {time.perf_counter() - started:.0f}s: {path}")
+    return path
+
+if __name__ == "__main__":
+    database(sys.argv[1] if len(sys.argv) > 1 else "10k")
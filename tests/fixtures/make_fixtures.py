@@ -0,0 +1,127 @@
+import os
+import random
+from html import escape
+
+#  python tests/fixtures/make_fixtures.py
+# Writes the screener page fixture with the markup of Yahoo's mutual fund screener
+# (row class, column order, header cells with sort buttons, "of N results" line and
+# the page's bulky inline scripts), and an RSS feed shaped like PR Newswire's (HTML
+# descriptions, Dublin Core and media tags), so parser tests and benchmarks need no network.
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+HEADERS = [
+    "Symbol", "Name", "Change", "Change %", "Price (Intraday)", "YTD Return", "3-Mo Return", "1-Year",
+    "3-Year Return", "5-Year Return", "Net Expense Ratio", "Gross Expense Ratio", "Net Assets",
+    "Morningstar Rating", "50 Day Avg", "200 Day Avg", "52 Week Range"
+]
+
+def signed(rng, low, high, suffix=""):
+    value = rng.uniform(low, high)
+    return f"{value:+.2f}{suffix}"
+
+def fund_row(rng, index):
+    price = rng.uniform(8, 600)
+    assets = rng.choice([f"{rng.uniform(1, 999):.3f}M", f"{rng.uniform(1, 999):.3f}B", f"{rng.uniform(1, 2):.3f}T"])
+    expense = "--" if rng.random() < 0.05 else f"{rng.uniform(0.01, 1.5):.2f}%"
+    return [
+        f"F{index:04d}X",
+        f"Example {rng.choice(['Total Market', 'Growth', 'Value', 'Income', 'Bond', 'Intl'])} Index Fund {index}",
+        signed(rng, -5, 5), signed(rng, -3, 3, "%"), f"{price:.2f}",
+        signed(rng, -20, 40, "%"), signed(rng, -10, 15, "%"), signed(rng, -30, 60, "%"),
+        signed(rng, -10, 30, "%"), signed(rng, -5, 25, "%"),
+        expense, expense, assets, "★" * rng.randint(1, 5),
+        f"{price * rng.uniform(0.9, 1.1):.2f}", f"{price * rng.uniform(0.8, 1.2):.2f}",
+        f"{price * 0.7:.2f} - {price * 1.2:.2f}"
+    ]
+
+def cell(column, value):
+    if column == "Symbol":
+        inner = f'<span class="symbol yf-1fqyif7"><a href="/quote/{value}/" class="loud-link fin-size-medium yf-1e4diqp">{value}</a></span>'
+    elif column in ("Change", "Change %", "Price (Intraday)"):
+        sign = "positive" if value.startswith("+") else "negative" if value.startswith("-") else "neutral"
+        inner = f'<fin-streamer data-field="regularMarket{column}" class="yf-1eh9ohj"><span class="txt-{sign} yf-1eh9ohj">{value}</span></fin-streamer>'
+    elif column == "Name":
+        inner = f'<div title="{escape(value)}" class="yf-362rys">{escape(value)}</div>'
+    else:
+        inner = value
+    return f'<td class="yf-11hlglb" style="">{inner}</td>'
+
+def screener_page(rows=100, start=0, universe=25347, seed=7, columns=HEADERS, row_class="yf-11hlglb"):
+    """Render a page; ``columns`` reorders or drops columns and ``row_class`` renames the row class."""
+    rng = random.Random(seed)
+    return render_screener([fund_row(rng, start + i) for i in range(rows)], start, universe, rng, columns, row_class)
+
+def render_screener(funds, start, universe, rng, columns=HEADERS, row_class="yf-11hlglb"):
+    """Render a page holding ``funds``, rows as returned by fund_row, the first one at offset ``start``."""
+    header = "".join(
+        f'<th class="yf-1uayyp1" data-testid-header="{column}"><div class="cell yf-1uayyp1">{escape(column)}'
+        f'<button class="sort yf-1uayyp1" aria-label="Sort by {escape(column)}"><svg></svg></button></div></th>'
+        for column in columns
+    )
+    body = "".join(
+        f'<tr class="row {row_class}" data-testid="data-table-v2-row">'
+        f'<td class="{row_class}"><input type="checkbox" aria-label="Select row"></td>'
+        + "".join(cell(column, values[column]) for column in columns)
+        + "</tr>"
+        for values in (dict(zip(HEADERS, fund)) for fund in funds)
+    )
+    # Real pages embed a few hundred KiB of state and scripts the parser has to get past
+    state = ",".join(f'{{"symbol":"F{i:04d}X","quote":{{"price":{rng.random():.6f}}}}}' for i in range(4000))
+    return (
+        '<!DOCTYPE html><html lang="en-US"><head><meta charset="utf-8"><title>Mutual Fund Screener</title>'
+        f'<script>window.__PRELOADED_STATE__ = [{state}];</script><style>.yf-11hlglb{{padding:0}}</style></head>'
+        '<body><div id="app"><main><section class="screener yf-1m1jd0s">'
+        f'<div class="total yf-1tdhqb1">{start + 1}-{start + len(funds)} of {universe:,} results</div>'
+        '<div class="tableContainer yf-1m1jd0s"><table class="yf-1uayyp1 bd">'
+        f'<thead><tr class="yf-1uayyp1"><th class="yf-1uayyp1"><input type="checkbox"></th>{header}</tr></thead>'
+        f"<tbody>{body}</tbody></table></div></section></main></div>"
+        '<script src="https://s.yimg.com/aaq/c/app.js" defer></script></body></html>'
+    )
+
+TOPICS = ["Bank", "Fund", "Insurer", "Payments", "Fintech", "Lender", "Asset Manager", "Exchange"]
+EVENTS = ["Reports Fourth Quarter Results", "Announces Dividend", "Completes Acquisition", "Launches Platform",
+          "Prices Senior Notes", "Appoints Chief Financial Officer", "Receives Regulatory Approval"]
+
+def rss_feed(items=50, seed=11):
+    """Render a feed of ``items`` items, newest first, a few minutes apart."""
+    rng = random.Random(seed)
+    entries = []
+    for i in range(items):
+        minute = (items - i) * 7
+        entries.append(rss_item(rng, f"{seed}-{i}", f"Mon, 20 Jan 2025 {minute // 60 % 24:02d}:{minute % 60:02d}:00 +0000"))
+    return render_rss(entries)
+
+def rss_item(rng, key, published):
+    """One item with guid ``key``, published at ``published`` (an RFC 822 date)."""
+    title = f"{rng.choice(['Northwind', 'Contoso', 'Fabrikam', 'Tailspin'])} {rng.choice(TOPICS)} {rng.choice(EVENTS)}"
+    paragraphs = "".join(
+        f"<p>{escape(title)} said on Monday that {rng.choice(EVENTS).lower()} "
+        f"{'and ' * rng.randint(0, 2)}expects growth of {rng.uniform(1, 20):.1f}% this year.</p>"
+        for _ in range(rng.randint(2, 5))
+    )
+    return (
+        f"<item><title>{escape(title)}</title>"
+        f"<link>https://www.prnewswire.com/news-releases/release-{key}.html</link>"
+        f'<guid isPermaLink="false">{key}</guid>'
+        f"<pubDate>{published}</pubDate>"
+        f"<dc:creator>{escape(title.split()[0])} Inc.</dc:creator>"
+        f"<category>Financial Services</category><category>Earnings</category>"
+        f"<description>{escape(paragraphs)}</description>"
+        f'<media:content url="https://mma.prnewswire.com/media/{key.replace("-", "")}/logo.jpg" medium="image" />'
+        "</item>"
+    )
+
+def render_rss(entries):
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:media="http://search.yahoo.com/mrss/">'
+        "<channel><title>Financial Services Latest News</title><link>https://www.prnewswire.com/</link>"
+        "<description>News releases</description><language>en-us</language>"
+        + "".join(entries) + "</channel></rss>"
+    )
+
+if __name__ == "__main__":
+    with open(os.path.join(HERE, "yahoo_screener.html"), "w", encoding="utf-8") as f:
+        f.write(screener_page())
+    with open(os.path.join(HERE, "news_feed.xml"), "w", encoding="utf-8") as f:
+        f.write(rss_feed())
@@ -0,0 +1,27 @@
+import asyncio
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app.services.blocking_detector import BlockingDetector
+
+def blocking_call():
+    time.sleep(0.3)
+
+def test_stall_is_reported_with_its_stack():
+    detector = BlockingDetector(threshold=0.1, interval=0.01)
+
+    async def scenario():
+        detector.start()
+        await asyncio.sleep(0.05)
+        blocking_call()  # Synchronous work on the event loop
+        await asyncio.sleep(0.05)
+        await asyncio.sleep(0.01)  # Slept well under the threshold, so no new episode
+        detector.stop()
+    asyncio.run(scenario())
+
+    report = detector.report()
+    assert report["episodes"] == 1
+    episode = report["recent"][0]
+    assert episode["blocked_seconds"] >= 0.25 and episode["endpoint"] == "background"
+    assert "in blocking_call" in episode["stack"][-1]
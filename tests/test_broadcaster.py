@@ -0,0 +1,64 @@
+import asyncio
+import os
+import sys
+import threading
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app.routers import stream
+from app.services.broadcaster import NEWS, QUOTES, Broadcaster, broadcaster
+
+def test_fan_out_respects_filters():
+    async def scenario():
+        hub = Broadcaster(max_queue=10)
+        everything = hub.subscribe(QUOTES)
+        vtsmx = hub.subscribe(QUOTES, {"VTSMX"})
+        others = [hub.subscribe(QUOTES, {"OTHER"}) for _ in range(1000)]
+        hub.publish(QUOTES, [("VTSMX", 1, {"Symbol": "VTSMX"}), ("VTSAX", 2, {"Symbol": "VTSAX"})])
+        assert [e.id for e in (await everything.get(), await everything.get())] == [1, 2]
+        assert (await vtsmx.get()).data == b'{"Symbol":"VTSMX"}'
+        assert vtsmx.queue.empty() and all(s.queue.empty() for s in others)
+        vtsmx.close()
+        assert hub.subscriber_count(QUOTES) == 1001 and await vtsmx.get() is None
+    asyncio.run(scenario())
+
+def test_slow_consumer_policies():
+    async def scenario():
+        dropping = Broadcaster(max_queue=2)
+        subscription = dropping.subscribe(NEWS)
+        dropping.publish(NEWS, [("PR Newswire", i, {}) for i in range(5)])
+        assert subscription.take_dropped() == 3
+        assert [(await subscription.get()).id for _ in range(2)] == [3, 4]  # Newest kept
+
+        disconnecting = Broadcaster(max_queue=2, slow_consumer_policy="disconnect")
+        subscription = disconnecting.subscribe(NEWS)
+        disconnecting.publish(NEWS, [("PR Newswire", i, {}) for i in range(5)])
+        assert await subscription.get() is None and disconnecting.subscriber_count(NEWS) == 0
+    asyncio.run(scenario())
+
+def test_publish_from_ingest_thread():
+    async def scenario():
+        hub = Broadcaster(max_queue=10)
+        subscription = hub.subscribe(QUOTES)
+        threading.Thread(target=hub.publish, args=(QUOTES, [("VTSMX", 7, {})])).start()
+        assert (await subscription.get(timeout=5)).id == 7
+    asyncio.run(scenario())
+
+def test_sse_and_websocket_frames():
+    async def sse():
+        events = stream.sse_events(QUOTES, {"VTSMX"})
+        assert await anext(events) == b"retry: 5000\n\n"
+        pending = asyncio.ensure_future(anext(events))
+        await asyncio.sleep(0)
+        broadcaster.publish(QUOTES, [("VTSMX", 3, {"Symbol": "VTSMX"})])
+        assert await pending == b'id: 3\nevent: quote\ndata: {"Symbol":"VTSMX"}\n\n'
+        await events.aclose()
+        assert broadcaster.subscriber_count(QUOTES) == 0
+    asyncio.run(sse())
+
+    app = FastAPI()
+    app.include_router(stream.router)
+    with TestClient(app).websocket_connect("/stream/news?sources=Business Wire") as websocket:
+        client_portal = websocket.portal
+        client_portal.call(broadcaster.publish, NEWS, [("PR Newswire", 1, {}), ("Business Wire", 2, {"title": "t"})])
+        assert websocket.receive_json() == {"event": "article", "id": 2, "data": {"title": "t"}}
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app.db.database import Base, create_async_db_engine, create_db_engine
+from app.models.news import YahooFinanceData
+from app.services.ingest import bulk_insert_unique
+
+BATCHES = 20
+BATCH_SIZE = 1000
+
+@pytest.fixture
+def database_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'concurrency.db'}"
+
+def test_readers_progress_during_bulk_ingest(database_url):
+    writer = create_db_engine(database_url)
+    reader = create_db_engine(database_url, read_only=True)
+    Base.metadata.create_all(bind=writer)
+    done = threading.Event()
+    reads, read_latencies, errors = [], [], []
+
+    def ingest():
+        try:
+            for batch in range(BATCHES):
+                with Session(writer) as session:
+                    bulk_insert_unique(session, YahooFinanceData, [
+                        {"symbol": f"S{i % 500}", "hash": f"{batch}-{i}", "price_intraday_value": float(i)}
+                        for i in range(BATCH_SIZE)
+                    ])
+                    session.commit()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    def read():
+        try:
+            while not done.is_set():
+                started = time.perf_counter()
+                with reader.connect() as conn:
+                    reads.append(conn.execute(
+                        select(func.count()).where(YahooFinanceData.symbol == "S7")
+                    ).scalar())
+                read_latencies.append(time.perf_counter() - started)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=ingest)] + [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors, errors
+    # Readers never wait for the writer's commits, and see them land as they happen
+    assert len(reads) > BATCHES
+    assert len(set(reads)) > 2
+    assert max(read_latencies) < 1.0
+    with reader.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        with pytest.raises(OperationalError):
+            conn.execute(text("DELETE FROM yahoo_finance_data"))  # query_only
+
+    async def read_async():
+        engine = create_async_db_engine(database_url)
+        async with engine.connect() as conn:
+            count = (await conn.execute(select(func.count()).select_from(YahooFinanceData))).scalar()
+        await engine.dispose()
+        return count
+    assert asyncio.run(read_async()) == BATCHES * BATCH_SIZE
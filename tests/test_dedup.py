@@ -0,0 +1,48 @@
+import hashlib
+import os
+import sys
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app.db.database import Base
+from app.models.news import NewsArticle
+from app.services.dedup import DedupFilter, ScalableBloomFilter
+
+def digest(i) -> str:
+    return hashlib.sha256(str(i).encode()).hexdigest()
+
+def test_bloom_filter_has_no_false_negatives_while_growing():
+    bloom = ScalableBloomFilter(100, 0.01)
+    for i in range(1000):
+        bloom.add(digest(i))
+    assert len(bloom.filters) > 1
+    assert all(digest(i) in bloom for i in range(1000))
+    false_positives = sum(digest(f"new {i}") in bloom for i in range(10000))
+    assert false_positives < 200
+
+def test_recently_stored_rows_skip_the_database():
+    dedup = DedupFilter("t", recent_size=2, capacity=100, error_rate=0.01)
+    # Not warmed yet: it knows nothing about the table, so everything goes through
+    assert dedup.candidates([digest(1)]) == ([0], [])
+    dedup.warm([digest(1), digest(2), digest(3)])
+    candidates = dedup.candidates([digest(2), digest(3), digest(4), digest(1)])
+    assert candidates == ([2], [3])  # 1 fell out of the LRU, but the Bloom filter knows it
+    assert dedup.stats()["maybe_seen"] == 1
+    dedup.stored([digest(4), digest(1)])
+    assert dedup.candidates([digest(4), digest(1)]) == ([], [])
+
+def test_maybe_seen_rows_are_looked_up_before_the_insert():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    dedup = DedupFilter("t", recent_size=1, capacity=100, error_rate=0.01)
+    with Session(engine) as session:
+        session.add_all([NewsArticle(title=str(i), hash=digest(i)) for i in range(3)])
+        session.flush()
+        dedup.warm([digest(i) for i in range(3)])
+        dedup.bloom.add(digest(5))  # A false positive: the filter thinks 5 is stored
+        # 2 is a recent hit, 0 and 1 are stored, 4 is new and 5 must be found missing
+        digests = [digest(i) for i in (0, 4, 1, 5, 2)]
+        assert dedup.new_rows(session, NewsArticle, digests) == [1, 3]
+    stats = dedup.stats()
+    assert (stats["recent_hits"], stats["definitely_new"], stats["maybe_seen"], stats["false_positives"]) == (1, 1, 3, 1)
+    engine.dispose()
@@ -0,0 +1,65 @@
+import os
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app import config
+from app.db.database import Base
+from app.models.news import YahooFinanceData, YahooFinanceDelta
+from app.services.delta_store import compact_deltas, store_deltas
+from app.services.ingest import bulk_insert_unique
+from app.services.yahoo_finance import (
+    reconstruct_yahoo_finance_records, to_yahoo_finance_record, yahoo_finance_history
+)
+
+START = datetime(2025, 1, 20, 14, 0)
+
+def scrape(minute: int, price: str, assets: str = "1.778T"):
+    observed_at = START + timedelta(minutes=minute)
+    return {
+        "Symbol": "VTSMX", "Name": "Vanguard Total Stock Mkt Idx Inv", "Change": "+1.37", "Change %": "+0.94%",
+        "Price (Intraday)": price, "YTD Return": "+1.29%", "3-Mo Return": "+2.24%", "1-Year": "+25.89%",
+        "3-Year Return": "+25.59%", "5-Year Return": "+30.65%", "Net Expense Ratio": "0.14", "Gross Expense Ratio": "0.14",
+        "Net Assets": assets, "50 Day Avg": "143.53", "200 Day Avg": "134.03",
+        "timestamp": observed_at.isoformat() + "+00:00", "year": "2025", "month": "1", "day": "20",
+        "time": observed_at.strftime("%H:%M:%S")
+    }
+
+SCRAPES = [scrape(0, "146.16"), scrape(1, "146.16"), scrape(2, "146.50"), scrape(3, "145.90", "1.781T"), scrape(4, "146.20", "1.781T")]
+
+def test_delta_layout_stores_changed_fields_and_replays_full_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "YAHOO_DELTA_KEYFRAME_INTERVAL", 3)
+    engine = create_engine(f"sqlite:///{tmp_path / 'delta.db'}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        for row in SCRAPES:
+            store_deltas(db, [to_yahoo_finance_record(row)])
+            bulk_insert_unique(db, YahooFinanceData, [to_yahoo_finance_record(row)])
+        db.commit()
+
+        deltas = db.execute(select(YahooFinanceDelta).order_by(YahooFinanceDelta.id)).scalars().all()
+        assert len(deltas) == 4  # The unchanged second scrape is skipped
+        assert [delta.keyframe for delta in deltas] == [True, False, False, True]
+        assert deltas[1].changes == '{"price_intraday":"146.50"}'
+
+        # Replays give back exactly what the full layout stored
+        full = db.execute(select(YahooFinanceData).order_by(YahooFinanceData.id)).scalars().all()
+        rebuilt = reconstruct_yahoo_finance_records(db, "vtsmx", START + timedelta(minutes=2))
+        assert len(rebuilt) == 3
+        for record, row in zip(rebuilt, full[1:]):
+            assert record == {column: getattr(row, column) for column in record}
+
+        buckets = yahoo_finance_history(db, "VTSMX", interval=3600)
+        monkeypatch.setattr(config, "YAHOO_STORAGE", "delta")
+        db.execute(YahooFinanceData.__table__.delete())
+        assert yahoo_finance_history(db, "VTSMX", interval=3600) == buckets
+
+        # Compaction folds each window into its last row without changing where it ends
+        last_id, removed = compact_deltas(db, 0, START + timedelta(days=1), resolution=180)
+        assert (last_id, removed) == (deltas[-1].id, 2)
+        assert db.execute(select(func.count()).select_from(YahooFinanceDelta)).scalar() == 2
+        rebuilt = reconstruct_yahoo_finance_records(db, "VTSMX")
+        assert [record["price_intraday_value"] for record in rebuilt] == [146.5, 146.2]
+        assert rebuilt[-1]["net_assets"] == "1.781T"
+    engine.dispose()
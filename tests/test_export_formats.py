@@ -0,0 +1,72 @@
+import csv
+import io
+import os
+import sys
+import pytest
+from datetime import datetime
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app.db.database import Base
+from app.middleware import CompressionMiddleware, choose_encoding
+from app.models.news import YahooFinanceData
+from app.services.export import export_fields, record_fields, records, select_fields, write_csv, write_parquet
+from app.services.yahoo_finance import yahoo_finance_query
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(YahooFinanceData.__table__.insert(), [
+            {"symbol": f"E{i}", "name": f"Fund {i}", "hash": f"e-{i}", "price_intraday": f"{i}.50",
+             "price_intraday_value": i + 0.5, "observed_at": datetime(2025, 1, 20, 5, 0, i)}
+            for i in range(5)
+        ])
+    yield engine
+    engine.dispose()
+
+def test_records_match_stored_strings(engine):
+    with Session(engine) as db:
+        rows = db.execute(select_fields(yahoo_finance_query(limit=2), record_fields, "id")).all()
+    assert [(r["Symbol"], r["Price (Intraday)"]) for r in records(rows)] == [("E0", "0.50"), ("E1", "1.50")]
+    assert rows[-1].id == 2  # Cursor columns follow the record fields
+
+def test_csv_and_parquet_exports_round_trip(engine):
+    query = select_fields(yahoo_finance_query(), export_fields)
+    with Session(engine) as db:
+        partitions = list(db.execute(query).partitions(2))
+    table = list(csv.DictReader(io.StringIO(b"".join(write_csv(partitions)).decode())))
+    assert [(row["symbol"], row["price"]) for row in table[:2]] == [("E0", "0.5"), ("E1", "1.5")]
+
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+    parquet = pyarrow.parquet.read_table(io.BytesIO(b"".join(write_parquet(partitions))))
+    assert parquet.num_rows == 5 and parquet.to_pydict()["price"] == [0.5, 1.5, 2.5, 3.5, 4.5]
+    assert str(parquet.schema.field("observed_at").type) == "timestamp[us, tz=UTC]"
+
+@pytest.mark.parametrize("accept, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0.5, gzip;q=0.8", "gzip"),
+    ("*", "br"),
+    ("identity", None),
+    ("br;q=0", None),
+])
+def test_choose_encoding(accept, expected):
+    assert choose_encoding(accept) == expected
+
+def test_compression_middleware():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    app.get("/big")(lambda: Response("x" * 1000, media_type="application/json"))
+    app.get("/small")(lambda: Response("x", media_type="application/json"))
+    client = TestClient(app)
+    response = client.get("/big", headers={"Accept-Encoding": "br"})
+    assert response.headers["content-encoding"] == "br" and response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < 100
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip" and response.text == "x" * 1000
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "br"}).headers
@@ -0,0 +1,68 @@
+import os
+import sys
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app.db.database import Base
+from app.models.news import DataVersion
+from app.services import http_cache
+from app.services.data_version import NEWS_ARTICLES, DataVersions, bump_data_version
+from app.services.http_cache import CachedBody, ResponseCache, conditional_response, json_body
+
+def test_revalidation_and_new_etag_after_a_version_bump(monkeypatch):
+    monkeypatch.setattr(http_cache, "response_cache", ResponseCache(1024))
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    versions = DataVersions()
+    builds = []
+
+    def bump():
+        with Session(engine) as db:
+            bump_data_version(db, NEWS_ARTICLES)
+            db.commit()
+            versions.update(dict(db.execute(select(DataVersion.table_name, DataVersion.version)).all()))
+
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items(request: Request):
+        def build():
+            builds.append(versions.get(NEWS_ARTICLES))
+            return json_body({"version": versions.get(NEWS_ARTICLES)})
+        return await conditional_response(request, versions.get(NEWS_ARTICLES), build)
+
+    client = TestClient(app)
+    bump()
+    first = client.get("/items?b=2&a=1")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and etag.startswith('W/"')
+    strong = etag.removeprefix("W/")
+    for if_none_match in (etag, strong, f'"other", {strong}', "*"):
+        assert client.get("/items?b=2&a=1", headers={"If-None-Match": if_none_match}).status_code == 304
+    assert client.get("/items?b=2&a=1", headers={"If-None-Match": '"other"'}).status_code == 200
+    # Same parameters in another order: same ETag, served from the cache
+    reordered = client.get("/items?a=1&b=2")
+    assert reordered.headers["etag"] == etag and reordered.content == first.content
+    assert len(builds) == 1
+
+    bump()
+    changed = client.get("/items?b=2&a=1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert len(builds) == 2 and changed.json() == {"version": builds[-1]}
+    engine.dispose()
+
+def test_cache_evicts_least_recently_used_bodies_by_size():
+    cache = ResponseCache(max_bytes=10)
+    body = lambda size: CachedBody(b"x" * size, "application/json", {})
+    cache.put("a", body(4))
+    cache.put("b", body(4))
+    assert cache.get("a") is not None  # Now the most recently used
+    cache.put("c", body(4))
+    assert cache.get("b") is None and cache.get("a") is not None and cache.get("c") is not None
+    assert cache.size == 8
+    cache.put("a", body(6))  # Replacing an entry counts only its new size
+    assert cache.size == 10 and cache.get("c") is not None
+    cache.put("huge", body(11))  # Larger than the whole budget: never cached
+    assert cache.get("huge") is None and cache.size == 10
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import sys
+import httpx
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app import config
+from app.models.news import ScraperState
+from app.services import http_client, yahoo_finance
+from app.services.scheduler import Job, run_once
+
+def test_requests_stay_within_the_concurrency_limit(monkeypatch):
+    in_flight, peak = 0, 0
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, content=request.url.path.encode())
+
+    monkeypatch.setattr(config, "HTTP_MAX_CONCURRENCY", 2)
+    monkeypatch.setattr(http_client, "_transport", httpx.MockTransport(handle))
+
+    async def scenario():
+        responses = await asyncio.gather(*(http_client.fetch(f"http://upstream/{n}") for n in range(6)))
+        await http_client.close_http_client()
+        return [response.content for response in responses]
+
+    assert asyncio.run(scenario()) == [f"/{n}".encode() for n in range(6)]
+    assert peak == 2
+
+def test_each_event_loop_gets_its_own_client(monkeypatch):
+    monkeypatch.setattr(http_client, "_transport", httpx.MockTransport(lambda request: httpx.Response(200)))
+
+    async def clients():
+        first = http_client.get_http_client()
+        assert http_client.get_http_client() is first
+        await http_client.fetch("http://upstream/")
+        await http_client.close_http_client()
+        assert first.is_closed and http_client.get_http_client() is not first
+        await http_client.close_http_client()
+        return first
+
+    # A second asyncio.run must not reuse a client bound to the first, now closed, loop
+    assert asyncio.run(clients()) is not asyncio.run(clients())
+
+def test_upstream_errors_are_retried_after_retry_after(monkeypatch):
+    answers = [httpx.Response(503, headers={"Retry-After": "30"}), httpx.Response(200, content=b"<html/>")]
+    monkeypatch.setattr(http_client, "_transport", httpx.MockTransport(lambda request: answers.pop(0)))
+    monkeypatch.setattr(yahoo_finance, "base_url", "http://upstream/screener?start={start}&count={count}")
+
+    async def fetch_page(state):
+        await yahoo_finance.fetch_yahoo_finance_page(start=state.cursor)
+
+    job = Job("screener", fetch_page, interval=60)
+    state = ScraperState(name="screener", cursor=0, consecutive_failures=0)
+
+    async def scenario():
+        assert await run_once(job, state) >= 30
+        assert state.consecutive_failures == 1 and "503" in state.last_error
+        await run_once(job, state)
+        await http_client.close_http_client()
+
+    asyncio.run(scenario())
+    assert state.consecutive_failures == 0 and answers == []
@@ -0,0 +1,33 @@
+import os
+import sys
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app.db.database import Base
+from app.models.news import NewsArticle
+from app.services.ingest import IngestResult, bulk_insert_unique
+
+def article(hash: str) -> dict:
+    return {"title": f"Title {hash}", "source": "PR Newswire", "content": "", "hash": hash}
+
+def test_bulk_insert_skips_stored_and_repeated_rows():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        first = bulk_insert_unique(session, NewsArticle, [article("a"), article("b")])
+        session.commit()
+        assert first == IngestResult(2, 0, first.ids) and len(first.ids) == 2
+
+        # "a" is already stored and "c" appears twice in the page
+        page = [article("a"), article("c"), article("d"), {**article("c"), "title": "Repeat"}]
+        result = bulk_insert_unique(session, NewsArticle, page)
+        session.commit()
+        assert (result.inserted, result.skipped) == (2, 2)
+        stored = dict(session.execute(select(NewsArticle.id, NewsArticle.hash)).all())
+        assert sorted(stored[id] for id in result.ids) == ["c", "d"]
+        assert sorted(stored.values()) == ["a", "b", "c", "d"]
+        # The first copy of a repeated row wins
+        assert session.scalar(select(NewsArticle.title).where(NewsArticle.hash == "c")) == "Title c"
+
+        assert bulk_insert_unique(session, NewsArticle, []) == IngestResult(0, 0, [])
+    engine.dispose()
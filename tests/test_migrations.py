@@ -0,0 +1,78 @@
+import os
+import sys
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, inspect
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app.db.migrations import backfill_yahoo_finance_values, upgrade_schema
+from app.models.news import YahooFinanceData
+from app.services.yahoo_finance import parse_metric
+
+@pytest.mark.parametrize("text, value", [
+    ("+1.29%", 1.29),
+    ("-0.29%", -0.29),
+    ("−1.34", -1.34),  # Unicode minus
+    ("1.778T", 1.778e12),
+    ("512.3M", 512.3e6),
+    ("1,234.5", 1234.5),
+    ("0.14", 0.14),
+    ("N/A", None),
+    ("--", None),
+    ("", None),
+    (None, None),
+    ("abc", None)
+])
+def test_parse_metric(text, value):
+    if value is None:
+        assert parse_metric(text) is None
+    else:
+        assert parse_metric(text) == pytest.approx(value)
+
+# yahoo_finance_data before the typed columns existed
+OLD_SCHEMA = """
+CREATE TABLE yahoo_finance_data (
+    id INTEGER PRIMARY KEY, symbol VARCHAR, name VARCHAR, change VARCHAR, change_percent VARCHAR,
+    price_intraday VARCHAR, ytd_return VARCHAR, three_mo_return VARCHAR, one_year VARCHAR,
+    three_year_return VARCHAR, five_year_return VARCHAR, net_expense_ratio VARCHAR, gross_expense_ratio VARCHAR,
+    net_assets VARCHAR, fifty_day_avg VARCHAR, two_hundred_day_avg VARCHAR, hash VARCHAR UNIQUE,
+    timestamp VARCHAR, year VARCHAR, month VARCHAR, day VARCHAR, time VARCHAR
+)
+"""
+
+def test_upgrade_adds_typed_columns_and_indexes_and_backfills_idempotently(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(OLD_SCHEMA)
+        conn.exec_driver_sql(
+            "INSERT INTO yahoo_finance_data (symbol, name, change, change_percent, price_intraday, net_assets, "
+            "net_expense_ratio, hash, timestamp) VALUES "
+            "('VTSMX', 'Vanguard Total Stock Mkt Idx Inv', '+1.34', '+0.94%', '144.16', '1.778T', '0.14', 'a', "
+            "'2025-01-20T14:00:00+00:00'), "
+            "('VFIAX', 'Vanguard 500 Index Admiral', '−2.10', '-0.40%', '1,234.50', 'N/A', '--', 'b', "
+            "'2025-01-20T16:00:00+01:00')"
+        )
+
+    def snapshot():
+        with engine.connect() as conn:
+            return conn.exec_driver_sql(
+                "SELECT symbol, change_value, change_percent_value, price_intraday_value, net_assets_value, "
+                "net_expense_ratio_value, observed_at FROM yahoo_finance_data ORDER BY id"
+            ).all()
+
+    upgrade_schema(engine)
+    assert backfill_yahoo_finance_values(engine, batch_size=1) == 2
+    columns = {column["name"] for column in inspect(engine).get_columns("yahoo_finance_data")}
+    assert {column.name for column in YahooFinanceData.__table__.columns} <= columns
+    indexes = {index["name"] for index in inspect(engine).get_indexes("yahoo_finance_data")}
+    assert {index.name for index in YahooFinanceData.__table__.indexes} <= indexes
+    rows = snapshot()
+    assert rows[0][:6] == ("VTSMX", 1.34, 0.94, 144.16, 1.778e12, 0.14)
+    assert rows[1][:6] == ("VFIAX", -2.1, -0.4, 1234.5, None, None)
+    # Stored as naive UTC
+    assert [datetime.fromisoformat(row[6]) for row in rows] == [datetime(2025, 1, 20, 14), datetime(2025, 1, 20, 15)]
+
+    # Running it again on the upgraded database changes nothing
+    upgrade_schema(engine)
+    assert backfill_yahoo_finance_values(engine) == 0
+    assert snapshot() == rows
+    engine.dispose()
@@ -0,0 +1,51 @@
+import asyncio
+import os
+import sys
+import httpx
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app.services import http_client
+from app.services.news import NewsFeed, fetch_feed
+
+FEED = NewsFeed("PR Newswire", "https://feeds.example.com/rss")
+
+def item(n):
+    return (f"<item><title>Article {n}</title><guid>urn:article:{n}</guid>"
+            f"<pubDate>Mon, 20 Jan 2025 12:{n:02d}:00 +0000</pubDate><description> Body {n} </description></item>").encode()
+
+class Upstream:
+    """Serves the feed newest first in small chunks, honouring If-None-Match like a real server."""
+
+    def __init__(self):
+        self.items = [item(n) for n in (3, 2, 1)]
+        self.chunks_sent = 0
+
+    async def body(self):
+        for chunk in [b'<?xml version="1.0"?><rss><channel><title>Feed</title>', *self.items, b"</channel></rss>"]:
+            self.chunks_sent += 1
+            yield chunk
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        etag = f'"{len(self.items)}"'
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304)
+        return httpx.Response(200, headers={"ETag": etag}, content=self.body())
+
+def test_conditional_and_incremental_fetch(monkeypatch):
+    upstream = Upstream()
+
+    async def scenario():
+        monkeypatch.setattr(http_client, "_transport", httpx.MockTransport(upstream.handle))
+
+        first = await fetch_feed(FEED, None)
+        assert [a.title for a in first.articles] == ["Article 3", "Article 2", "Article 1"]
+        assert first.articles[0].content == "Body 3" and first.state.etag == '"3"'
+
+        unchanged = await fetch_feed(FEED, first.state)
+        assert unchanged.articles == [] and unchanged.state.etag == '"3"'
+
+        upstream.items = [item(5), item(4)] + upstream.items  # Two new items on top
+        upstream.chunks_sent = 0
+        update = await fetch_feed(FEED, unchanged.state)
+        assert [a.title for a in update.articles] == ["Article 5", "Article 4"]
+        assert upstream.chunks_sent < 7  # Stopped at the first item already seen
+    asyncio.run(scenario())
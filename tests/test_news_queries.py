@@ -0,0 +1,60 @@
+import os
+import sys
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app.db.database import Base
+from app.schemas.news import NewsArticleCreate
+from app.services.news import get_latest_news, store_unique_news
+from app.services.news_search import create_news_search_index, search_news
+
+START = datetime(2025, 1, 20, 12, 0, 0, tzinfo=timezone.utc)
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    create_news_search_index(engine)
+    with Session(engine) as db:
+        store_unique_news(db, [
+            NewsArticleCreate(
+                title=f"{source} bank update {i}",
+                source=source,
+                published_date=START + timedelta(minutes=i),
+                content=f"Quarterly earnings report number {i} from {source}"
+            )
+            for i in range(10)
+            for source in ("PR Newswire", "Business Wire")
+        ])
+    yield engine
+    engine.dispose()
+
+def query_plan(engine, sql: str) -> str:
+    with engine.connect() as conn:
+        return "\n".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+
+def test_latest_pages_are_served_from_indexes(engine):
+    by_source = query_plan(engine, "SELECT * FROM news_articles WHERE source = 'PR Newswire' "
+                                   "AND published_date > '2025-01-20' ORDER BY published_date DESC LIMIT 30")
+    assert "ix_news_articles_source_published_date" in by_source and "TEMP B-TREE" not in by_source, by_source
+    overall = query_plan(engine, "SELECT * FROM news_articles WHERE published_date < '2025-01-21' "
+                                 "ORDER BY published_date DESC LIMIT 30")
+    assert "ix_news_articles_published_date" in overall and "TEMP B-TREE" not in overall, overall
+
+def test_source_and_time_window_filters(engine):
+    with Session(engine) as db:
+        page = get_latest_news(db, limit=3, source="Business Wire")
+        assert [a.title for a in page] == [f"Business Wire bank update {i}" for i in (9, 8, 7)]
+        older = get_latest_news(db, limit=3, source="Business Wire", before=START + timedelta(minutes=7))
+        assert [a.title for a in older] == [f"Business Wire bank update {i}" for i in (6, 5, 4)]
+        new = get_latest_news(db, since=START + timedelta(minutes=8))
+        assert sorted(a.title for a in new) == ["Business Wire bank update 9", "PR Newswire bank update 9"]
+
+def test_ingest_keeps_search_index_in_sync(engine):
+    with Session(engine) as db:
+        results = search_news(db, "quarterly earnings 7")
+        assert len(results) == 2
+        assert "<b>" in results[0]["snippet"]
+        assert search_news(db, 'bank" OR title:*') == []  # Quoted, never parsed as FTS syntax
@@ -0,0 +1,31 @@
+import os
+import random
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app.services.request_stats import LatencySketch, RollingWindow
+
+def test_sketch_quantiles_within_relative_accuracy():
+    rng = random.Random(7)
+    latencies = sorted(rng.lognormvariate(-4, 1.2) for _ in range(20000))
+    sketch = LatencySketch(relative_accuracy=0.02)
+    for latency in latencies:
+        sketch.add(sketch.index(latency))
+    for q in (0.5, 0.95, 0.99):
+        exact = latencies[int(q * (len(latencies) - 1))]
+        assert abs(sketch.quantile(q) - exact) / exact <= 0.02 + 1e-9
+
+def test_window_forgets_expired_slots():
+    window = RollingWindow(window=60, resolution=5)
+    for second in range(60):
+        window.record(0.010, error=second % 10 == 0, now=1000 + second)
+    stats = window.snapshot(now=1059)
+    assert stats["requests"] == 60 and stats["errors"] == 6
+    assert abs(stats["p50_latency_seconds"] - 0.010) <= 0.0002
+
+    window.record(2.0, error=False, now=1090)  # Slots before second 35 have left the window
+    stats = window.snapshot(now=1090)
+    assert stats["requests"] == 26 and stats["errors"] == 2
+    assert stats["p99_latency_seconds"] > 1.9
+
+    assert window.snapshot(now=5000)["requests"] == 0  # Long idle gap clears everything
+    assert window.sketch.total == 0
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import sys
+import orjson
+from datetime import datetime, timedelta, timezone
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app import config
+from app.db.database import Base, create_async_db_engine, get_async_db
+from app.routers import news as news_router
+from app.routers import yahoo_finance as yahoo_finance_router
+from app.models.news import ScraperState, YahooFinanceData, YahooFinanceDelta
+from app.schemas.news import NewsArticleCreate
+from app.services import archive, news
+from app.services.archive import (
+    YAHOO_FINANCE_DELTAS, archive_batch, archived_news, archived_tables, hot_cutoff, retention_job
+)
+from app.services.data_version import NEWS_ARTICLES, YAHOO_FINANCE_DATA
+from app.services.dedup import DedupFilter, dedup_filters
+from app.services.delta_store import delta_fields, store_deltas
+from app.services.ingest import bulk_insert_unique
+from app.services.news import get_latest_news, store_unique_news
+from app.services.news_search import create_news_search_index, search_news
+from app.services.scheduler import run_once
+from app.services.yahoo_finance import yahoo_finance_history
+
+def test_old_rows_move_to_parquet_and_queries_span_both_tiers(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    engine = create_engine(f"sqlite:///{tmp_path / 'hot.db'}")
+    Base.metadata.create_all(bind=engine)
+    create_news_search_index(engine)
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    days = [now - timedelta(days=age) for age in (30, 20, 10, 1, 0)]
+    with Session(engine) as db:
+        bulk_insert_unique(db, YahooFinanceData, [
+            {"symbol": "VTSMX", "observed_at": day, "price_intraday_value": 100.0 + i, "hash": str(i)}
+            for i, day in enumerate(days)
+        ])
+        db.commit()
+        store_unique_news(db, [
+            NewsArticleCreate(title=f"Fund flows day {i}", source="PR Newswire", published_date=day, content="")
+            for i, day in enumerate(days)
+        ])
+        history = yahoo_finance_history(db, "VTSMX", interval=86400)
+        latest = [article.title for article in get_latest_news(db, limit=10)]
+
+        cutoff = hot_cutoff()
+        assert archive_batch(db, archived_tables[YAHOO_FINANCE_DATA], cutoff, batch_size=2) == 2
+        assert archive_batch(db, archived_tables[YAHOO_FINANCE_DATA], cutoff, batch_size=2) == 1
+        assert archive_batch(db, archived_tables[NEWS_ARTICLES], cutoff, batch_size=100) == 3
+        db.commit()
+
+        assert db.execute(select(func.count()).select_from(YahooFinanceData)).scalar() == 2
+        partitions = sorted(os.listdir(tmp_path / "archive" / YAHOO_FINANCE_DATA))
+        assert partitions == sorted(f"date={day.date().isoformat()}" for day in days[:3])
+        # The search index no longer points at the archived articles
+        assert sorted(row["title"] for row in search_news(db, "flows")) == ["Fund flows day 3", "Fund flows day 4"]
+
+        assert yahoo_finance_history(db, "VTSMX", interval=86400) == history
+        recent = yahoo_finance_history(db, "VTSMX", start=now - timedelta(days=2), interval=86400)
+        assert [bucket["close"] for bucket in recent] == [103.0, 104.0]
+        assert [article.title for article in get_latest_news(db, limit=10)] == latest
+        assert [article.title for article in get_latest_news(db, limit=2, before=now - timedelta(days=5))] == [
+            "Fund flows day 2", "Fund flows day 1"
+        ]
+    engine.dispose()
+
+def test_archived_rows_are_stored_again_when_they_come_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    dedup = DedupFilter(NEWS_ARTICLES, recent_size=100, capacity=100, error_rate=0.01)
+    dedup.warm([])
+    monkeypatch.setattr(news, "news_dedup", dedup)
+    monkeypatch.setitem(dedup_filters, NEWS_ARTICLES, dedup)
+    engine = create_engine(f"sqlite:///{tmp_path / 'hot.db'}")
+    Base.metadata.create_all(bind=engine)
+    create_news_search_index(engine)
+    old = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=30)
+    article = NewsArticleCreate(title="Fund reopens", source="PR Newswire", published_date=old, content="")
+    with Session(engine) as db:
+        assert store_unique_news(db, [article]).inserted == 1
+        assert archive_batch(db, archived_tables[NEWS_ARTICLES], hot_cutoff(), batch_size=100) == 1
+        db.commit()
+        # Re-published unchanged: it is no longer in SQLite, so it must not be skipped as recently stored
+        assert store_unique_news(db, [article]).inserted == 1
+        assert store_unique_news(db, [article]).inserted == 0
+    engine.dispose()
+
+def test_api_reads_the_archive_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setattr(news, "news_dedup", DedupFilter(NEWS_ARTICLES, 100, 100, 0.01))
+    engine = create_engine(f"sqlite:///{tmp_path / 'hot.db'}")
+    Base.metadata.create_all(bind=engine)
+    create_news_search_index(engine)
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    with Session(engine) as db:
+        store_unique_news(db, [
+            NewsArticleCreate(title=f"Day {age}", source="PR Newswire", published_date=now - timedelta(days=age), content="")
+            for age in (20, 10, 0)
+        ])
+        archive_batch(db, archived_tables[NEWS_ARTICLES], hot_cutoff(), batch_size=100)
+        db.commit()
+    engine.dispose()
+
+    scans = []
+    def recording_archived_news(*args):
+        try:
+            asyncio.get_running_loop()
+            scans.append("event loop")
+        except RuntimeError:
+            scans.append("thread")
+        return archived_news(*args)
+    monkeypatch.setattr(news, "archived_news", recording_archived_news)
+    async_engine = create_async_db_engine(f"sqlite:///{tmp_path / 'hot.db'}")
+    sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+    async def hot_db():
+        async with sessions() as db:
+            yield db
+    app = FastAPI()
+    app.include_router(news_router.router)
+    app.dependency_overrides[get_async_db] = hot_db
+    response = TestClient(app).get("/news?limit=5")
+    assert [article["title"] for article in response.json()] == ["Day 0", "Day 10", "Day 20"]
+    assert scans == ["thread"]
+    asyncio.run(async_engine.dispose())
+
+def test_retention_fails_without_pyarrow(monkeypatch):
+    monkeypatch.setattr(archive, "pyarrow", None)
+    state = ScraperState(name="retention", cursor=0, consecutive_failures=0)
+    asyncio.run(run_once(retention_job, state))
+    assert state.consecutive_failures == 1 and "pyarrow" in state.last_error
+
+def test_delta_layout_archives_deltas_and_history_replays_both_tiers(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setattr(config, "YAHOO_STORAGE", "delta")
+    monkeypatch.setattr(config, "YAHOO_DELTA_KEYFRAME_INTERVAL", 4)
+    engine = create_engine(f"sqlite:///{tmp_path / 'hot.db'}")
+    Base.metadata.create_all(bind=engine)
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+    def quote(symbol, age, price):
+        return {"symbol": symbol, "observed_at": now - timedelta(days=age), **{field: "1.0" for field in delta_fields},
+                "price_intraday": price}
+
+    with Session(engine) as db:
+        # Keyframes at the 1st, 5th and 9th scrapes; VFIAX is only ever scraped before the hot window
+        for i, age in enumerate((40, 30, 25, 20, 15, 10, 5, 1, 0)):
+            store_deltas(db, [quote("VTSMX", age, f"{100 + i}.00")] + ([quote("VFIAX", age, f"{50 + i}.00")] if age in (30, 20) else []))
+        db.commit()
+        history = yahoo_finance_history(db, "VTSMX", interval=86400)
+
+        cutoff, deltas = hot_cutoff(), archived_tables[YAHOO_FINANCE_DELTAS]
+        assert [archive_batch(db, deltas, cutoff, batch_size=3) for _ in range(4)] == [3, 3, 2, 0]
+        db.commit()
+        hot = db.execute(select(YahooFinanceDelta).where(YahooFinanceDelta.symbol == "VTSMX").order_by(YahooFinanceDelta.id)).scalars().all()
+        # The 7th scrape only changed the price; it now holds every field, so the hot rows replay on their own
+        assert len(hot) == 3 and hot[0].keyframe and set(orjson.loads(hot[0].changes)) == set(delta_fields)
+        assert yahoo_finance_history(db, "VTSMX", interval=86400) == history
+        recent = yahoo_finance_history(db, "VTSMX", start=now - timedelta(days=12), interval=86400)
+        assert [bucket["close"] for bucket in recent] == [105.0, 106.0, 107.0, 108.0]
+
+        # Every VFIAX delta is archived, so its next one holds every field again
+        store_deltas(db, [quote("VFIAX", 0, "60.00")])
+        (changes,) = db.execute(select(YahooFinanceDelta.changes).where(YahooFinanceDelta.symbol == "VFIAX")).one()
+        assert set(orjson.loads(changes)) == set(delta_fields)
+    engine.dispose()
+
+    app = FastAPI()
+    app.include_router(yahoo_finance_router.router)
+    app.dependency_overrides[get_async_db] = lambda: None
+    assert TestClient(app).get("/yahoofinance/quotes").status_code == 501
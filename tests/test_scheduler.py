@@ -0,0 +1,67 @@
+import asyncio
+import os
+import sys
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app.db.database import Base
+from app.models.news import ScraperState
+from app.services import yahoo_finance
+from app.services.scheduler import UpstreamError, backoff_delay, load_state, parse_retry_after, run_once, save_state
+from app.services.yahoo_finance import ScreenerResult, yahoo_finance_job
+
+UNIVERSE = 1050
+
+def fake_screener(fail_at=None, empty_from=UNIVERSE):
+    fetched = []
+
+    async def fetch(start, count):
+        fetched.append(start)
+        if start == fail_at:
+            raise UpstreamError("https://finance.yahoo.com", 429, retry_after=30)
+        rows = [{"Symbol": f"F{i}"} for i in range(start, min(start + count, empty_from))]
+        return ScreenerResult(rows, UNIVERSE)
+    return fetch, fetched
+
+def test_backoff_grows_and_honours_retry_after():
+    assert 2.5 <= backoff_delay(1) <= 5 and 20 <= backoff_delay(4) <= 40
+    assert backoff_delay(1, retry_after=30) >= 30
+    assert parse_retry_after("120") == 120 and parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+
+def test_sweep_covers_the_universe_and_resumes_after_errors(monkeypatch):
+    fetch, fetched = fake_screener()
+    monkeypatch.setattr(yahoo_finance, "fetch_and_store_data_from_yahoo_finance", fetch)
+    state = ScraperState(name="yahoo_finance", cursor=0, consecutive_failures=0)
+
+    async def sweep():
+        for _ in range(3):
+            await run_once(yahoo_finance_job, state)
+    asyncio.run(sweep())
+    assert sorted(fetched) == list(range(0, UNIVERSE, 100))  # 11 pages in 3 rounds of 4
+    assert state.cursor == 0 and state.universe_size == UNIVERSE and state.last_sweep_seconds is not None
+
+    fetch, fetched = fake_screener(fail_at=500)
+    monkeypatch.setattr(yahoo_finance, "fetch_and_store_data_from_yahoo_finance", fetch)
+    state.cursor = 400
+    delay = asyncio.run(run_once(yahoo_finance_job, state))
+    assert delay >= 30 and state.consecutive_failures == 1 and "429" in state.last_error
+    assert state.cursor == 500  # The page before the failure is kept, the failed one is next
+
+def test_an_empty_page_inside_the_universe_fails_the_sweep(monkeypatch):
+    fetch, fetched = fake_screener(empty_from=500)  # Rows stop although the pages still say 1050
+    monkeypatch.setattr(yahoo_finance, "fetch_and_store_data_from_yahoo_finance", fetch)
+    state = ScraperState(name="yahoo_finance", cursor=400, consecutive_failures=0, universe_size=UNIVERSE)
+    asyncio.run(run_once(yahoo_finance_job, state))
+    assert state.consecutive_failures == 1 and "empty" in state.last_error
+    assert state.cursor == 500 and state.last_sweep_seconds is None  # Not wrapped as a finished sweep
+
+def test_state_survives_restart(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'scheduler.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    state = load_state("yahoo_finance", factory)
+    state.cursor, state.universe_size = 700, UNIVERSE
+    save_state(state, factory)
+    resumed = load_state("yahoo_finance", factory)
+    assert (resumed.cursor, resumed.universe_size) == (700, UNIVERSE)
+    engine.dispose()
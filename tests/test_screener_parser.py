@@ -0,0 +1,52 @@
+import os
+import sys
+import pytest
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/fixtures")
+from make_fixtures import HEADERS, screener_page
+from app.services.screener_parser import SCREENER_DRIFT, ScreenerDriftError, parse_screener_page
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "yahoo_screener.html")
+
+def drift_count(kind):
+    return SCREENER_DRIFT.labels(kind=kind)._value.get()
+
+def test_parses_recorded_page():
+    with open(FIXTURE, "rb") as f:
+        result = parse_screener_page(f.read())
+    assert len(result.rows) == 100 and result.total == 25347
+    row = result.rows[0]
+    assert row["Symbol"] == "F0000X" and row["Name"].startswith("Example")
+    assert row["Change %"].endswith("%") and row["Net Assets"][-1] in "MBT"
+    assert "Morningstar Rating" not in row and row["timestamp"] == result.rows[-1]["timestamp"]
+
+def test_columns_are_mapped_from_the_header():
+    reordered = [HEADERS[1], HEADERS[0]] + HEADERS[:1:-1]
+    expected = parse_screener_page(screener_page(rows=5).encode()).rows
+    rows = parse_screener_page(screener_page(rows=5, columns=reordered).encode()).rows
+    strip = lambda row: {key: value for key, value in row.items() if key not in ("timestamp", "time")}
+    assert list(map(strip, rows)) == list(map(strip, expected))
+
+def test_drift_is_reported():
+    before = drift_count("row_class")
+    rows = parse_screener_page(screener_page(rows=5, row_class="yf-9zz9zz").encode()).rows
+    assert len(rows) == 5 and drift_count("row_class") == before + 1  # Still parsed, but flagged
+
+    before = drift_count("columns")
+    with pytest.raises(ScreenerDriftError):
+        parse_screener_page(screener_page(rows=5, columns=[c for c in HEADERS if c != "Net Assets"]).encode())
+    assert drift_count("columns") == before + 1
+
+def test_a_page_with_results_but_no_table_is_drift():
+    page = screener_page(rows=5)
+    # New markup: the results line is still there, the table became something else
+    table = page[page.index('<div class="tableContainer'):page.index("</section>")]
+    cards = page.replace(table, '<div class="cards"><div>F0000X</div></div>')
+    before = drift_count("table")
+    with pytest.raises(ScreenerDriftError):
+        parse_screener_page(cards.encode())
+    assert drift_count("table") == before + 1
+
+    # A page past the end of the universe keeps its table and just has no rows
+    past_end = parse_screener_page(screener_page(rows=0, start=25400).encode())
+    assert past_end.rows == [] and drift_count("table") == before + 1
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import sys
+import types
+import pytest
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app.services import snapshot_cache
+from app.services.snapshot_cache import SnapshotCache
+
+class Loader:
+    """Counts loads; fails while ``failing`` is set and waits while ``gate`` is cleared."""
+    def __init__(self):
+        self.calls = 0
+        self.failing = False
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def __call__(self, start):
+        self.calls += 1
+        await self.gate.wait()
+        if self.failing:
+            raise RuntimeError("upstream down")
+        return [f"{start}-{self.calls}"]
+
+def use_clock(monkeypatch):
+    clock = types.SimpleNamespace(now=1000.0)
+    clock.monotonic = lambda: clock.now
+    monkeypatch.setattr(snapshot_cache, "time", clock)  # Only the cache's clock, not the event loop's
+    return clock
+
+def test_fresh_stale_and_expired_entries(monkeypatch):
+    clock = use_clock(monkeypatch)
+
+    async def scenario():
+        loader = Loader()
+        cache = SnapshotCache(loader, ttl=10, stale_ttl=20)
+        assert await cache.get((0,)) == ["0-1"]
+        clock.now += 5
+        assert await cache.get((0,)) == ["0-1"] and loader.calls == 1
+
+        # Stale: served at once while one refresh runs in the background
+        clock.now += 10
+        assert await cache.get((0,)) == ["0-1"]
+        assert await cache.get((0,)) == ["0-1"]
+        await asyncio.sleep(0)
+        assert loader.calls == 2 and await cache.get((0,)) == ["0-2"]
+
+        # Past ttl + stale_ttl: waits for a new load
+        clock.now += 31
+        assert await cache.get((0,)) == ["0-3"]
+
+    asyncio.run(scenario())
+
+def test_concurrent_misses_share_one_load(monkeypatch):
+    use_clock(monkeypatch)
+
+    async def scenario():
+        loader = Loader()
+        loader.gate.clear()
+        cache = SnapshotCache(loader, ttl=10, stale_ttl=20)
+        waiting = [asyncio.create_task(cache.get((0,))) for _ in range(5)]
+        await asyncio.sleep(0)
+        loader.gate.set()
+        assert await asyncio.gather(*waiting) == [["0-1"]] * 5
+        assert loader.calls == 1
+
+    asyncio.run(scenario())
+
+def test_failed_refresh_keeps_the_last_good_snapshot(monkeypatch):
+    clock = use_clock(monkeypatch)
+
+    async def scenario():
+        loader = Loader()
+        cache = SnapshotCache(loader, ttl=10, stale_ttl=20)
+        assert await cache.get((0,)) == ["0-1"]
+        loader.failing = True
+        clock.now += 40  # Expired: the failed load falls back to the old entry
+        assert await cache.get((0,)) == ["0-1"]
+        # Nothing cached yet for this key, so the failure reaches the caller
+        with pytest.raises(RuntimeError):
+            await cache.get((100,))
+
+        loader.failing = False
+        clock.now += 1
+        assert await cache.get((0,)) == ["0-4"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,20 @@
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app.services import system_stats
+
+def test_sampler_publishes_snapshot():
+    seen = []
+
+    async def run():
+        task = asyncio.create_task(system_stats.continuous_system_sampling(interval=0.01, on_sample=seen.append))
+        while len(seen) < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+    asyncio.run(run())
+
+    snapshot = system_stats.current_snapshot()
+    assert snapshot is seen[-1] and snapshot.database_ok
+    assert snapshot.process_rss_bytes > 0 and snapshot.event_loop_lag_seconds >= 0
+    assert set(snapshot.scraper_last_success_age_seconds) == {"news", "yahoo_finance"}
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import sys
+import httpx
+import pytest
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app.services import http_client, yahoo_finance
+from app.services.news import NewsFeed, fetch_feed
+from app.services.scheduler import UpstreamError
+from app.services.screener_parser import parse_screener_page
+from upstream_simulator import Settings, Upstream, create_app
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+def scrape(monkeypatch, upstream, scenario):
+    async def run():
+        monkeypatch.setattr(http_client, "_transport", httpx.ASGITransport(app=create_app(upstream)))
+        monkeypatch.setattr(yahoo_finance, "base_url", "http://upstream/screener?start={start}&count={count}")
+        try:
+            await scenario()
+        finally:
+            await http_client.close_http_client()
+    asyncio.run(run())
+
+async def fetch_quotes(start):
+    rows = parse_screener_page(await yahoo_finance.fetch_yahoo_finance_page(start=start, count=100)).rows
+    return [{column: value for column, value in row.items() if column not in ("timestamp", "year", "month", "day", "time")} for row in rows]
+
+def test_screener_pages_churn_and_fail_on_schedule(monkeypatch):
+    clock = Clock()
+    upstream = Upstream(Settings(universe=250, latency=0, churn=0.25, tick=60), clock=clock)
+
+    async def scenario():
+        assert parse_screener_page(await yahoo_finance.fetch_yahoo_finance_page(start=0, count=100)).total == 250
+        first = await fetch_quotes(0)
+        assert len(first) == 100 and await fetch_quotes(0) == first
+        last = await fetch_quotes(200)
+        assert len(last) == 50 and last[-1]["Symbol"] == "F0249X"
+
+        clock.now += 60
+        later = await fetch_quotes(0)
+        changed = [old for old, new in zip(first, later) if old != new]
+        assert 10 <= len(changed) <= 40  # About a quarter of the funds
+        assert [row["Name"] for row in later] == [row["Name"] for row in first]
+
+        upstream.settings = upstream.settings._replace(error_rate=1.0)
+        with pytest.raises(UpstreamError) as failure:
+            await yahoo_finance.fetch_yahoo_finance_page(start=0, count=100)
+        assert failure.value.status_code in (429, 503) and failure.value.retry_after == 1
+
+    scrape(monkeypatch, upstream, scenario)
+
+def test_feeds_grow_and_answer_conditional_requests(monkeypatch):
+    clock = Clock()
+    upstream = Upstream(Settings(latency=0, news_interval=120, feed_items=20), clock=clock)
+    feed = NewsFeed("PR Newswire", "http://upstream/rss/pr-newswire.rss")
+
+    async def scenario():
+        first = await fetch_feed(feed, None)
+        assert len(first.articles) == 20
+        unchanged = await fetch_feed(feed, first.state)
+        assert unchanged.articles == [] and upstream.served["not_modified"] == 1
+
+        clock.now += 250  # Two new items
+        update = await fetch_feed(feed, unchanged.state)
+        assert len(update.articles) == 2
+        assert update.articles[-1].published_date > first.articles[0].published_date
+
+    scrape(monkeypatch, upstream, scenario)
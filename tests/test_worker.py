@@ -0,0 +1,53 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app.db.database import Base
+from app.schemas.news import NewsArticleCreate
+from app.services.broadcaster import NEWS, broadcaster
+from app.services.change_feed import ChangeFeed
+from app.services.data_version import NEWS_ARTICLES, data_versions
+from app.services.file_lock import FileLock
+from app.services.news import store_unique_news
+from app.services.news_search import create_news_search_index
+
+def test_only_one_process_holds_the_ingest_lock(tmp_path):
+    path = str(tmp_path / "ingest.lock")
+    leader, standby = FileLock(path), FileLock(path)
+    assert leader.acquire(blocking=False)
+    assert not standby.acquire(blocking=False)
+    leader.release()
+    assert standby.acquire(blocking=False) and standby.held
+    standby.release()
+
+def test_change_feed_follows_commits_from_another_process(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'feed.db'}")
+    Base.metadata.create_all(bind=engine)
+    create_news_search_index(engine)
+    feed = ChangeFeed(session_factory=sessionmaker(bind=engine))
+
+    def ingest(i):
+        # What the ingest worker does; this process only sees the database
+        with Session(engine) as db:
+            store_unique_news(db, [NewsArticleCreate(
+                title=f"Article {i}", source="PR Newswire", published_date=datetime(2025, 1, 20, tzinfo=timezone.utc), content=""
+            )])
+
+    async def scenario():
+        ingest(1)
+        await asyncio.to_thread(feed.poll, feed.listening())  # The first poll only learns where things stand
+        first = data_versions.get(NEWS_ARTICLES)
+        with broadcaster.subscribe(NEWS) as subscription:
+            ingest(2)
+            ingest(2)  # Duplicate: no new version, no event
+            await asyncio.to_thread(feed.poll, feed.listening())
+            event = await subscription.get(timeout=5)
+            assert event.id == 2 and b'"title":"Article 2"' in event.data
+            assert subscription.queue.empty()
+        assert int(data_versions.get(NEWS_ARTICLES)) == int(first) + 1
+
+    asyncio.run(scenario())
+    engine.dispose()
@@ -0,0 +1,130 @@
+import os
+import sys
+import orjson
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from app.db.database import Base
+from app.models.news import ScreenerPage, YahooFinanceData
+from app.services import yahoo_finance
+from app.services.yahoo_finance import (
+    decode_cursor, encode_cursor, load_screener_page, yahoo_finance_history, yahoo_finance_query
+)
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+def query_plan(engine, query) -> str:
+    compiled = query.compile(dialect=engine.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+    return "\n".join(row[-1] for row in rows)
+
+@pytest.mark.parametrize("filters, index", [
+    ({"symbol": "vtsmx"}, "ix_yahoo_finance_data_symbol"),
+    ({"symbol_prefix": "VTS"}, "ix_yahoo_finance_data_symbol"),
+    ({"name": "Vanguard Total Stock Mkt Idx Inv"}, "ix_yahoo_finance_data_name"),
+    ({"name_prefix": "Vanguard"}, "ix_yahoo_finance_data_name"),
+    ({"ranges": {"price": (100.0, 150.0)}}, "ix_yahoo_finance_data_price_intraday_value"),
+    # Open-ended screens are ordered by the screened metric; ordered by id alone the
+    # planner may rightly prefer walking the table in rowid order and stopping at the limit
+    ({"ranges": {"ytd_return": (1.0, None)}, "sort_by": "ytd_return"}, "ix_yahoo_finance_data_ytd_return_value"),
+    ({"ranges": {"net_assets": (1e9, None)}, "sort_by": "net_assets", "sort_order": "desc"}, "ix_yahoo_finance_data_net_assets_value"),
+    ({"ranges": {"net_expense_ratio": (None, 0.1)}, "sort_by": "net_expense_ratio"}, "ix_yahoo_finance_data_expense_ratio_assets"),
+])
+def test_filters_use_an_index(engine, filters, index):
+    plan = query_plan(engine, yahoo_finance_query(**filters))
+    assert "SEARCH yahoo_finance_data USING INDEX" in plan, plan
+    assert index in plan, plan
+
+def test_sorted_range_avoids_temp_sort(engine):
+    plan = query_plan(engine, yahoo_finance_query(ranges={"price": (100.0, None)}, sort_by="price"))
+    assert "ix_yahoo_finance_data_price_intraday_value" in plan, plan
+    assert "USE TEMP B-TREE" not in plan, plan
+
+def test_prefix_filter_matches_only_prefix(engine):
+    with engine.begin() as conn:
+        conn.execute(YahooFinanceData.__table__.insert(), [
+            {"symbol": "VTSMX", "name": "A", "hash": "1"},
+            {"symbol": "VTSAX", "name": "B", "hash": "2"},
+            {"symbol": "VTIAX", "name": "C", "hash": "3"},
+            {"symbol": "AVTSX", "name": "D", "hash": "4"},
+        ])
+    with engine.connect() as conn:
+        rows = conn.execute(yahoo_finance_query(symbol_prefix="vts", sort_by="symbol")).all()
+    assert [row.symbol for row in rows] == ["VTSAX", "VTSMX"]
+
+def test_unknown_sort_field_is_rejected():
+    with pytest.raises(ValueError):
+        yahoo_finance_query(sort_by="hash")
+
+def test_history_buckets_ohlc(engine):
+    start = datetime(2025, 1, 20, 5, 0, 0)
+    prices = [10.0, 12.0, 9.0, 11.0, 20.0, 18.0]  # Two minutes of 20 second samples
+    with engine.begin() as conn:
+        conn.execute(YahooFinanceData.__table__.insert(), [
+            {"symbol": "HIST", "hash": f"hist-{i}", "price_intraday_value": price,
+             "observed_at": start + timedelta(seconds=20 * i)}
+            for i, price in enumerate(prices)
+        ])
+    with Session(engine) as db:
+        buckets = yahoo_finance_history(db, "hist", interval=60)
+        assert [(b["open"], b["high"], b["low"], b["close"], b["count"]) for b in buckets] == [
+            (10.0, 12.0, 9.0, 9.0, 3),
+            (11.0, 20.0, 11.0, 18.0, 3),
+        ]
+        assert buckets[0]["bucket_start"] == "2025-01-20T05:00:00+00:00"
+        assert len(yahoo_finance_history(db, "HIST", max_points=1)) == 1
+
+def test_history_plan_uses_covering_index(engine):
+    plan = query_plan(engine, select(YahooFinanceData.observed_at, YahooFinanceData.price_intraday_value).where(
+        YahooFinanceData.symbol == "VTSMX", YahooFinanceData.price_intraday_value.is_not(None)
+    ))
+    assert "USING COVERING INDEX ix_yahoo_finance_data_symbol_history" in plan, plan
+
+@pytest.mark.parametrize("sort_by, sort_order", [(None, "asc"), ("price", "asc"), ("price", "desc"), ("observed_at", "desc")])
+def test_keyset_pages_cover_every_row_once(sort_by, sort_order):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    prices = [5.0, None, 3.0, 5.0, None, 1.0, 5.0, 2.0]  # Ties and NULLs across page boundaries
+    with engine.begin() as conn:
+        conn.execute(YahooFinanceData.__table__.insert(), [
+            {"symbol": f"K{i}", "hash": f"k-{i}", "price_intraday_value": price,
+             "observed_at": datetime(2025, 1, 20) + timedelta(minutes=i % 3)}
+            for i, price in enumerate(prices)
+        ])
+    with Session(engine) as db:
+        expected = [r.id for r in db.scalars(yahoo_finance_query(sort_by=sort_by, sort_order=sort_order))]
+        seen, after = [], None
+        while True:
+            page = db.scalars(yahoo_finance_query(sort_by=sort_by, sort_order=sort_order, after=after, limit=3)).all()
+            seen += [r.id for r in page]
+            if len(page) < 3:
+                break
+            after = decode_cursor(encode_cursor(sort_by, sort_order, page[-1]), sort_by, sort_order)
+    assert seen == expected
+    assert sorted(seen) == list(range(1, len(prices) + 1))
+
+def test_screener_ranges_are_cut_from_the_stored_pages(engine, monkeypatch):
+    monkeypatch.setattr(yahoo_finance, "ReadSessionLocal", sessionmaker(bind=engine))
+    with Session(engine) as session:
+        for start, size, fetched_at in [(0, 100, datetime(2025, 1, 20, 14)), (100, 50, datetime(2025, 1, 20, 15))]:
+            rows = [{"Symbol": f"F{offset}"} for offset in range(start, start + size)]
+            session.add(ScreenerPage(start=start, count=100, fetched_at=fetched_at, data=orjson.dumps(rows).decode()))
+        session.commit()
+
+    symbols = lambda snapshot: [row["Symbol"] for row in snapshot.rows]
+    page = load_screener_page(0, 100)
+    assert symbols(page) == [f"F{offset}" for offset in range(100)] and page.fetched_at == datetime(2025, 1, 20, 14)
+    across = load_screener_page(90, 20)  # Spans both pages
+    assert symbols(across) == [f"F{offset}" for offset in range(90, 110)] and across.fetched_at == datetime(2025, 1, 20, 15)
+    assert symbols(load_screener_page(10, 5)) == ["F10", "F11", "F12", "F13", "F14"]
+    assert symbols(load_screener_page(140, 100)) == [f"F{offset}" for offset in range(140, 150)]  # The short last page
+    assert load_screener_page(500, 100) is None
@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import datetime
+import email.utils
+import functools
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, NamedTuple, Optional
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/fixtures")
+
+#  python tests/upstream_simulator.py [--port 8001] [--universe 25000] [--latency 0.2] [--error-rate 0.05] [--churn 0.1]
+# A stand-in for Yahoo's screener and the RSS feeds, so the worker and API can be load tested
+# offline. It serves paginated screener pages and feeds in the markup of tests/fixtures, after
+# a configurable latency, failing a share of requests with 429 or 503. Every --tick seconds
+# about --churn of the funds get new quotes, and every --news-interval seconds each feed gets
+# a new item. Content depends only on the seed and the time since start, so runs repeat.
+# It prints the environment that points the worker at it. POST /control with a JSON object of
+# settings changes them while it runs, e.g. {"error_rate": 1} for an outage; GET /stats counts
+# what it served.
+from fastapi import FastAPI, Request, Response
+from make_fixtures import fund_row, render_rss, render_screener, rss_item
+
+FEEDS = {"pr-newswire": "PR Newswire", "business-wire": "Business Wire"}
+
+class Settings(NamedTuple):
+    universe: int = 25000  # Funds in the screener
+    latency: float = 0.2  # Seconds before answering, on average
+    jitter: float = 0.5  # Latency varies by up to this share either way
+    error_rate: float = 0.0  # Share of requests answered with 429 or 503
+    churn: float = 0.1  # Share of funds whose quote changes every tick
+    tick: float = 60.0
+    news_interval: float = 120.0  # Seconds between new items in each feed
+    feed_items: int = 50
+    seed: int = 7
+
+class Upstream:
+    def __init__(self, settings: Settings, clock: Callable[[], float] = time.time):
+        self.settings = settings
+        self.clock = clock
+        self.started = clock()
+        self.rng = random.Random(settings.seed)  # Latency and errors
+        self.served = {"screener": 0, "feed": 0, "not_modified": 0, "error": 0}
+
+    def elapsed(self) -> float:
+        return self.clock() - self.started
+
+    def fund_version(self, index: int, tick: int) -> int:
+        # Each fund changes every 1/churn ticks, at its own phase, so about churn of them change per tick
+        if self.settings.churn <= 0:
+            return 0
+        period = max(1, round(1 / self.settings.churn))
+        return (tick + random.Random(f"{self.settings.seed}-{index}").randrange(period)) // period
+
+    def fund(self, index: int, version: int) -> list:
+        values = fund_row(random.Random(f"{self.settings.seed}-{index}-{version}"), index)
+        values[1] = fund_row(random.Random(f"{self.settings.seed}-{index}-0"), index)[1]  # Funds keep their name
+        return values
+
+    @functools.lru_cache(maxsize=512)
+    def screener_page(self, start: int, count: int, tick: int, universe: int) -> bytes:
+        funds = [
+            self.fund(index, self.fund_version(index, tick)) for index in range(start, min(start + count, universe))
+        ]
+        return render_screener(funds, start, universe, random.Random(f"{self.settings.seed}-{start}")).encode()
+
+    def newest_item(self) -> int:
+        return self.settings.feed_items - 1 + int(self.elapsed() // self.settings.news_interval)
+
+    def published(self, number: int) -> datetime.datetime:
+        # Item 0 is as old as a full feed at start, so the first fetch sees feed_items items
+        first = self.started - self.settings.feed_items * self.settings.news_interval
+        return datetime.datetime.fromtimestamp(first + number * self.settings.news_interval, datetime.timezone.utc)
+
+    @functools.lru_cache(maxsize=64)
+    def feed(self, name: str, newest: int) -> bytes:
+        entries = [
+            rss_item(
+                random.Random(f"{self.settings.seed}-{name}-{number}"), f"{name}-{number}",
+                email.utils.format_datetime(self.published(number))
+            )
+            for number in range(newest, max(-1, newest - self.settings.feed_items), -1)
+        ]
+        return render_rss(entries).encode()
+
+    async def answer(self) -> Optional[Response]:
+        """Wait the simulated latency; an error response for the requests that fail, else None."""
+        settings = self.settings
+        await asyncio.sleep(max(0.0, settings.latency * self.rng.uniform(1 - settings.jitter, 1 + settings.jitter)))
+        if self.rng.random() < settings.error_rate:
+            self.served["error"] += 1
+            status = self.rng.choice([429, 503])
+            return Response(status_code=status, headers={"Retry-After": "1"}, content=f"Simulated {status}")
+        return None
+
+def create_app(upstream: Upstream) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/screener")
+    async def screener(start: int = 0, count: int = 100):
+        error = await upstream.answer()
+        if error:
+            return error
+        upstream.served["screener"] += 1
+        tick = int(upstream.elapsed() // upstream.settings.tick)
+        return Response(upstream.screener_page(start, count, tick, upstream.settings.universe), media_type="text/html")
+
+    @app.get("/rss/{name}.rss")
+    async def feed(name: str, request: Request):
+        if name not in FEEDS:
+            return Response(status_code=404)
+        error = await upstream.answer()
+        if error:
+            return error
+        newest = upstream.newest_item()
+        headers = {
+            "ETag": f'"{name}-{newest}"',
+            "Last-Modified": email.utils.format_datetime(upstream.published(newest), usegmt=True)
+        }
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            upstream.served["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        upstream.served["feed"] += 1
+        return Response(upstream.feed(name, newest), media_type="application/rss+xml", headers=headers)
+
+    @app.get("/stats")
+    async def stats():
+        return {"elapsed_seconds": upstream.elapsed(), "served": upstream.served, "settings": upstream.settings._asdict()}
+
+    @app.post("/control")
+    async def control(request: Request):
+        changes = await request.json()
+        upstream.settings = upstream.settings._replace(**{
+            field: type(getattr(upstream.settings, field))(value)
+            for field, value in changes.items() if field in Settings._fields
+        })
+        Upstream.screener_page.cache_clear()  # Pages and feeds depend on the seed, churn and feed size
+        Upstream.feed.cache_clear()
+        return upstream.settings._asdict()
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake screener and RSS upstream for offline load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    for field, default in Settings._field_defaults.items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(default), default=default)
+    args = parser.parse_args()
+    settings = Settings(**{field: getattr(args, field) for field in Settings._fields})
+    url = f"http://{args.host}:{args.port}"
+    feeds = [{"source": source, "url": f"{url}/rss/{name}.rss"} for name, source in FEEDS.items()]
+    print("Point the worker here with:")
+    print(f"  export YAHOO_SCREENER_URL='{url}/screener?start={{start}}&count={{count}}'")
+    print(f"  export NEWS_FEEDS='{json.dumps(feeds)}'")
+
+    import uvicorn
+    uvicorn.run(create_app(Upstream(settings)), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()